@@ -9,6 +9,13 @@ DESCRIPTION:
 
 CHANGE LOG:
 -----------
+2026-10-18 | v1.10.0 | One polling cycle factored into poll() so bench/replay.py can drive it.
+2026-10-18 | v1.9.0 | Atomic JSON checkpoint with boundary message IDs; already-analyzed messages are skipped.
+2026-10-18 | v1.8.0 | Buffered, rotating output log with optional JSONL (AUDIT_FORMAT=jsonl).
+2026-10-18 | v1.7.0 | Persistent verdict cache (sentinel/llm_cache.py) in front of Ollama.
+2026-10-18 | v1.6.0 | Batches over OLLAMA_NUM_CTX are split into windows and analyzed concurrently.
+2026-10-18 | v1.5.0 | Prompt built from Drain log templates (LOG_TEMPLATES=0 for raw lines).
+2026-10-18 | v1.4.0 | Paged Graylog fetch (limit/offset) analyzed in bounded batches.
 2026-01-14 | v1.3.1 | Added Verbose Logging to troubleshoot empty output files.
 2026-01-14 | v1.3.0 | Added URL path validation to prevent HTML/404 mismatches.
 2026-01-14 | v1.2.9 | Added JSON error trapping to handle empty API responses.
@@ -27,10 +34,12 @@ import time
 import requests
 import json
 import sys
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timezone
+
+from sentinel import auditlog, budget, checkpoint, graylog, llm_cache, templates
 
 # --- METADATA ---
-__version__ = os.getenv('AGENT_VERSION', '1.3.1')
+__version__ = os.getenv('AGENT_VERSION', '1.10.0')
 
 # --- CONFIG VALIDATION & PATH FIXING ---
 def validate_url(url):
@@ -48,47 +57,93 @@ GRAYLOG_TOKEN = os.getenv('GRAYLOG_API_TOKEN')
 STREAM_ID = os.getenv('GRAYLOG_STREAM_ID')
 OLLAMA_URL = os.getenv('OLLAMA_API_URL')
 OLLAMA_MODEL = os.getenv('OLLAMA_MODEL', 'llama3.2')
+OLLAMA_NUM_CTX = int(os.getenv('OLLAMA_NUM_CTX', 4096))
+OLLAMA_PARALLEL = int(os.getenv('OLLAMA_NUM_PARALLEL', 1))
 INTERVAL = int(os.getenv('CHECK_INTERVAL_SECONDS', 60))
+LOG_TEMPLATES = os.getenv('LOG_TEMPLATES', '1') == '1'
+LLM_CACHE = os.getenv('LLM_CACHE', '1') == '1'
 
 # Persistent Paths
 STATE_FILE = "/app/output/last_timestamp.txt"
 OUTPUT_FILE = "/app/output/llm_analysis_output.txt"
+TEMPLATE_STATE = os.getenv('LOG_TEMPLATE_STATE', "/app/output/log_templates_all.json")
+
+# Template clusters persist across cycles (and restarts) in TEMPLATE_STATE
+MINER = templates.TemplateMiner(TEMPLATE_STATE) if LOG_TEMPLATES else None
+# Shared with agent.py by default; keys include the prompt, so they never collide
+VERDICTS = llm_cache.open_cache() if LLM_CACHE else None
+OUTPUT = auditlog.AuditWriter(OUTPUT_FILE)
+# Timestamp + boundary message IDs, plus an in-memory LRU of recent IDs
+CHECKPOINT = checkpoint.Checkpoint(STATE_FILE)
 
 def get_last_ts():
-    """Reads the high-water mark from the state file."""
-    if os.path.exists(STATE_FILE):
-        with open(STATE_FILE, "r") as f:
-            return f.read().strip()
-    return (datetime.now(timezone.utc) - timedelta(minutes=10)).isoformat()
+    """Reads the high-water mark from the checkpoint."""
+    return CHECKPOINT.since()
 
 def write_to_log(status, analysis):
-    """Writes AI reasoning results to the persistent volume."""
-    try:
-        with open(OUTPUT_FILE, "a") as f:
-            f.write(f"\n--- v{__version__} | {datetime.now()} | STATUS: {status} ---\n")
-            f.write(f"Model: {OLLAMA_MODEL}\n")
-            f.write(f"AI Response: {analysis}\n")
-            f.write("-" * 50 + "\n")
-    except Exception as e:
-        print(f"CRITICAL: Cannot write to {OUTPUT_FILE}: {e}")
+    """Queues AI reasoning results for the (buffered, rotating) output log."""
+    OUTPUT.write(
+        f"\n--- v{__version__} | {datetime.now()} | STATUS: {status} ---\n"
+        f"Model: {OLLAMA_MODEL}\n"
+        f"AI Response: {analysis}\n"
+        + "-" * 50 + "\n",
+        version=__version__, status=status, model=OLLAMA_MODEL, response=analysis)
 
 def analyze_with_ollama(logs):
     """Sends log batch to local Ollama instance for behavioral analysis."""
-    log_summary = "\n".join([f"[{l['message']['timestamp']}] {l['message']['message']}" for l in logs])
-    
-    prompt = (
+    if MINER is not None:
+        log_summary = MINER.summarize((l['message']['timestamp'], l['message']['message']) for l in logs)
+        MINER.save()
+    else:
+        log_summary = "\n".join([f"[{l['message']['timestamp']}] {l['message']['message']}" for l in logs])
+
+    instructions = (
         f"You are a security expert. Analyze the following batch of system logs. "
+        f"{templates.PROMPT_NOTE + ' ' if MINER is not None else ''}"
         f"If the logs represent normal system operation, reply ONLY with the word 'NORMAL'. "
         f"If you detect an anomaly, security threat, or hardware failure, provide a concise summary.\n\n"
-        f"LOG DATA:\n{log_summary}"
+        f"LOG DATA:\n"
     )
-    
+
+    # Oversized batches are split into windows that fit OLLAMA_NUM_CTX
+    windows = budget.plan(instructions, log_summary, OLLAMA_NUM_CTX)
+    if len(windows) > 1:
+        print(f"v{__version__} Batch exceeds num_ctx {OLLAMA_NUM_CTX}: analyzing {len(windows)} windows")
+    results = budget.map_windows(lambda w: ask_ollama(instructions + w), windows, OLLAMA_PARALLEL)
+    return reduce_results(results)
+
+def reduce_results(results):
+    """NORMAL only if every window is NORMAL; otherwise the findings (or first error)."""
+    if len(results) == 1:
+        return results[0]
+    findings = [f"[window {i + 1}/{len(results)}] {r}" for i, r in enumerate(results)
+                if r.strip().upper() != "NORMAL" and not r.startswith("OLLAMA_ERROR")]
+    if findings:
+        return "\n".join(findings)
+    errors = [r for r in results if r.startswith("OLLAMA_ERROR")]
+    return errors[0] if errors else "NORMAL"
+
+def ask_ollama(prompt):
+    """Cached verdict for prompt, or a fresh one from Ollama (errors are not cached)."""
+    key = llm_cache.cache_key(OLLAMA_MODEL, "", prompt) if VERDICTS is not None else None
+    if key:
+        cached = VERDICTS.get(key)
+        if cached is not None:
+            return cached
+    result = generate(prompt)
+    if key and not result.startswith("OLLAMA_ERROR") and result != "NO_RESPONSE_FIELD_IN_JSON":
+        VERDICTS.put(key, result)
+    return result
+
+def generate(prompt):
+    """One non-streaming generate call; errors come back as OLLAMA_ERROR strings."""
     try:
         # 120s timeout allows for Quadro P4000 "Low VRAM" latency
         res = requests.post(
-            OLLAMA_URL, 
-            json={"model": OLLAMA_MODEL, "prompt": prompt, "stream": False}, 
-            timeout=120 
+            OLLAMA_URL,
+            json={"model": OLLAMA_MODEL, "prompt": prompt, "stream": False,
+                  "options": {"num_ctx": OLLAMA_NUM_CTX}},
+            timeout=120
         )
         
         if not res.text.strip():
@@ -104,64 +159,57 @@ def analyze_with_ollama(logs):
     except Exception as e:
         return f"OLLAMA_ERROR: Connection failed: {e}"
 
+def poll(graylog_get):
+    """One cycle: analyze everything since the checkpoint, batch by batch.
+    Returns the number of batches analyzed."""
+    since = get_last_ts()
+    to_time = datetime.now(timezone.utc).isoformat()
+
+    # 1. Fetch Logs from Graylog, one page at a time
+    messages = CHECKPOINT.fresh(graylog.iter_messages(graylog_get, GRAYLOG_URL, STREAM_ID, since, to_time))
+    batches = 0
+    try:
+        for batch in graylog.batched(messages):
+            batches += 1
+            print(f"[{datetime.now()}] v{__version__} Sending {len(batch)} logs to AI...")
+
+            # 2. Analyze with Ollama
+            analysis_result = analyze_with_ollama(batch)
+
+            # 3. Write to persistent log (v1.3.1 writes ALL for debugging)
+            write_to_log("SUCCESS", analysis_result)
+            if VERDICTS is not None:
+                print(f"[{datetime.now()}] Verdict cache: {VERDICTS.stats_line()}")
+
+            # 4. Update State after every batch (atomic, with boundary IDs)
+            CHECKPOINT.advance(batch)
+
+        if not batches:
+            print(f"[{datetime.now()}] No new logs found since {since}")
+
+    except graylog.GraylogError as e:
+        print(f"ERROR: {e}")
+    return batches
+
 if __name__ == "__main__":
     print(f"--- Starting Graylog-Ollama-Sentinel v{__version__} ---")
     print(f"Monitoring Stream: {STREAM_ID}")
     
+    # Shared session so pages reuse one connection
+    session = requests.Session()
+    session.auth = (GRAYLOG_TOKEN, 'token')
+    session.headers.update({
+        "Accept": "application/json",
+        "X-Requested-By": "cli-sentinel"
+    })
+
+    def graylog_get(url, params):
+        return session.get(url, params=params, timeout=30)
+
     while True:
         try:
-            since = get_last_ts()
-            to_time = datetime.now(timezone.utc).isoformat()
-            
-            # 1. Fetch Logs from Graylog
-            params = {
-                "query": f"streams:{STREAM_ID}",
-                "from": since,
-                "to": to_time,
-                "fields": "message,timestamp",
-                "sort": "timestamp:asc"
-            }
-            
-            headers = {
-                "Accept": "application/json",
-                "X-Requested-By": "cli-sentinel"
-            }
-            
-            resp = requests.get(
-                f"{GRAYLOG_URL}/search/universal/absolute", 
-                params=params, 
-                auth=(GRAYLOG_TOKEN, 'token'), 
-                headers=headers,
-                timeout=30
-            )
-            
-            if resp.status_code == 200:
-                try:
-                    data = resp.json()
-                    messages = data.get('messages', [])
-                    
-                    if messages:
-                        print(f"[{datetime.now()}] v{__version__} Sending {len(messages)} logs to AI...")
-                        
-                        # 2. Analyze with Ollama
-                        analysis_result = analyze_with_ollama(messages)
-                        
-                        # 3. Write to persistent log (v1.3.1 writes ALL for debugging)
-                        write_to_log("SUCCESS", analysis_result)
-                        
-                        # 4. Update State
-                        newest_ts = messages[-1]['message']['timestamp']
-                        with open(STATE_FILE, "w") as f:
-                            f.write(newest_ts)
-                    else:
-                        print(f"[{datetime.now()}] No new logs found since {since}")
-                        
-                except json.JSONDecodeError:
-                    print(f"ERROR: Graylog API returned non-JSON: {resp.text[:100]}")
-            else:
-                print(f"Graylog API Error {resp.status_code}: {resp.text}")
-
+            poll(graylog_get)
         except Exception as e:
             print(f"Runtime Loop Error: {e}")
 
-        time.sleep(INTERVAL)
\ No newline at end of file
+        time.sleep(INTERVAL)
@@ -1,21 +1,55 @@
 #!/usr/bin/env python3
 """
-AI LOG SENTINEL v2.7.5 - Graylog Header Fix
-===========================================
+AI LOG SENTINEL v2.22.0 - Multi-Stream Audits
+=============================================
 
 CHANGE LOG:
 -----------
+2026-10-18 | v2.22.0 | PERF: Several Graylog streams per process (streams.json); shared priority queue with fixed Ollama workers.
+2026-10-18 | v2.21.0 | FIXED: Atomic JSON checkpoint with boundary message IDs; recent-ID LRU stops re-analysis (sentinel/checkpoint.py).
+2026-10-18 | v2.20.0 | PERF: Deadline-based audit scheduling that backs off while quiet and tightens after alerts (sentinel/schedule.py).
+2026-10-18 | v2.19.0 | PERF: Per-stage timers and Ollama prefill/decode timings on a Prometheus /metrics endpoint (sentinel/metrics.py).
+2026-10-18 | v2.18.0 | PERF: Buffered, rotating (gzip) audit writers with optional JSONL output (sentinel/auditlog.py).
+2026-10-18 | v2.17.0 | PERF: rules.json settles obvious Wi-Fi batches (ok/bad) without Ollama; per-rule hit counters.
+2026-10-18 | v2.16.0 | PERF: Streamed Ollama replies; HA alert fires on STATUS before SUMMARY finishes. num_predict cap, OLLAMA_FORMAT=json.
+2026-10-18 | v2.15.0 | PERF: SQLite LRU+TTL cache of Ollama verdicts keyed by model/system/normalized prompt.
+2026-10-18 | v2.14.0 | PERF: Prompts over OLLAMA_NUM_CTX are split into windows, analyzed concurrently and reduced to one verdict.
+2026-10-18 | v2.13.0 | PERF: Wi-Fi prompts built from Drain log templates with counts (sentinel/templates.py).
+2026-10-18 | v2.12.0 | PERF: HA_MODE=websocket keeps the Zigbee mesh from state_changed events instead of polling /api/states.
+2026-10-18 | v2.11.0 | PERF: Zigbee audit skips Ollama while the mesh digest is unchanged (sentinel/zigbee.py).
+2026-10-18 | v2.10.0 | PERF: Zigbee and Wi-Fi audits run on their own threads/intervals; Ollama calls capped by OLLAMA_NUM_PARALLEL.
+2026-10-18 | v2.9.0 | PERF: Graylog search paged with limit/offset, analyzed in bounded batches.
+2026-10-18 | v2.8.0 | PERF: Per-backend keep-alive sessions with retries/timeouts (sentinel/pool.py).
 2026-01-17 | v2.7.5 | FIXED: Restored 'Accept: application/json' header for Graylog.
 2026-01-17 | v2.7.4 | FIXED: JSON 'Extra data' error using robust response handling.
 2026-01-17 | v2.7.3 | UPGRADE: Split Zigbee audits into dedicated zigbee_mesh.log.
 """
 
 import os
+import queue
+import threading
 import time
-import requests
 import json
+from functools import partial
 from datetime import datetime, timedelta, timezone
 
+from sentinel import auditlog
+from sentinel import budget
+from sentinel import checkpoint
+from sentinel import graylog
+from sentinel import hass_ws
+from sentinel import llm_cache
+from sentinel import metrics
+from sentinel import ollama
+from sentinel import pool
+from sentinel import rules
+from sentinel import schedule
+from sentinel import streams
+from sentinel import templates
+from sentinel import verdict
+from sentinel import workqueue
+from sentinel import zigbee
+
 # --- CONFIG ---
 GRAYLOG_URL = os.getenv('GRAYLOG_API_URL', '').rstrip('/')
 GRAYLOG_TOKEN = os.getenv('GRAYLOG_API_TOKEN')
@@ -24,23 +58,120 @@ OLLAMA_URL = os.getenv('OLLAMA_API_URL')
 OLLAMA_MODEL = os.getenv('OLLAMA_MODEL', 'llama3.2')
 OLLAMA_NUM_CTX = int(os.getenv('OLLAMA_NUM_CTX', 16384))
 INTERVAL = int(os.getenv('CHECK_INTERVAL_SECONDS', 60))
+# Per-audit intervals (0 disables that audit)
+ZIGBEE_INTERVAL = int(os.getenv('ZIGBEE_INTERVAL_SECONDS', INTERVAL))
+WIFI_INTERVAL = int(os.getenv('WIFI_INTERVAL_SECONDS', INTERVAL))
+# Match the Ollama server's OLLAMA_NUM_PARALLEL; extra requests would only queue on the GPU
+OLLAMA_PARALLEL = int(os.getenv('OLLAMA_NUM_PARALLEL', 1))
+# Inference queue priority (higher first) of the Zigbee audit and the GRAYLOG_STREAM_ID stream
+ZIGBEE_PRIORITY = int(os.getenv('ZIGBEE_PRIORITY', 10))
+WIFI_PRIORITY = int(os.getenv('WIFI_PRIORITY', 0))
 
 # HA Config
 HA_URL = os.getenv('HOME_ASSISTANT_URL')
 HA_TOKEN = os.getenv('HA_ACCESS_TOKEN')
+# "rest" polls /api/states each audit; "websocket" keeps a live mesh model
+HA_MODE = os.getenv('HA_MODE', 'rest').lower()
+
+# Cluster Wi-Fi logs into templates before prompting (0 = send raw lines)
+LOG_TEMPLATES = os.getenv('LOG_TEMPLATES', '1') == '1'
+
+# Reuse verdicts for identical prompts across cycles and restarts (0 = off)
+LLM_CACHE = os.getenv('LLM_CACHE', '1') == '1'
+
+# Print connection-reuse stats every N * CHECK_INTERVAL_SECONDS (0 = never)
+POOL_STATS_EVERY = int(os.getenv('POOL_STATS_EVERY', 10))
 
 # Persistence Paths
+OUTPUT_DIR = "/app/output"
 STATE_FILE = "/app/output/last_timestamp.txt"
 WIFI_LOG = "/app/output/wifi_interference.log"
 ZIGBEE_LOG = "/app/output/zigbee_mesh.log"
 HA_LOG = "/app/output/ha_alerts.log"
+TEMPLATE_STATE = os.getenv('LOG_TEMPLATE_STATE', "/app/output/log_templates.json")
+
+# Prompt profiles; the first status is the one that raises an HA alert
+PROFILES = {
+    "zigbee": {
+        "statuses": ("ZIGBEE_ISSUES", "OK"),
+        "system": "You are a Zigbee Mesh Expert. Analyze states for 'unavailable' nodes. Format: SCORE: [1-10], STATUS: [ZIGBEE_ISSUES/OK], SUMMARY: [Text]",
+        "title": "🚨 Zigbee Mesh Alert",
+    },
+    "wifi": {
+        "statuses": ("RF_INTERFERENCE", "OK"),
+        "system": "You are an RF Engineer. Analyze logs for Wi-Fi flapping. Format: SCORE: [1-10], STATUS: [RF_INTERFERENCE/OK], SUMMARY: [Text]",
+        "title": "🚨 Wi-Fi Stability Alert",
+        "rules": True,
+    },
+    "security": {
+        "statuses": ("ANOMALY", "OK"),
+        "system": "You are a security expert. Analyze logs for intrusion attempts, anomalies and hardware failures. Format: SCORE: [1-10], STATUS: [ANOMALY/OK], SUMMARY: [Text]",
+        "title": "🚨 Log Anomaly Alert",
+    },
+}
 
 class RestoredSentinel:
     def __init__(self):
-        self.version = "2.7.5"
+        self.version = "2.22.0"
         self.last_heartbeat = datetime.now()
+        self.inference = workqueue.InferenceQueue(OLLAMA_PARALLEL, "ollama")
+        self.mesh = zigbee.MeshDigest()
+        self.verdicts = llm_cache.open_cache() if LLM_CACHE else None
+        self.rules = rules.RuleEngine.load("RF_INTERFERENCE")
+        self.zigbee_log = auditlog.AuditWriter(ZIGBEE_LOG)
+        self.ha_log = auditlog.AuditWriter(HA_LOG)
+        self.schedules = {}
+        # Alert pushes go out in order on their own thread, so an HA timeout
+        # never holds an inference worker or an audit
+        self.notices = queue.Queue()
+        threading.Thread(target=self.notice_loop, name="ha-notices", daemon=True).start()
+        legacy = streams.Stream("wifi", STREAM_ID, "wifi", WIFI_PRIORITY, WIFI_INTERVAL, STATE_FILE, WIFI_LOG, TEMPLATE_STATE)
+        self.streams = streams.load(legacy, OUTPUT_DIR)
+        for stream in self.streams:
+            if stream.profile not in PROFILES or stream.profile == "zigbee":
+                raise ValueError(f"stream {stream.name}: unknown profile {stream.profile!r}")
+            if stream.name == "zigbee":
+                raise ValueError("stream name 'zigbee' is taken by the mesh audit")
+        self.checkpoints = {s.name: checkpoint.Checkpoint(s.state_file) for s in self.streams}
+        self.stream_logs = {s.name: auditlog.AuditWriter(s.log_file) for s in self.streams}
+        self.miners = {s.name: templates.TemplateMiner(s.template_file) if LOG_TEMPLATES else None for s in self.streams}
+        self.ha_feed = None
+        if HA_MODE == "websocket" and HA_URL and HA_TOKEN:
+            self.ha_feed = hass_ws.HAMeshFeed(HA_URL, HA_TOKEN, zigbee.is_zigbee).start()
+        self.graylog = pool.Backend(
+            "graylog", "GRAYLOG", read_timeout=30, auth=(GRAYLOG_TOKEN, 'token'),
+            headers={"Accept": "application/json", "X-Requested-By": f"sentinel-{self.version}"})
+        self.ha = pool.Backend(
+            "ha", "HA", read_timeout=15,
+            headers={"Authorization": f"Bearer {HA_TOKEN}", "Content-Type": "application/json"})
+        self.ollama = pool.Backend("ollama", "OLLAMA", pool_size=max(2, OLLAMA_PARALLEL), read_timeout=180, idempotent=False)
         print(f"--- Sentinel v{self.version} Initiated ---")
 
+    def collect_metrics(self):
+        """Pool, cache and rule counters for the /metrics scrape."""
+        families = [("sentinel_http_" + field + "_total", "counter", f"HTTP {field.replace('_', ' ')} per backend",
+                     [({"backend": b.name}, b.stats.snapshot()[field]) for b in pool.backends()])
+                    for field in pool.PoolStats.FIELDS]
+        if self.verdicts is not None:
+            families.append(("sentinel_cache_events_total", "counter", "Verdict cache lookups and removals",
+                             [({"event": e}, getattr(self.verdicts, e)) for e in ("hits", "misses", "evictions", "expired")]))
+        if self.rules:
+            families.append(("sentinel_rule_hits_total", "counter", "Messages claimed per rule",
+                             [({"rule": k}, v) for k, v in self.rules.hits.items()]))
+            families.append(("sentinel_rule_batches_total", "counter", "Wi-Fi batches by rule engine outcome",
+                             [({"outcome": k}, v) for k, v in self.rules.outcomes.items()]))
+        families.append(("sentinel_checkpoint_skipped_total", "counter", "Re-fetched messages dropped as already analyzed",
+                         [({"stream": k}, c.skipped) for k, c in self.checkpoints.items()]))
+        families.append(("sentinel_inference_queue_depth", "gauge", "Inference jobs waiting for a worker",
+                         [({}, self.inference.depth())]))
+        families.append(("sentinel_inference_busy_workers", "gauge", "Inference workers running a job",
+                         [({}, self.inference.busy)]))
+        families.append(("sentinel_schedule_interval_seconds", "gauge", "Current adaptive interval per audit",
+                         [({"audit": k}, s.interval) for k, s in self.schedules.items()]))
+        families.append(("sentinel_schedule_overruns_total", "counter", "Audits that overran their slot",
+                         [({"audit": k}, s.overruns) for k, s in self.schedules.items()]))
+        return families
+
     def safe_json(self, response, source_name):
         """Safely parses JSON and prints raw text if it fails."""
         try:
@@ -56,102 +187,252 @@ class RestoredSentinel:
     def push_to_ha(self, title, message, tag):
         if not HA_URL or not HA_TOKEN: return 
         url = f"{HA_URL}/api/services/persistent_notification/create"
-        headers = {"Authorization": f"Bearer {HA_TOKEN}", "Content-Type": "application/json"}
         payload = {"title": title, "message": message, "notification_id": f"sentinel_{tag}_alert"}
         try:
-            resp = requests.post(url, headers=headers, json=payload, timeout=10)
-            with open(HA_LOG, "a") as f:
-                f.write(f"[{datetime.now()}] [HA_PUSH] [{tag.upper()}] {title} | Status: {resp.status_code}\n")
+            resp = self.ha.post(url, json=payload)
+            self.ha_log.write(f"[{datetime.now()}] [HA_PUSH] [{tag.upper()}] {title} | Status: {resp.status_code}\n",
+                              event="ha_push", tag=tag, title=title, status_code=resp.status_code)
         except Exception as e:
             print(f"HA Push Error: {e}")
 
+    def dismiss_ha(self, tag):
+        if not HA_URL or not HA_TOKEN: return
+        url = f"{HA_URL}/api/services/persistent_notification/dismiss"
+        try:
+            resp = self.ha.post(url, json={"notification_id": f"sentinel_{tag}_alert"})
+            self.ha_log.write(f"[{datetime.now()}] [HA_DISMISS] [{tag.upper()}] Status: {resp.status_code}\n",
+                              event="ha_dismiss", tag=tag, status_code=resp.status_code)
+        except Exception as e:
+            print(f"HA Dismiss Error: {e}")
+
+    def notice_loop(self):
+        while True:
+            fn, args = self.notices.get()
+            fn(*args)
+
+    def notify(self, title, message, tag):
+        """Queue an HA alert push (see notice_loop)."""
+        self.notices.put((self.push_to_ha, (title, message, tag)))
+
     def get_zigbee_states(self):
+        with metrics.timer("ha_states"):
+            return self._zigbee_states()
+
+    def _zigbee_states(self):
+        if self.ha_feed:
+            states = self.ha_feed.states()
+            if states is not None:
+                return states
+            # Websocket not (yet) synced: fall back to one REST poll
         url = f"{HA_URL}/api/states"
-        headers = {"Authorization": f"Bearer {HA_TOKEN}", "Content-Type": "application/json"}
         try:
-            resp = requests.get(url, headers=headers, timeout=15)
+            resp = self.ha.get(url)
             data = self.safe_json(resp, "HA States")
             if isinstance(data, list):
-                return [s for s in data if 'linkquality' in s['entity_id'] or 'zigbee' in s['entity_id'].lower()]
+                return [s for s in data if zigbee.is_zigbee(s['entity_id'])]
             return []
         except Exception as e:
             print(f"Zigbee Pull Error: {e}")
             return []
 
-    def analyze_stability(self, data, mesh_mode=False):
-        if mesh_mode:
-            system_role = "You are a Zigbee Mesh Expert. Analyze states for 'unavailable' nodes. Format: SCORE: [1-10], STATUS: [ZIGBEE_ISSUES/OK], SUMMARY: [Text]"
+    def analyze_stability(self, data, profile="wifi", on_verdict=None, priority=0, miner=None):
+        """Verdict text for data under a PROFILES entry. on_verdict(score,
+        status) fires as soon as a streamed reply's STATUS is known (not
+        for cached verdicts). priority orders the Ollama calls."""
+        with metrics.timer("prompt_build"):
+            system_role, prompt, statuses = self.build_prompt(data, profile, miner)
+
+        windows = budget.plan(system_role, prompt, OLLAMA_NUM_CTX)
+        if len(windows) == 1:
+            return self.infer(system_role, prompt, statuses, on_verdict, priority)
+        print(f"[{datetime.now()}] Prompt exceeds num_ctx {OLLAMA_NUM_CTX}: analyzing {len(windows)} windows")
+        results = budget.map_windows(lambda w: self.infer(system_role, w, statuses, on_verdict, priority),
+                                     windows, OLLAMA_PARALLEL)
+        return verdict.reduce(results, statuses=statuses)
+
+    def build_prompt(self, data, profile="wifi", miner=None):
+        """(system_role, prompt, statuses) for a Zigbee state list or a Graylog batch."""
+        spec = PROFILES[profile]
+        system_role, statuses = spec["system"], spec["statuses"]
+        if profile == "zigbee":
             prompt = "\n".join([f"{i['entity_id']}: {i['state']}" for i in data])
+        elif miner is not None:
+            system_role += " " + templates.PROMPT_NOTE
+            prompt = miner.summarize((l['message']['timestamp'], l['message']['message']) for l in data)
         else:
-            system_role = "You are an RF Engineer. Analyze logs for Wi-Fi flapping. Format: SCORE: [1-10], STATUS: [RF_INTERFERENCE/OK], SUMMARY: [Text]"
             prompt = "\n".join([f"[{l['message']['timestamp']}] {l['message']['message']}" for l in data])
+        return system_role, prompt, statuses
 
-        payload = {
-            "model": OLLAMA_MODEL, "system": system_role, "prompt": prompt,
-            "stream": False, "options": {"num_ctx": OLLAMA_NUM_CTX}
-        }
-        
-        try:
-            res = requests.post(OLLAMA_URL, json=payload, timeout=180)
-            json_res = self.safe_json(res, "Ollama AI")
-            return json_res.get('response', 'Inference Failure')
-        except Exception as e:
-            return f"SCORE: 0\nSTATUS: ERROR\nSUMMARY: Analysis Exception: {e}"
+    def infer(self, system_role, prompt, statuses=None, on_verdict=None, priority=0):
+        key = None
+        if self.verdicts is not None:
+            key = llm_cache.cache_key(OLLAMA_MODEL, system_role, prompt)
+            cached = self.verdicts.get(key)
+            if cached is not None:
+                metrics.inc("sentinel_verdict_source_total", source="cache")
+                return cached
+        result = self.ollama_generate(system_role, prompt, statuses, on_verdict, priority)
+        if key and not verdict.failed(result):
+            self.verdicts.put(key, result)
+        return result
+
+    def ollama_generate(self, system_role, prompt, statuses=None, on_verdict=None, priority=0):
+        """Queue one generate call for the shared inference workers and wait for it."""
+        payload = ollama.payload(OLLAMA_MODEL, system_role, prompt, OLLAMA_NUM_CTX, statuses)
+        text = self.inference.run(priority, self._generate, payload, on_verdict, time.perf_counter())
+        metrics.inc("sentinel_verdict_source_total", source="llm")
+        return text or 'Inference Failure'
+
+    def _generate(self, payload, on_verdict, queued):
+        # Runs on an inference worker
+        metrics.observe("sentinel_stage_seconds", time.perf_counter() - queued, stage="ollama_queue")
+        with metrics.timer("ollama"):
+            text, stats = ollama.generate(self.ollama.post, OLLAMA_URL, payload, on_verdict)
+        metrics.record_ollama(stats)
+        return text
+
+    def early_alert(self, title, tag, alert_status):
+        """on_verdict callback that queues the HA alert as soon as STATUS is
+        known; .fired tells settle_alert() to follow it up."""
+        def on_verdict(score, status):
+            if status == alert_status and not on_verdict.fired:
+                on_verdict.fired = True
+                self.notify(title, f"SCORE: {score}\nSTATUS: {status}\nSUMMARY: (analysis still running)", tag)
+        on_verdict.fired = False
+        return on_verdict
+
+    def settle_alert(self, early, title, tag, alert_status, text, standing=None):
+        """Follow up an audit's verdict under tag (same notification_id):
+        push it if it is an alert. If only the early alert fired, put back
+        standing (an alert already raised under tag this audit) or dismiss
+        the "analysis still running" notice. True if text is an alert."""
+        if alert_status in text:
+            self.notify(title, text, tag)
+            return True
+        if early.fired:
+            if standing:
+                self.notify(title, standing, tag)
+            else:
+                self.notices.put((self.dismiss_ha, (tag,)))
+        return False
 
     def run(self):
         self.push_to_ha("Sentinel Online", f"v{self.version} started.", "system")
+        metrics.add_collector(self.collect_metrics)
+        metrics.serve()
+        # Each audit loops on its own thread, so a slow inference on one
+        # stream no longer delays the others; Ollama work meets in the queue
+        audits = [("zigbee", ZIGBEE_INTERVAL, self.zigbee_audit)]
+        audits += [(s.name, s.interval, partial(self.stream_audit, s)) for s in self.streams]
+        for name, interval, audit in audits:
+            if interval > 0:
+                threading.Thread(target=self.audit_loop, args=(name, interval, audit),
+                                 name=f"{name}-audit", daemon=True).start()
+
+        stats_every = INTERVAL * POOL_STATS_EVERY
+        while True:
+            time.sleep(stats_every or 3600)
+            if stats_every:
+                print(f"[{datetime.now()}] [POOL] last {stats_every}s: {pool.stats_line() or 'no requests'}")
+                if self.verdicts is not None:
+                    print(f"[{datetime.now()}] [CACHE] {self.verdicts.stats_line()}")
+                if self.rules:
+                    print(f"[{datetime.now()}] [RULES] {self.rules.stats_line()}")
+
+    def audit_loop(self, name, interval, audit):
+        """Run audit on a deadline schedule whose interval follows the
+        outcome it returns (schedule.QUIET / ACTIVE / ALERT)."""
+        sched = self.schedules[name] = schedule.Schedule(interval)
         while True:
+            sched.wait()
+            start = time.perf_counter()
+            outcome = None
             try:
-                # 1. Zigbee Audit
-                z_data = self.get_zigbee_states()
-                if z_data:
-                    z_analysis = self.analyze_stability(z_data, mesh_mode=True)
-                    with open(ZIGBEE_LOG, "a") as f:
-                        f.write(f"\n[{datetime.now()}] [ZIGBEE_AUDIT]\n{z_analysis}\n---\n")
-                    if "ZIGBEE_ISSUES" in z_analysis:
-                        self.push_to_ha("🚨 Zigbee Mesh Alert", z_analysis, "zigbee")
-
-                # 2. Wi-Fi Graylog Audit (HEADERS FIXED HERE)
-                since = self.get_last_ts()
-                params = {"query": f"streams:{STREAM_ID}", "from": since, "to": datetime.now(timezone.utc).isoformat(), "fields": "message,timestamp", "sort": "timestamp:asc"}
-                
-                # --- THE FIX ---
-                headers = {"Accept": "application/json", "X-Requested-By": f"sentinel-{self.version}"}
-                
-                resp = requests.get(f"{GRAYLOG_URL}/search/universal/absolute", 
-                                   params=params, 
-                                   auth=(GRAYLOG_TOKEN, 'token'), 
-                                   headers=headers, # <--- Headers restored
-                                   timeout=30)
-                
-                if resp.status_code == 200:
-                    msgs = self.safe_json(resp, "Graylog Search").get('messages', [])
-                    if msgs:
-                        w_analysis = self.analyze_stability(msgs, mesh_mode=False)
-                        with open(WIFI_LOG, "a") as f:
-                            f.write(f"\n[{datetime.now()}] [WIFI_AUDIT]\n{w_analysis}\n---\n")
-                        if "RF_INTERFERENCE" in w_analysis:
-                            self.push_to_ha("🚨 Wi-Fi Stability Alert", w_analysis, "wifi")
-                        with open(STATE_FILE, "w") as f: f.write(msgs[-1]['message']['timestamp'])
-                    else:
-                        self.handle_heartbeat()
-                else:
-                    print(f"Graylog API Error: {resp.status_code}")
-                
+                outcome = audit()
             except Exception as e:
-                print(f"Critical Loop Error: {e}")
-            
-            time.sleep(INTERVAL)
+                print(f"Critical Loop Error [{name}]: {e}")
+            metrics.observe("sentinel_audit_seconds", time.perf_counter() - start, audit=name)
+            before = sched.interval
+            sched.advance(outcome)
+            if sched.interval != before:
+                print(f"[{datetime.now()}] [SCHEDULE] {name}: {outcome or 'error'}, next audits every {sched.interval:.0f}s")
+
+    def zigbee_audit(self):
+        z_data = self.get_zigbee_states()
+        if not z_data:
+            return schedule.QUIET
+        digest, z_analysis = self.mesh.lookup(z_data)
+        if z_analysis is not None:
+            # No node dropped or changed LQI band: last verdict stands. Only
+            # REST polling backs off while the mesh is steady; reading the
+            # websocket model is free, so it keeps drops visible within ~1 interval
+            return schedule.ACTIVE if self.ha_feed else schedule.QUIET
+        early = self.early_alert("🚨 Zigbee Mesh Alert", "zigbee", "ZIGBEE_ISSUES")
+        z_analysis = self.analyze_stability(z_data, "zigbee", priority=ZIGBEE_PRIORITY, on_verdict=early)
+        if not verdict.failed(z_analysis):
+            self.mesh.remember(digest, z_analysis)
+        with metrics.timer("audit_write"):
+            self.zigbee_log.write(f"\n[{datetime.now()}] [ZIGBEE_AUDIT]\n{z_analysis}\n---\n",
+                                  event="zigbee_audit", entities=len(z_data), **verdict.parse(z_analysis))
+        if self.settle_alert(early, "🚨 Zigbee Mesh Alert", "zigbee", "ZIGBEE_ISSUES", z_analysis):
+            return schedule.ALERT
+        return schedule.ACTIVE
+
+    def stream_audit(self, stream):
+        """Analyze everything on stream since its checkpoint in
+        GRAYLOG_BATCH_SIZE batches.
+
+        Pages are fetched lazily, so at most one page plus one batch is in
+        memory; the checkpoint advances after each analyzed batch.
+        """
+        spec = PROFILES[stream.profile]
+        alert_status = spec["statuses"][0]
+        use_rules = self.rules if spec.get("rules") else None
+        cp, log, miner = self.checkpoints[stream.name], self.stream_logs[stream.name], self.miners[stream.name]
+        since = self.get_last_ts(stream)
+        until = datetime.now(timezone.utc).isoformat()
+        msgs = cp.fresh(graylog.iter_messages(
+            metrics.timed("graylog_fetch", self.graylog.get), GRAYLOG_URL, stream.stream_id, since, until))
+        batches = alerts = 0
+        standing = None
+        try:
+            for batch in graylog.batched(msgs):
+                batches += 1
+                with metrics.timer("rules"):
+                    outcome, w_analysis = use_rules.classify(batch) if use_rules else ("llm", None)
+                early = self.early_alert(spec["title"], stream.name, alert_status)
+                if outcome == "llm":
+                    w_analysis = self.analyze_stability(
+                        batch, stream.profile, priority=stream.priority, miner=miner, on_verdict=early)
+                source = "LLM" if outcome == "llm" else "RULES"
+                if outcome != "llm":
+                    metrics.inc("sentinel_verdict_source_total", source="rules")
+                with metrics.timer("audit_write"):
+                    log.write(f"\n[{datetime.now()}] [{stream.name.upper()}_AUDIT] [{source}] ({len(batch)} msgs)\n{w_analysis}\n---\n",
+                              event=f"{stream.name}_audit", source=source.lower(), messages=len(batch),
+                              first=batch[0]['message']['timestamp'], last=batch[-1]['message']['timestamp'],
+                              **verdict.parse(w_analysis))
+                if self.settle_alert(early, spec["title"], stream.name, alert_status, w_analysis, standing):
+                    standing = w_analysis
+                    alerts += 1
+                cp.advance(batch)
+                if miner is not None:
+                    miner.save()
+        except graylog.GraylogError as e:
+            print(e)
+            return None
+        if not batches:
+            self.handle_heartbeat()
+            return schedule.QUIET
+        return schedule.ALERT if alerts else schedule.ACTIVE
 
     def handle_heartbeat(self):
         if datetime.now() - self.last_heartbeat > timedelta(hours=4):
             self.push_to_ha("Sentinel Pulse", "System running.", "pulse")
             self.last_heartbeat = datetime.now()
 
-    def get_last_ts(self):
-        if os.path.exists(STATE_FILE):
-            with open(STATE_FILE, "r") as f: return f.read().strip()
-        return (datetime.now(timezone.utc) - timedelta(minutes=10)).isoformat()
+    def get_last_ts(self, stream):
+        return self.checkpoints[stream.name].since()
 
 if __name__ == "__main__":
     RestoredSentinel().run()
\ No newline at end of file
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Stand-in Home Assistant for the Sentinel's websocket mode.
+
+Serves a synthetic install (default 3000 entities, 40 of them Zigbee) on
+one port:
+
+  GET /api/states        the full state list, like the REST API
+  GET /api/websocket     auth, subscribe_events(state_changed), get_states,
+                         then a stream of random state_changed events
+  POST /api/services/... accepted and ignored (alert pushes)
+
+Default mode is a self-check: it runs sentinel.hass_ws.HAMeshFeed against
+the stand-in and verifies that
+
+  1. the feed syncs and holds exactly the Zigbee entities
+  2. after a burst of events (incl. nodes going unavailable and a removed
+     entity) the model matches the stand-in's own state
+  3. after the server drops the connection the feed reconnects and resyncs
+
+and reports bytes received vs polling /api/states once per audit.
+Exits non-zero if any check fails.
+
+Usage:
+  python3 bench/ha_standin.py                     # self-check
+  python3 bench/ha_standin.py --serve -p 8123     # for HOME_ASSISTANT_URL=http://127.0.0.1:8123
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from sentinel import hass_ws, zigbee  # noqa: E402
+from sentinel.hass_ws import OP_CLOSE, OP_PING, OP_TEXT, WebSocketClosed, encode_frame, read_frame  # noqa: E402
+
+
+def synthetic_states(entities, zigbee_nodes, rng):
+    states = {}
+    for i in range(zigbee_nodes):
+        eid = f"sensor.zigbee_node_{i:03d}_linkquality"
+        states[eid] = {"entity_id": eid, "state": str(rng.randint(40, 255)), "attributes": {"unit_of_measurement": "lqi"}}
+    for i in range(entities - zigbee_nodes):
+        domain = rng.choice(["sensor", "binary_sensor", "light", "switch", "automation"])
+        eid = f"{domain}.thing_{i:05d}"
+        states[eid] = {"entity_id": eid, "state": rng.choice(["on", "off", "12.5", "idle"]),
+                       "attributes": {"friendly_name": f"Thing {i}", "icon": "mdi:flash"}}
+    return states
+
+
+class StandInHA:
+    def __init__(self, entities, zigbee_nodes, seed=1):
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.states = synthetic_states(entities, zigbee_nodes, self.rng)
+        self.clients = set()
+        self.ws_bytes = 0
+        self.rest_bytes = 0
+        self.server = None
+
+    # --- state changes -------------------------------------------------
+    def mutate(self, entity_id=None, new_state=None, remove=False):
+        with self.lock:
+            eid = entity_id or self.rng.choice(list(self.states))
+            old = self.states.get(eid)
+            if remove:
+                new = None
+                self.states.pop(eid, None)
+            else:
+                if new_state is None:
+                    if zigbee.is_zigbee(eid):
+                        new_state = self.rng.choice(["unavailable", str(self.rng.randint(0, 255))])
+                    else:
+                        new_state = self.rng.choice(["on", "off"])
+                new = dict(old or {"entity_id": eid, "attributes": {}}, state=new_state)
+                self.states[eid] = new
+            event = {"type": "event", "event": {"event_type": "state_changed",
+                                                "data": {"entity_id": eid, "old_state": old, "new_state": new}}}
+            clients = list(self.clients)
+        for send in clients:
+            send(event)
+
+    def drop_clients(self):
+        with self.lock:
+            clients = list(self.clients)
+        for send in clients:
+            send(None)
+
+    def zigbee_truth(self):
+        with self.lock:
+            return {eid: s["state"] for eid, s in self.states.items() if zigbee.is_zigbee(eid)}
+
+    # --- server -------------------------------------------------------
+    def start(self, port=0):
+        ha = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                if self.path == "/api/websocket" and self.headers.get("Upgrade", "").lower() == "websocket":
+                    return self.websocket()
+                if self.path == "/api/states":
+                    with ha.lock:
+                        body = json.dumps(list(ha.states.values())).encode()
+                    ha.rest_bytes += len(body)
+                    return self.reply(200, body)
+                self.reply(404, b'{"message": "not found"}')
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                self.reply(200, b"[]")
+
+            def reply(self, code, body):
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def websocket(self):
+                self.send_response(101)
+                self.send_header("Upgrade", "websocket")
+                self.send_header("Connection", "Upgrade")
+                self.send_header("Sec-WebSocket-Accept", hass_ws.accept_key(self.headers["Sec-WebSocket-Key"]))
+                self.end_headers()
+                self.wfile.flush()
+                self.close_connection = True
+                send_lock = threading.Lock()
+
+                def send(obj):
+                    frame = encode_frame(OP_CLOSE, b"", mask=False) if obj is None else \
+                        encode_frame(OP_TEXT, json.dumps(obj).encode(), mask=False)
+                    with send_lock:
+                        try:
+                            self.connection.sendall(frame)
+                            ha.ws_bytes += len(frame)
+                        except OSError:
+                            pass
+
+                def recv():
+                    while True:
+                        _, opcode, payload = read_frame(self.rfile)
+                        if opcode == OP_CLOSE:
+                            raise WebSocketClosed("client closed")
+                        if opcode == OP_TEXT:
+                            return json.loads(payload)
+
+                try:
+                    send({"type": "auth_required", "ha_version": "standin"})
+                    if recv().get("access_token") != "standin":
+                        return send({"type": "auth_invalid", "message": "bad token"})
+                    send({"type": "auth_ok", "ha_version": "standin"})
+                    # Exercise the client's ping handling once per session
+                    with send_lock:
+                        self.connection.sendall(encode_frame(OP_PING, b"hi", mask=False))
+                    while True:
+                        msg = recv()
+                        if msg["type"] == "subscribe_events":
+                            with ha.lock:
+                                ha.clients.add(send)
+                            send({"id": msg["id"], "type": "result", "success": True, "result": None})
+                        elif msg["type"] == "get_states":
+                            with ha.lock:
+                                result = list(ha.states.values())
+                            send({"id": msg["id"], "type": "result", "success": True, "result": result})
+                except (OSError, ValueError, WebSocketClosed):
+                    pass
+                finally:
+                    with ha.lock:
+                        ha.clients.discard(send)
+
+            def log_message(self, fmt, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{self.server.server_port}"
+
+
+def check(label, ok, detail):
+    print(f"  [{'PASS' if ok else 'FAIL'}] {label}: {detail}")
+    return ok
+
+
+def wait_for(cond, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if cond():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def model(feed):
+    return {s["entity_id"]: s["state"] for s in feed.states() or []}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-e", "--entities", type=int, default=3000, help="total entities (default 3000)")
+    parser.add_argument("-z", "--zigbee", type=int, default=40, help="Zigbee entities among them (default 40)")
+    parser.add_argument("-n", "--events", type=int, default=5000, help="state_changed events in the burst")
+    parser.add_argument("--serve", action="store_true", help="just serve, emitting --rate events/s")
+    parser.add_argument("-p", "--port", type=int, default=0)
+    parser.add_argument("--rate", type=float, default=5.0)
+    args = parser.parse_args()
+
+    ha = StandInHA(args.entities, args.zigbee)
+    url = ha.start(args.port)
+
+    if args.serve:
+        print(f"Stand-in HA on {url} (token: standin), {args.rate} events/s — Ctrl-C to stop")
+        try:
+            while True:
+                time.sleep(1 / args.rate)
+                ha.mutate()
+        except KeyboardInterrupt:
+            return
+
+    print(f"HA stand-in: {args.entities} entities, {args.zigbee} Zigbee, {args.events} events")
+    feed = hass_ws.HAMeshFeed(url, "standin", zigbee.is_zigbee).start()
+    ok = check("initial sync", wait_for(lambda: model(feed) == ha.zigbee_truth()),
+               f"{len(model(feed))} entities in model")
+
+    node = next(iter(ha.zigbee_truth()))
+    ha.mutate(node, "unavailable")
+    ha.mutate(list(ha.zigbee_truth())[-1], remove=True)
+    for _ in range(args.events):
+        ha.mutate()
+    ok &= check("after event burst", wait_for(lambda: model(feed) == ha.zigbee_truth()),
+                f"{feed.events_applied}/{feed.events_seen} events applied, {node}={model(feed).get(node)}")
+
+    ha.drop_clients()
+    wait_for(lambda: not feed.ready.is_set(), 2)
+    ha.mutate(node, "77")
+    ok &= check("reconnect + resync", wait_for(lambda: model(feed).get(node) == "77", 10),
+                f"{feed.reconnects} reconnect(s)")
+    feed.stop()
+
+    rest_once = len(json.dumps(list(ha.states.values())))
+    print(f"  websocket: {ha.ws_bytes / 1e6:.2f} MB total for 2 snapshots + {args.events} events; "
+          f"REST: {rest_once / 1e6:.2f} MB per /api/states poll")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Offline replay of the Sentinel agents against the stand-ins.
+
+Starts bench/standins.py in a subprocess, so its message set and servers
+don't count towards this process's memory. Then it imports agent.py or
+agent-graylog-all.py, pointed at the stand-ins, with every output file in
+a temporary directory. It replays --cycles polling cycles. Each cycle:
+
+  1. releases the next share of messages in the stand-in Graylog
+     (and makes --ha-changes random Zigbee state changes)
+  2. runs one pass of every audit: Zigbee plus each Graylog stream,
+     concurrently, for agent.py; or one poll() for agent-graylog-all.py.
+     The adaptive schedules are not used; cycles run back to back.
+
+Reported: end-to-end messages/s (released messages / time spent in
+cycles), cycle latency (p50 / p95 / max), peak RSS of this process, the
+stand-ins' Graylog and Ollama counters, and the agent's pool, cache and
+rule stats. The run fails (exit 1) if the final checkpoint doesn't reach
+the last released message of its stream.
+
+Usage:
+  python3 bench/replay.py                                  # agent.py, 20000 msgs, 10 cycles
+  python3 bench/replay.py --agent all -n 50000 --cycles 20
+  python3 bench/replay.py --latency 1.5 --token-rate 12    # a slow GPU
+  python3 bench/replay.py --graylog-file saved_search.json --ha-file states.json
+  python3 bench/replay.py --streams streams.example.json   # multi-stream, shared queue
+Stand-in options (--latency, --prefill-rate, --token-rate, --reply-tokens,
+--alert-rate, --flap, --seed, -e, -z) are passed through to standins.py.
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+AGENT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, AGENT_DIR)
+
+PASSTHROUGH = ("latency", "prefill_rate", "token_rate", "reply_tokens", "alert_rate", "flap", "seed", "entities", "zigbee")
+
+
+def rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+
+
+def call(url, body=None):
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(req, timeout=30) as resp:
+        return json.loads(resp.read())
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def start_standins(args, stream_ids):
+    cmd = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "standins.py"), "--serve",
+           "-n", str(args.messages), "--streams", ",".join(stream_ids)]
+    for name in PASSTHROUGH:
+        cmd += [f"--{name.replace('_', '-')}", str(getattr(args, name))]
+    if args.graylog_file:
+        cmd += ["--graylog-file", args.graylog_file]
+    if args.ha_file:
+        cmd += ["--ha-file", args.ha_file]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True)
+    line = proc.stdout.readline()
+    if not line:
+        proc.wait()
+        sys.exit(f"stand-ins failed to start (exit {proc.returncode})")
+    return proc, json.loads(line)
+
+
+def load_module(filename, name):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(AGENT_DIR, filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def redirect(module, out):
+    """Point the module's /app/output paths at out."""
+    for attr, value in list(vars(module).items()):
+        if attr.isupper() and isinstance(value, str) and value.startswith("/app/output"):
+            setattr(module, attr, value.replace("/app/output", out, 1))
+
+
+def sentinel_runner(out, args):
+    agent = load_module("agent.py", "agent")
+    redirect(agent, out)
+    sentinel = agent.RestoredSentinel()
+    audits = [sentinel.zigbee_audit] if args.zigbee and not args.no_zigbee else []
+    audits += [lambda s=s: sentinel.stream_audit(s) for s in sentinel.streams]
+
+    def cycle():
+        threads = [threading.Thread(target=audit) for audit in audits]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    def checkpoints():
+        return {s.stream_id: sentinel.checkpoints[s.name].timestamp for s in sentinel.streams}
+
+    def report():
+        from sentinel import pool
+        print(f"  pool:   {pool.stats_line() or 'no requests'}")
+        if sentinel.verdicts is not None:
+            print(f"  cache:  {sentinel.verdicts.stats_line()}")
+        if sentinel.rules:
+            print(f"  rules:  {sentinel.rules.stats_line()}")
+    return cycle, checkpoints, report
+
+
+def all_runner(out, args):
+    agent = load_module("agent-graylog-all.py", "agent_graylog_all")
+    redirect(agent, out)
+    from sentinel import auditlog, checkpoint
+    agent.OUTPUT = auditlog.AuditWriter(agent.OUTPUT_FILE)
+    agent.CHECKPOINT = checkpoint.Checkpoint(agent.STATE_FILE)
+    import requests
+    session = requests.Session()
+
+    def cycle():
+        agent.poll(lambda url, params: session.get(url, params=params, timeout=30))
+
+    def report():
+        if agent.VERDICTS is not None:
+            print(f"  cache:  {agent.VERDICTS.stats_line()}")
+    return cycle, lambda: {agent.STREAM_ID: agent.CHECKPOINT.timestamp}, report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--agent", choices=("sentinel", "all"), default="sentinel",
+                        help="agent.py (default) or agent-graylog-all.py")
+    parser.add_argument("-n", "--messages", type=int, default=20000, help="synthetic messages (default 20000)")
+    parser.add_argument("--cycles", type=int, default=10)
+    parser.add_argument("--ha-changes", type=int, default=2, help="Zigbee state changes per cycle")
+    parser.add_argument("--no-zigbee", action="store_true", help="skip the Zigbee audit")
+    parser.add_argument("--streams", help="streams file for agent.py (default: one stream)")
+    parser.add_argument("--graylog-file")
+    parser.add_argument("--ha-file")
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--prefill-rate", type=float, default=2000.0)
+    parser.add_argument("--token-rate", type=float, default=40.0)
+    parser.add_argument("--reply-tokens", type=int, default=60)
+    parser.add_argument("--alert-rate", type=float, default=0.1)
+    parser.add_argument("--flap", type=float, default=0.4)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("-e", "--entities", type=int, default=500)
+    parser.add_argument("-z", "--zigbee", type=int, default=40)
+    parser.add_argument("--keep", action="store_true", help="keep the output directory")
+    args = parser.parse_args()
+
+    stream_ids = ["bench"]
+    if args.streams:
+        if args.agent != "sentinel":
+            parser.error("--streams only applies to agent.py")
+        with open(args.streams) as f:
+            stream_ids = [s["stream_id"] for s in json.load(f)]
+
+    proc, urls = start_standins(args, stream_ids)
+    out = tempfile.mkdtemp(prefix="sentinel-replay-")
+    try:
+        os.environ.update({
+            "GRAYLOG_API_URL": urls["graylog"], "GRAYLOG_API_TOKEN": "bench", "GRAYLOG_STREAM_ID": "bench",
+            "GRAYLOG_STREAMS_FILE": args.streams or os.path.join(out, "no-streams.json"),
+            "OLLAMA_API_URL": urls["ollama"], "HOME_ASSISTANT_URL": urls["ha"], "HA_ACCESS_TOKEN": "standin",
+            "LLM_CACHE_PATH": os.path.join(out, "verdict_cache.sqlite"),
+            "LOG_TEMPLATE_STATE": os.path.join(out, "log_templates.json"),
+            "METRICS_PORT": "0",
+            # Fresh checkpoints must reach back past the first replayed message
+            "CHECKPOINT_LOOKBACK_MINUTES": str(10 * 365 * 24 * 60),
+        })
+
+        base_rss = rss_mb()
+        runner = sentinel_runner if args.agent == "sentinel" else all_runner
+        cycle, checkpoints, report = runner(out, args)
+        total = urls["messages"]
+        per_cycle = -(-total // max(1, args.cycles))
+        print(f"Replay: {args.agent}, {total} messages over {args.cycles} cycles, Ollama stand-in "
+              f"{args.latency}s + {args.prefill_rate:.0f} tok/s prefill + {args.token_rate:.0f} tok/s decode")
+
+        latencies, released = [], None
+        for i in range(args.cycles):
+            released = call(urls["control"] + "/bench/release", {"count": per_cycle})
+            call(urls["control"] + "/bench/mutate", {"count": args.ha_changes})
+            start = time.perf_counter()
+            cycle()
+            latencies.append(time.perf_counter() - start)
+            print(f"  cycle {i + 1:>3}: {latencies[-1]:7.2f}s  released {released['released']}/{released['total']}")
+
+        from sentinel import auditlog
+        auditlog.flush_all()
+        stats = call(urls["control"] + "/bench/stats")
+        elapsed = sum(latencies)
+        print(f"\n  messages/s:     {released['released'] / elapsed:,.0f} ({released['released']} in {elapsed:.1f}s)")
+        print(f"  cycle latency:  p50 {percentile(latencies, 50):.2f}s  p95 {percentile(latencies, 95):.2f}s  "
+              f"max {max(latencies):.2f}s")
+        print(f"  peak RSS:       {rss_mb():.1f} MB (baseline {base_rss:.1f} MB before the agent loaded)")
+        print(f"  graylog:        {stats['graylog_pages']} pages, {stats['graylog_messages_served']} messages served")
+        print(f"  ollama:         {stats['ollama_requests']} requests, {stats['ollama_prompt_tokens']} prompt tokens, "
+              f"{stats['ollama_reply_tokens']} reply tokens")
+        report()
+
+        reached, expected = checkpoints(), released["last_timestamps"]
+        ok = all(reached.get(stream) == ts for stream, ts in expected.items())
+        print(f"  [{'PASS' if ok else 'FAIL'}] checkpoints reached the last released message of every stream: {reached}")
+        sys.exit(0 if ok else 1)
+    finally:
+        proc.terminate()
+        if args.keep:
+            print(f"  output kept in {out}")
+        else:
+            import shutil
+            shutil.rmtree(out, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
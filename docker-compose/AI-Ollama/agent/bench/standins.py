@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Stand-in Graylog, Home Assistant and Ollama servers for offline replay.
+
+  Graylog  GET .../search/universal/absolute with from/to/limit/offset and
+           query=streams:<id>, over a message set that is released a slice
+           at a time (recorded or synthetic)
+  HA       the StandInHA from ha_standin.py: synthetic states or a recorded
+           /api/states dump
+  Ollama   POST /api/generate, streaming or not. It sleeps
+           latency + prompt tokens / prefill rate + reply tokens / token
+           rate, and reports those durations in the final chunk like the
+           real server. STATUS is the alert status from the system prompt
+           in --alert-rate of replies, otherwise OK. Text replies come
+           either one field per line or on the single line the prompts
+           ask for ("SCORE: 8, STATUS: X, SUMMARY: ..."), picked at random.
+
+Control endpoints (on the Graylog port), used by bench/replay.py:
+
+  POST /bench/release  {"count": n}   make the next n messages searchable
+  POST /bench/mutate   {"count": n}   n random Zigbee state changes in HA
+  GET  /bench/stats                   request and token counters
+
+Recorded input:
+  --graylog-file  a saved search response ({"messages": [...]}) or JSON lines
+                  of {"message": {...}} / {"timestamp", "message"} objects.
+  --ha-file       a saved /api/states list.
+Timestamps are shifted so the last message lands a minute before "now"
+while keeping their spacing, so the agents' `to=now` still covers them.
+
+Usage:
+  python3 bench/standins.py --serve                 # prints the URLs as JSON
+  python3 bench/standins.py --serve --latency 0.5 --token-rate 20
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.dirname(__file__))
+from ha_standin import StandInHA  # noqa: E402
+from templates import synthetic_logs  # noqa: E402
+
+from sentinel import zigbee  # noqa: E402
+
+_ALERT = re.compile(r"STATUS: \[([A-Z_]+)/OK\]")
+
+
+def _parse_ts(ts):
+    return datetime.fromisoformat(ts.replace("Z", "+00:00"))
+
+
+def _fmt_ts(dt):
+    return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+
+
+def load_messages(path):
+    """Recorded Graylog messages as [{"message": {...}}] oldest first."""
+    with open(path) as f:
+        text = f.read()
+    try:
+        data = json.loads(text)
+        rows = data.get("messages", []) if isinstance(data, dict) else data
+    except ValueError:
+        rows = [json.loads(line) for line in text.splitlines() if line.strip()]
+    msgs = [row if "message" in row and isinstance(row["message"], dict) else {"message": row} for row in rows]
+    return sorted(msgs, key=lambda m: m["message"]["timestamp"])
+
+
+def synthetic_messages(n, flap_share=0.4, seed=1):
+    return [{"message": {"timestamp": ts, "message": text}} for ts, text in synthetic_logs(n, flap_share, seed)]
+
+
+def prepare(msgs, stream_ids, end=None):
+    """Shift timestamps to end a minute before end/now, add _id and round-robin
+    stream ids (where a message has none)."""
+    if not msgs:
+        return msgs
+    end = end or datetime.now(timezone.utc) - timedelta(minutes=1)
+    shift = end - _parse_ts(msgs[-1]["message"]["timestamp"])
+    for i, m in enumerate(msgs):
+        body = m["message"]
+        body["timestamp"] = _fmt_ts(_parse_ts(body["timestamp"]) + shift)
+        body.setdefault("_id", f"bench-{i:08d}")
+        m.setdefault("stream", stream_ids[i % len(stream_ids)])
+    return msgs
+
+
+class StandInGraylog:
+    def __init__(self, messages):
+        self.messages = messages
+        self.released = 0
+        self.lock = threading.Lock()
+        self.pages = 0
+        self.served = 0
+
+    def release(self, count):
+        with self.lock:
+            self.released = min(len(self.messages), self.released + count)
+            last = {m["stream"]: m["message"]["timestamp"] for m in self.messages[:self.released]}
+            return {"released": self.released, "total": len(self.messages), "last_timestamps": last}
+
+    def search(self, params):
+        stream = params["query"].split(":", 1)[1]
+        frm, to = _parse_ts(params["from"]), _parse_ts(params["to"])
+        offset, limit = int(params.get("offset", 0)), int(params.get("limit", 150))
+        with self.lock:
+            visible = self.messages[:self.released]
+        hits = [m for m in visible if m["stream"] == stream and frm <= _parse_ts(m["message"]["timestamp"]) <= to]
+        page = [{"message": m["message"], "index": "graylog_0"} for m in hits[offset:offset + limit]]
+        with self.lock:
+            self.pages += 1
+            self.served += len(page)
+        return {"messages": page, "total_results": len(hits)}
+
+
+class StandInOllama:
+    def __init__(self, latency=0.2, prefill_rate=2000.0, token_rate=40.0, reply_tokens=60, alert_rate=0.1, seed=1):
+        self.latency = latency
+        self.prefill_rate = prefill_rate
+        self.token_rate = token_rate
+        self.reply_tokens = reply_tokens
+        self.alert_rate = alert_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.reply_tokens_total = 0
+
+    def reply(self, body):
+        """(chunks, stats): reply split into per-token chunks, final-chunk stats."""
+        system, prompt = body.get("system", ""), body.get("prompt", "")
+        prompt_tokens = max(1, (len(system) + len(prompt)) // 4)
+        with self.lock:
+            alert = self.rng.random() < self.alert_rate
+            one_line = self.rng.random() < 0.5
+            self.requests += 1
+            self.prompt_tokens += prompt_tokens
+        m = _ALERT.search(system)
+        filler = " ".join(["steady"] * max(1, self.reply_tokens - 8))
+        if m:
+            status = m.group(1) if alert else "OK"
+            score = 8 if alert else 2
+            if "format" in body:
+                text = json.dumps({"score": score, "status": status, "summary": f"Replayed verdict. {filler}"})
+            elif one_line:
+                text = f"SCORE: {score}, STATUS: {status}, SUMMARY: Replayed verdict. {filler}"
+            else:
+                text = f"SCORE: {score}\nSTATUS: {status}\nSUMMARY: Replayed verdict. {filler}"
+        else:
+            # agent-graylog-all.py: NORMAL or a finding
+            text = f"Replayed anomaly: burst of failures. {filler}" if alert else "NORMAL"
+        chunks = re.findall(r"\S+\s*|\s+", text)
+        with self.lock:
+            self.reply_tokens_total += len(chunks)
+        prefill = self.latency + prompt_tokens / self.prefill_rate
+        decode = len(chunks) / self.token_rate
+        stats = {"done": True, "done_reason": "stop", "load_duration": 0,
+                 "prompt_eval_count": prompt_tokens, "prompt_eval_duration": int(prefill * 1e9),
+                 "eval_count": len(chunks), "eval_duration": int(decode * 1e9),
+                 "total_duration": int((prefill + decode) * 1e9)}
+        return chunks, stats
+
+
+def serve(graylog, ha, ollama, port=0):
+    """Graylog, Ollama and the control endpoints on one port, HA on its own. Returns the URLs."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path.endswith("/search/universal/absolute"):
+                params = {k: v[0] for k, v in parse_qs(url.query).items()}
+                return self.reply(200, graylog.search(params))
+            if url.path == "/bench/stats":
+                return self.reply(200, {
+                    "graylog_pages": graylog.pages, "graylog_messages_served": graylog.served,
+                    "ollama_requests": ollama.requests, "ollama_prompt_tokens": ollama.prompt_tokens,
+                    "ollama_reply_tokens": ollama.reply_tokens_total})
+            self.reply(404, {"message": "not found"})
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            path = urlparse(self.path).path
+            if path == "/bench/release":
+                return self.reply(200, graylog.release(int(body.get("count", 0))))
+            if path == "/bench/mutate":
+                nodes = [eid for eid in ha.zigbee_truth()]
+                for _ in range(int(body.get("count", 0)) if nodes else 0):
+                    ha.mutate(ha.rng.choice(nodes))
+                return self.reply(200, {"zigbee": len(nodes)})
+            if path == "/api/generate":
+                return self.generate(body)
+            self.reply(404, {"message": "not found"})
+
+        def generate(self, body):
+            chunks, stats = ollama.reply(body)
+            time.sleep(stats["prompt_eval_duration"] / 1e9)
+            if not body.get("stream", True):
+                time.sleep(stats["eval_duration"] / 1e9)
+                return self.reply(200, {"model": body.get("model"), "response": "".join(chunks), **stats})
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            per_token = 1 / ollama.token_rate
+            for piece in chunks:
+                time.sleep(per_token)
+                self.chunk({"model": body.get("model"), "response": piece, "done": False})
+            self.chunk({"model": body.get("model"), "response": "", **stats})
+            self.wfile.write(b"0\r\n\r\n")
+
+        def chunk(self, obj):
+            data = json.dumps(obj).encode() + b"\n"
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+        def reply(self, code, obj):
+            data = json.dumps(obj).encode()
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, fmt, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    return {"graylog": f"{base}/api", "control": base, "ollama": f"{base}/api/generate", "ha": ha.start()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--serve", action="store_true", help="start the stand-ins and print their URLs as JSON")
+    parser.add_argument("-p", "--port", type=int, default=0, help="Graylog/Ollama/control port")
+    parser.add_argument("-n", "--messages", type=int, default=20000, help="synthetic messages (default 20000)")
+    parser.add_argument("--flap", type=float, default=0.4, help="share of synthetic lines from one flapping client")
+    parser.add_argument("--graylog-file", help="recorded Graylog messages instead of synthetic ones")
+    parser.add_argument("--streams", default="bench", help="comma-separated stream ids messages are spread over")
+    parser.add_argument("--ha-file", help="recorded /api/states dump instead of synthetic states")
+    parser.add_argument("-e", "--entities", type=int, default=500, help="synthetic HA entities")
+    parser.add_argument("-z", "--zigbee", type=int, default=40, help="Zigbee entities among them")
+    parser.add_argument("--latency", type=float, default=0.2, help="Ollama fixed latency per request, s")
+    parser.add_argument("--prefill-rate", type=float, default=2000.0, help="Ollama prompt tokens/s")
+    parser.add_argument("--token-rate", type=float, default=40.0, help="Ollama reply tokens/s")
+    parser.add_argument("--reply-tokens", type=int, default=60, help="Ollama reply length in tokens")
+    parser.add_argument("--alert-rate", type=float, default=0.1, help="share of replies with the alert status")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    if not args.serve:
+        parser.error("nothing to do without --serve (bench/replay.py starts the stand-ins itself)")
+
+    msgs = load_messages(args.graylog_file) if args.graylog_file else synthetic_messages(args.messages, args.flap, args.seed)
+    graylog = StandInGraylog(prepare(msgs, args.streams.split(",")))
+    ha = StandInHA(args.entities, args.zigbee, args.seed)
+    if args.ha_file:
+        with open(args.ha_file) as f:
+            ha.states = {s["entity_id"]: s for s in json.load(f)}
+    ollama = StandInOllama(args.latency, args.prefill_rate, args.token_rate, args.reply_tokens, args.alert_rate, args.seed)
+
+    urls = serve(graylog, ha, ollama, args.port)
+    zigbee_nodes = sum(1 for eid in ha.states if zigbee.is_zigbee(eid))
+    print(json.dumps({**urls, "messages": len(msgs), "zigbee": zigbee_nodes}), flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
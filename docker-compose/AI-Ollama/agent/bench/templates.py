@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark: prompt size with and without log template mining.
+
+Generates Graylog-shaped Wi-Fi syslog (hostapd association churn, dnsmasq
+DHCP, kernel deauth bursts from a flapping client, plus a long tail of
+one-off lines) and builds the Wi-Fi audit prompt two ways:
+
+  raw        one "[timestamp] message" line per message (LOG_TEMPLATES=0)
+  templated  TemplateMiner.summarize(), as the agents do by default
+
+Tokens are estimated at ~4 characters per token, which is close for
+llama-family tokenizers on English-ish log text. Also reported: mining
+throughput, cluster count, and the template state file round-trip.
+
+Usage:
+  python3 bench/templates.py                 # 2000, 10000 and 50000 messages
+  python3 bench/templates.py -n 20000 --flap 0.6
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from sentinel.templates import TemplateMiner  # noqa: E402
+
+
+def _mac(rng):
+    return ":".join(f"{rng.randrange(256):02x}" for _ in range(6))
+
+
+def synthetic_logs(n, flap_share, seed=1):
+    """Return [(timestamp, message)] oldest first."""
+    rng = random.Random(seed)
+    clients = [(_mac(rng), f"192.168.1.{i}", f"host-{i}") for i in range(20, 80)]
+    flapper = clients[0]
+    t = datetime(2026, 10, 18, 8, 0, tzinfo=timezone.utc)
+    out = []
+    for i in range(n):
+        t += timedelta(milliseconds=rng.randint(5, 400))
+        ts = t.strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+        mac, ip, host = flapper if rng.random() < flap_share else rng.choice(clients)
+        radio = rng.choice(["wlan0", "wlan1"])
+        roll = rng.random()
+        if roll < 0.25:
+            msg = f"hostapd: {radio}: STA {mac} IEEE 802.11: associated (aid {rng.randint(1, 40)})"
+        elif roll < 0.45:
+            msg = f"hostapd: {radio}: STA {mac} IEEE 802.11: disassociated"
+        elif roll < 0.60:
+            msg = f"kernel: [{rng.uniform(1e4, 9e4):.6f}] {radio}: deauthenticating from {mac} by local choice (Reason: {rng.choice([3, 4, 8])})"
+        elif roll < 0.75:
+            msg = f"hostapd: {radio}: STA {mac} WPA: pairwise key handshake completed (RSN)"
+        elif roll < 0.90:
+            msg = f"dnsmasq-dhcp[{rng.randint(800, 900)}]: DHCPACK(br-lan) {ip} {mac} {host}"
+        elif roll < 0.97:
+            msg = f"dnsmasq-dhcp[{rng.randint(800, 900)}]: DHCPREQUEST(br-lan) {ip} {mac}"
+        else:
+            # long tail of distinct, rarely repeated lines
+            msg = f"daemon.notice netifd: Interface 'lan{rng.randint(0, 400)}' is now {rng.choice(['up', 'down'])} on {host}"
+        out.append((ts, msg))
+    return out
+
+
+def tokens(text):
+    return len(text) // 4
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-n", "--messages", type=int, action="append",
+                        help="batch size (repeatable; default 2000 10000 50000)")
+    parser.add_argument("--flap", type=float, default=0.4, help="share of lines from one flapping client")
+    args = parser.parse_args()
+
+    print(f"{'messages':>9} {'raw tok':>10} {'tmpl tok':>9} {'ratio':>7} {'clusters':>8} {'mine msg/s':>11} {'reload':>7}")
+    for n in args.messages or [2000, 10000, 50000]:
+        logs = synthetic_logs(n, args.flap)
+        raw = "\n".join(f"[{ts}] {msg}" for ts, msg in logs)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            state = os.path.join(tmp, "templates.json")
+            miner = TemplateMiner(state)
+            start = time.perf_counter()
+            prompt = miner.summarize(logs)
+            elapsed = time.perf_counter() - start
+            miner.save()
+            reloaded = TemplateMiner(state)
+            # Same clusters after a restart: mining the next batch creates none
+            before = len(reloaded)
+            reloaded.summarize(synthetic_logs(min(n, 2000), args.flap, seed=2))
+            stable = "ok" if len(reloaded) - before <= len(reloaded) // 10 else "drift"
+
+        print(f"{n:>9} {tokens(raw):>10} {tokens(prompt):>9} {tokens(raw) / max(1, tokens(prompt)):>6.1f}x "
+              f"{len(miner):>8} {n / elapsed:>11.0f} {stable:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+"""
+Shared building blocks for the Log Sentinel agents (agent.py,
+agent-graylog-all.py). Each module is self-contained and configured from
+environment variables, like the agents themselves.
+"""
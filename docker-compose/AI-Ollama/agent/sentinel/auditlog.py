@@ -0,0 +1,165 @@
+"""
+Buffered, rotating writers for the Sentinel's audit logs.
+
+Appending with open()/write()/close() per event costs an open and a close
+on the output volume (often a network mount) every time, and the files
+were never rotated. An AuditWriter keeps its file open, buffers records
+in memory, and writes them out when the buffer passes
+AUDIT_BUFFER_BYTES, every AUDIT_FLUSH_SECONDS (one shared background
+thread), and at exit.
+
+Rotation happens at flush time when the file would pass AUDIT_MAX_BYTES
+or has been open for AUDIT_ROTATE_SECONDS (Linux keeps no file creation
+time, so a restart restarts the clock): name -> name.1 -> ... ->
+name.AUDIT_BACKUPS. With AUDIT_COMPRESS=1 rotated segments are gzipped
+(name.1.gz ...).
+
+AUDIT_FORMAT=jsonl writes one JSON object per line (to <name>.jsonl
+instead of <name>.log) so downstream tools can stream-parse the results;
+the default "text" keeps the existing human-readable layout.
+"""
+
+import atexit
+import gzip
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import datetime
+
+FORMAT = os.getenv('AUDIT_FORMAT', 'text').lower()
+MAX_BYTES = int(os.getenv('AUDIT_MAX_BYTES', 10 * 1024 * 1024))
+ROTATE_SECONDS = float(os.getenv('AUDIT_ROTATE_SECONDS', 86400))
+BACKUPS = int(os.getenv('AUDIT_BACKUPS', 7))
+COMPRESS = os.getenv('AUDIT_COMPRESS', '1') == '1'
+FLUSH_SECONDS = float(os.getenv('AUDIT_FLUSH_SECONDS', 2))
+BUFFER_BYTES = int(os.getenv('AUDIT_BUFFER_BYTES', 64 * 1024))
+
+_writers = []
+_flusher = None
+_registry_lock = threading.Lock()
+
+
+class AuditWriter:
+    def __init__(self, path, fmt=FORMAT, max_bytes=MAX_BYTES, rotate_seconds=ROTATE_SECONDS,
+                 backups=BACKUPS, compress=COMPRESS, buffer_bytes=BUFFER_BYTES):
+        self.jsonl = fmt == "jsonl"
+        if self.jsonl:
+            path = os.path.splitext(path)[0] + ".jsonl"
+        self.path = path
+        self.max_bytes = max_bytes
+        self.rotate_seconds = rotate_seconds
+        self.backups = backups
+        self.compress = compress
+        self.buffer_bytes = buffer_bytes
+        self._lock = threading.Lock()
+        self._pending = []
+        self._pending_bytes = 0
+        self._file = None
+        self._opened_at = 0.0
+        self.rotations = 0
+        _register(self)
+
+    def write(self, text, **record):
+        """Queue one event. text is the text-mode rendering; record the
+        JSONL fields (a "time" field is added)."""
+        if self.jsonl:
+            line = json.dumps({"time": datetime.now().isoformat(timespec="seconds"), **record}) + "\n"
+        else:
+            line = text
+        with self._lock:
+            self._pending.append(line)
+            self._pending_bytes += len(line)
+            if self._pending_bytes >= self.buffer_bytes:
+                self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._pending:
+            return
+        data = "".join(self._pending).encode()
+        try:
+            f = self._open()
+            if self._should_rotate(f, len(data)):
+                self._rotate()
+                f = self._open()
+            f.write(data)
+            f.flush()
+        except OSError as e:
+            # Keep the records; the next flush retries
+            print(f"[AUDIT] Cannot write {self.path}: {e}")
+            self._close()
+            return
+        self._pending, self._pending_bytes = [], 0
+
+    def _open(self):
+        if self._file is None:
+            self._file = open(self.path, "ab")
+            self._opened_at = time.time()
+        return self._file
+
+    def _close(self):
+        if self._file is not None:
+            try:
+                self._file.close()
+            except OSError:
+                pass
+            self._file = None
+
+    def _should_rotate(self, f, incoming):
+        size = f.tell()
+        if not size:
+            return False
+        if self.max_bytes and size + incoming > self.max_bytes:
+            return True
+        return bool(self.rotate_seconds) and time.time() - self._opened_at >= self.rotate_seconds
+
+    def _segment(self, n):
+        return f"{self.path}.{n}" + (".gz" if self.compress else "")
+
+    def _rotate(self):
+        self._close()
+        for n in range(self.backups - 1, 0, -1):
+            if os.path.exists(self._segment(n)):
+                os.replace(self._segment(n), self._segment(n + 1))
+        if not self.backups:
+            os.remove(self.path)
+        elif self.compress:
+            with open(self.path, "rb") as src, gzip.open(self._segment(1), "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(self.path)
+        else:
+            os.replace(self.path, self._segment(1))
+        self.rotations += 1
+
+    def close(self):
+        with self._lock:
+            self._flush_locked()
+            self._close()
+
+
+def _register(writer):
+    global _flusher
+    with _registry_lock:
+        _writers.append(writer)
+        if _flusher is None and FLUSH_SECONDS > 0:
+            _flusher = threading.Thread(target=_flush_loop, name="audit-flush", daemon=True)
+            _flusher.start()
+
+
+def _flush_loop():
+    while True:
+        time.sleep(FLUSH_SECONDS)
+        flush_all()
+
+
+@atexit.register
+def flush_all():
+    with _registry_lock:
+        writers = list(_writers)
+    for w in writers:
+        w.flush()
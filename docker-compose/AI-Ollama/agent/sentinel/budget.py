@@ -0,0 +1,65 @@
+"""
+Context-window planning for Ollama prompts.
+
+Ollama silently drops the front of a prompt longer than num_ctx, and a
+prompt near the limit takes minutes to prefill. plan() estimates the token
+count of system + prompt and, if it would not fit in
+num_ctx - OLLAMA_NUM_PREDICT - PROMPT_MARGIN_TOKENS, packs the prompt's lines
+into windows that do. Each window is analyzed on its own (map_windows runs
+them concurrently) and the verdicts are merged by sentinel.verdict.reduce.
+
+Tokens are estimated from characters (PROMPT_CHARS_PER_TOKEN, default 3.5,
+deliberately a little pessimistic for llama-family tokenizers on log text).
+"""
+
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+CHARS_PER_TOKEN = float(os.getenv('PROMPT_CHARS_PER_TOKEN', 3.5))
+# Room kept free for the reply
+NUM_PREDICT = int(os.getenv('OLLAMA_NUM_PREDICT', 512))
+MARGIN = int(os.getenv('PROMPT_MARGIN_TOKENS', 256))
+# Smaller windows prefill faster; 0 = as large as the context allows
+WINDOW_TOKENS = int(os.getenv('PROMPT_WINDOW_TOKENS', 0))
+
+
+def estimate_tokens(text):
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def budget(system, num_ctx):
+    """Tokens available to the prompt body."""
+    avail = num_ctx - NUM_PREDICT - MARGIN - estimate_tokens(system)
+    if WINDOW_TOKENS:
+        avail = min(avail, WINDOW_TOKENS)
+    return max(avail, 64)
+
+
+def plan(system, prompt, num_ctx):
+    """Split prompt on line boundaries into windows that each fit. Returns a list."""
+    limit = budget(system, num_ctx)
+    if estimate_tokens(prompt) <= limit:
+        return [prompt]
+
+    max_chars = int(limit * CHARS_PER_TOKEN)
+    windows, current, size = [], [], 0
+    for line in prompt.split("\n"):
+        if len(line) > max_chars:
+            line = line[:max_chars - 15] + " ...[truncated]"
+        if current and size + len(line) + 1 > max_chars:
+            windows.append("\n".join(current))
+            current, size = [], 0
+        current.append(line)
+        size += len(line) + 1
+    if current:
+        windows.append("\n".join(current))
+    return windows
+
+
+def map_windows(analyze, windows, workers):
+    """analyze(window) for every window, up to workers at a time, in order."""
+    if len(windows) == 1:
+        return [analyze(windows[0])]
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(windows)))) as ex:
+        return list(ex.map(analyze, windows))
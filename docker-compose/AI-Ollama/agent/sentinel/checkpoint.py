@@ -0,0 +1,135 @@
+"""
+Crash-safe Graylog checkpoint with boundary and recent-ID dedupe.
+
+The checkpoint used to be the bare timestamp of the last analyzed message,
+reused as the inclusive `from` of the next search. Every message sharing
+that timestamp was fetched and analyzed again, and a crash mid-write could
+leave the file empty or truncated.
+
+The file is now JSON:
+
+  {"timestamp": "2026-10-18T08:10:16.412Z",
+   "boundary_ids": ["0f9c...", "11ab..."]}
+
+boundary_ids are the messages at that timestamp which were already
+analyzed. It is written to a temp file in the same directory, fsynced and
+renamed over the old one, so a reader only ever sees the old or the new
+checkpoint. A legacy plain-timestamp file is still read.
+
+In memory a bounded LRU of recent message IDs (CHECKPOINT_SEEN_IDS,
+seeded from boundary_ids) filters anything analyzed before out of the
+next search.
+
+A crash between analyzing a batch and saving the checkpoint still means
+that batch is analyzed again after the restart. Nothing is ever skipped.
+"""
+
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+from sentinel.graylog import message_id
+
+SEEN_IDS = int(os.getenv('CHECKPOINT_SEEN_IDS', 50000))
+# Where a missing checkpoint starts
+LOOKBACK_MINUTES = int(os.getenv('CHECKPOINT_LOOKBACK_MINUTES', 10))
+
+
+def write_atomic(path, data):
+    """Replace path with data (str) via write, fsync, rename."""
+    directory = os.path.dirname(path) or "."
+    fd, tmp = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+    try:
+        dfd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        # Make the rename itself durable
+        os.fsync(dfd)
+    except OSError:
+        pass
+    finally:
+        os.close(dfd)
+
+
+class Checkpoint:
+    def __init__(self, path, max_seen=SEEN_IDS):
+        self.path = path
+        self.max_seen = max_seen
+        self.timestamp = None
+        self.boundary_ids = []
+        self._seen = OrderedDict()
+        self._lock = threading.Lock()
+        self.skipped = 0
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                raw = f.read().strip()
+        except FileNotFoundError:
+            return
+        if not raw:
+            return
+        try:
+            state = json.loads(raw)
+        except ValueError:
+            state = {"timestamp": raw}  # Pre-JSON checkpoint: bare timestamp
+        if not isinstance(state, dict):
+            return
+        self.timestamp = state.get("timestamp")
+        self.boundary_ids = list(state.get("boundary_ids", []))
+        with self._lock:
+            for mid in self.boundary_ids:
+                self._remember(mid)
+
+    def since(self):
+        """Timestamp to search from: the checkpoint, or LOOKBACK_MINUTES ago."""
+        return self.timestamp or (datetime.now(timezone.utc) - timedelta(minutes=LOOKBACK_MINUTES)).isoformat()
+
+    def _remember(self, mid):
+        self._seen[mid] = None
+        self._seen.move_to_end(mid)
+        while len(self._seen) > self.max_seen:
+            self._seen.popitem(last=False)
+
+    def fresh(self, messages):
+        """Yield only messages whose ID hasn't been analyzed yet."""
+        for msg in messages:
+            with self._lock:
+                if message_id(msg) in self._seen:
+                    self.skipped += 1
+                    continue
+            yield msg
+
+    def advance(self, batch):
+        """Record batch as analyzed and persist the new checkpoint."""
+        if not batch:
+            return
+        last_ts = batch[-1]['message']['timestamp']
+        with self._lock:
+            ids = [message_id(m) for m in batch]
+            for mid in ids:
+                self._remember(mid)
+            at_last = [mid for m, mid in zip(batch, ids) if m['message']['timestamp'] == last_ts]
+            if last_ts == self.timestamp:
+                # Still the same boundary timestamp: keep the earlier IDs too
+                at_last = list(dict.fromkeys(self.boundary_ids + at_last))
+            self.timestamp, self.boundary_ids = last_ts, at_last
+            data = json.dumps({"timestamp": last_ts, "boundary_ids": at_last})
+        write_atomic(self.path, data)
@@ -0,0 +1,98 @@
+"""
+Paged Graylog search for the Sentinel agents.
+
+search/universal/absolute is asked for one page (GRAYLOG_PAGE_SIZE messages)
+at a time with limit/offset, so only one page body is ever held in memory
+no matter how large the backlog since the last checkpoint is.
+
+Elasticsearch/OpenSearch refuse offset + limit beyond index.max_result_window
+(10000 by default, GRAYLOG_MAX_WINDOW here). Before reaching it the cursor
+moves instead: `from` becomes the timestamp of the last message yielded,
+offset restarts at 0, and messages at that boundary timestamp that were
+already yielded are skipped.
+"""
+
+import hashlib
+import os
+from itertools import islice
+
+PAGE_SIZE = int(os.getenv('GRAYLOG_PAGE_SIZE', 500))
+BATCH_SIZE = int(os.getenv('GRAYLOG_BATCH_SIZE', 2000))
+MAX_WINDOW = int(os.getenv('GRAYLOG_MAX_WINDOW', 10000))
+FIELDS = "_id,message,timestamp"
+
+
+class GraylogError(Exception):
+    """Graylog answered with a non-200 status or a body that isn't JSON."""
+
+
+def message_id(msg):
+    """Graylog's _id (requested in FIELDS), or a digest of timestamp and text
+    if it is missing. The digest can't tell identical lines within the same
+    second apart, so it is only a fallback."""
+    m = msg['message']
+    if m.get('_id'):
+        return m['_id']
+    raw = f"{m.get('timestamp')}\0{m.get('message')}".encode()
+    return hashlib.blake2b(raw, digest_size=12).hexdigest()
+
+
+def _page(get, url, params):
+    resp = get(url, params=params)
+    if resp.status_code != 200:
+        raise GraylogError(f"Graylog API Error {resp.status_code}: {resp.text[:200]}")
+    try:
+        return resp.json().get('messages', [])
+    except ValueError:
+        raise GraylogError(f"Graylog API returned non-JSON: {resp.text[:100]}") from None
+
+
+def iter_messages(get, base_url, stream_id, since, until, page_size=PAGE_SIZE, max_window=MAX_WINDOW):
+    """Yield messages in [since, until] oldest first, one page in memory at a time.
+
+    get(url, params=...) performs the HTTP GET (a pooled Backend.get or a
+    Session.get carrying the Graylog auth and Accept headers).
+    """
+    url = f"{base_url}/search/universal/absolute"
+    page_size = max(1, min(page_size, max_window))
+    frm, offset = since, 0
+    last_ts, at_last_ts = None, set()
+
+    while True:
+        if offset + page_size > max_window:
+            if last_ts is None or last_ts == frm:
+                # A full window of messages sharing one timestamp: nothing
+                # left to move the cursor to
+                raise GraylogError(f"More than {max_window} messages at {frm}; raise GRAYLOG_MAX_WINDOW")
+            frm, offset = last_ts, 0
+
+        msgs = _page(get, url, {
+            "query": f"streams:{stream_id}",
+            "from": frm,
+            "to": until,
+            "fields": FIELDS,
+            "sort": "timestamp:asc",
+            "limit": page_size,
+            "offset": offset,
+        })
+        offset += len(msgs)
+
+        for msg in msgs:
+            ts, key = msg['message']['timestamp'], message_id(msg)
+            if ts == last_ts:
+                if key in at_last_ts:
+                    continue
+                at_last_ts.add(key)
+            else:
+                last_ts, at_last_ts = ts, {key}
+            yield msg
+
+        if len(msgs) < page_size:
+            return
+
+
+def batched(iterable, size=BATCH_SIZE):
+    """Group an iterable into lists of at most size items."""
+    it = iter(iterable)
+    while batch := list(islice(it, size)):
+        yield batch
@@ -0,0 +1,279 @@
+"""
+Home Assistant websocket ingestion for the Zigbee audit.
+
+Polling /api/states downloads every entity in the install to keep a handful.
+HAMeshFeed instead holds one websocket to /api/websocket:
+
+  1. authenticates with the long-lived access token
+  2. subscribes to state_changed events
+  3. takes one get_states snapshot, keeping only Zigbee entities
+  4. applies each state_changed for a Zigbee entity to an in-memory model
+
+get_states is only sent once HA has confirmed the subscription (a
+successful result for it), so nothing that changes between the two is
+missed. On disconnect the model is marked
+not ready (callers fall back to REST) and the feed reconnects with backoff,
+re-snapshotting on success. HA's own heartbeat pings keep a healthy
+connection from ever being silent for HA_WS_READ_TIMEOUT_SECONDS, so a
+read that times out is treated as a disconnect too.
+
+Only what HA needs is implemented of RFC 6455: text frames, fragmentation,
+ping/pong and close, over plain or TLS sockets.
+"""
+
+import base64
+import hashlib
+import json
+import os
+import socket
+import ssl
+import struct
+import threading
+import time
+from urllib.parse import urlsplit
+
+_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+OP_CONT, OP_TEXT, OP_BINARY, OP_CLOSE, OP_PING, OP_PONG = 0x0, 0x1, 0x2, 0x8, 0x9, 0xA
+
+RECONNECT_MAX_SECONDS = float(os.getenv('HA_WS_RECONNECT_MAX_SECONDS', 60))
+# HA pings every client at least every 55s, so this much silence means the
+# server is gone (e.g. without a FIN) and the feed must reconnect
+READ_TIMEOUT_SECONDS = float(os.getenv('HA_WS_READ_TIMEOUT_SECONDS', 120))
+# get_states results for a large install are several MB in one message
+MAX_MESSAGE_BYTES = int(os.getenv('HA_WS_MAX_MESSAGE_BYTES', 64 * 1024 * 1024))
+
+
+class WebSocketClosed(Exception):
+    pass
+
+
+def accept_key(key):
+    return base64.b64encode(hashlib.sha1(key.encode() + _GUID).digest()).decode()
+
+
+def encode_frame(opcode, payload, mask):
+    """One final frame. Clients must mask (mask=True); servers must not."""
+    n = len(payload)
+    head = bytes([0x80 | opcode])
+    bit = 0x80 if mask else 0
+    if n < 126:
+        head += bytes([bit | n])
+    elif n < 1 << 16:
+        head += bytes([bit | 126]) + struct.pack("!H", n)
+    else:
+        head += bytes([bit | 127]) + struct.pack("!Q", n)
+    if not mask:
+        return head + payload
+    key = os.urandom(4)
+    return head + key + _apply_mask(payload, key)
+
+
+def _apply_mask(data, key):
+    if not data:
+        return b""
+    # XOR the whole payload at once as one big integer instead of per byte
+    n = len(data)
+    k = (key * (n // 4 + 1))[:n]
+    return (int.from_bytes(data, "big") ^ int.from_bytes(k, "big")).to_bytes(n, "big")
+
+
+def _read_exact(rfile, n):
+    data = rfile.read(n)
+    if len(data) != n:
+        raise WebSocketClosed("connection closed mid-frame")
+    return data
+
+
+def read_frame(rfile):
+    """Return (fin, opcode, payload) for the next frame on a buffered reader."""
+    b0, b1 = _read_exact(rfile, 2)
+    n = b1 & 0x7F
+    if n == 126:
+        n = struct.unpack("!H", _read_exact(rfile, 2))[0]
+    elif n == 127:
+        n = struct.unpack("!Q", _read_exact(rfile, 8))[0]
+    if n > MAX_MESSAGE_BYTES:
+        raise WebSocketClosed(f"frame of {n} bytes exceeds HA_WS_MAX_MESSAGE_BYTES")
+    key = _read_exact(rfile, 4) if b1 & 0x80 else None
+    payload = _read_exact(rfile, n)
+    if key:
+        payload = _apply_mask(payload, key)
+    return bool(b0 & 0x80), b0 & 0x0F, payload
+
+
+class WebSocket:
+    """Minimal blocking websocket client."""
+
+    def __init__(self, url, timeout=10):
+        parts = urlsplit(url)
+        secure = parts.scheme == "wss"
+        host, port = parts.hostname, parts.port or (443 if secure else 80)
+        sock = socket.create_connection((host, port), timeout=timeout)
+        if secure:
+            sock = ssl.create_default_context().wrap_socket(sock, server_hostname=host)
+        self.sock = sock
+        self.rfile = sock.makefile("rb")
+        self._send_lock = threading.Lock()
+
+        key = base64.b64encode(os.urandom(16)).decode()
+        path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        sock.sendall((
+            f"GET {path} HTTP/1.1\r\nHost: {parts.netloc}\r\nUpgrade: websocket\r\n"
+            f"Connection: Upgrade\r\nSec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n"
+        ).encode())
+        status = self.rfile.readline().decode("latin-1")
+        headers = {}
+        while (line := self.rfile.readline().decode("latin-1").strip()):
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        if " 101 " not in status or headers.get("sec-websocket-accept") != accept_key(key):
+            self.close()
+            raise WebSocketClosed(f"handshake rejected: {status.strip()}")
+
+    def settimeout(self, timeout):
+        self.sock.settimeout(timeout)
+
+    def send_json(self, obj):
+        with self._send_lock:
+            self.sock.sendall(encode_frame(OP_TEXT, json.dumps(obj).encode(), mask=True))
+
+    def recv_json(self):
+        """Next complete text message, decoded. Answers pings on the way."""
+        parts, size = [], 0
+        while True:
+            fin, opcode, payload = read_frame(self.rfile)
+            if opcode == OP_PING:
+                with self._send_lock:
+                    self.sock.sendall(encode_frame(OP_PONG, payload, mask=True))
+                continue
+            if opcode == OP_PONG:
+                continue
+            if opcode == OP_CLOSE:
+                raise WebSocketClosed("closed by server")
+            parts.append(payload)
+            size += len(payload)
+            if size > MAX_MESSAGE_BYTES:
+                raise WebSocketClosed("message exceeds HA_WS_MAX_MESSAGE_BYTES")
+            if fin:
+                return json.loads(b"".join(parts))
+
+    def close(self):
+        try:
+            with self._send_lock:
+                self.sock.sendall(encode_frame(OP_CLOSE, b"", mask=True))
+        except OSError:
+            pass
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+
+def websocket_url(ha_url):
+    """http(s)://host:8123 -> ws(s)://host:8123/api/websocket"""
+    parts = urlsplit(ha_url.rstrip('/'))
+    scheme = "wss" if parts.scheme == "https" else "ws"
+    return f"{scheme}://{parts.netloc}{parts.path}/api/websocket"
+
+
+class HAMeshFeed:
+    """Incrementally maintained {entity_id: state} for entities matching keep()."""
+
+    def __init__(self, ha_url, token, keep, url=None):
+        self.url = url or websocket_url(ha_url)
+        self.token = token
+        self.keep = keep
+        self._lock = threading.Lock()
+        self._entities = {}
+        self.ready = threading.Event()
+        self.events_seen = 0
+        self.events_applied = 0
+        self.reconnects = 0
+        self._ws = None
+        self._stop = False
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="ha-websocket", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop = True
+        if self._ws:
+            self._ws.close()
+
+    def states(self):
+        """Current Zigbee entities as HA state objects, or None while not synced."""
+        if not self.ready.is_set():
+            return None
+        with self._lock:
+            return list(self._entities.values())
+
+    def _run(self):
+        delay = 1.0
+        while not self._stop:
+            try:
+                self._session()
+                delay = 1.0
+            except (OSError, ValueError, WebSocketClosed) as e:
+                if self._stop:
+                    return
+                print(f"[HA_WS] {e}; reconnecting in {delay:.0f}s")
+            self.ready.clear()
+            self.reconnects += 1
+            time.sleep(delay)
+            delay = min(delay * 2, RECONNECT_MAX_SECONDS)
+
+    def _session(self):
+        ws = self._ws = WebSocket(self.url)
+        try:
+            msg = ws.recv_json()
+            if msg.get("type") == "auth_required":
+                ws.send_json({"type": "auth", "access_token": self.token})
+                msg = ws.recv_json()
+            if msg.get("type") != "auth_ok":
+                raise WebSocketClosed(f"auth failed: {msg.get('message', msg.get('type'))}")
+
+            ws.send_json({"id": 1, "type": "subscribe_events", "event_type": "state_changed"})
+            while self._handle(ws.recv_json()) != 1:
+                pass
+            ws.send_json({"id": 2, "type": "get_states"})
+            ws.settimeout(READ_TIMEOUT_SECONDS)
+            while not self._stop:
+                self._handle(ws.recv_json())
+        finally:
+            ws.close()
+
+    def _handle(self, msg):
+        """Apply one event or command result; returns the id of a result."""
+        kind = msg.get("type")
+        if kind == "event":
+            self._apply(msg["event"].get("data", {}))
+        elif kind == "result":
+            if not msg.get("success"):
+                raise WebSocketClosed(f"command {msg.get('id')} failed: {msg.get('error')}")
+            if msg.get("id") == 2:
+                self._snapshot(msg.get("result") or [])
+            return msg.get("id")
+        return None
+
+    def _snapshot(self, states):
+        entities = {s['entity_id']: s for s in states if self.keep(s['entity_id'])}
+        with self._lock:
+            self._entities = entities
+        self.ready.set()
+
+    def _apply(self, data):
+        self.events_seen += 1
+        entity_id = data.get("entity_id", "")
+        if not self.keep(entity_id):
+            return
+        self.events_applied += 1
+        new = data.get("new_state")
+        with self._lock:
+            if new is None:
+                self._entities.pop(entity_id, None)  # entity removed
+            else:
+                self._entities[entity_id] = new
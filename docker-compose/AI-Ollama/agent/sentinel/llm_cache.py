@@ -0,0 +1,107 @@
+"""
+Disk-backed LRU + TTL cache of Ollama verdicts.
+
+The key is a SHA-256 of model, system prompt and the normalized prompt
+body. Normalization blanks out ISO timestamps and collapses whitespace, so
+the same Zigbee states, the same recurring log burst, or a window re-read
+after a restart map to the same entry. Entries live in SQLite at
+LLM_CACHE_PATH on the output volume and so survive container restarts.
+The output volume may be a network mount, so the cache uses a rollback
+journal (TRUNCATE) rather than WAL, which needs shared memory.
+Past LLM_CACHE_MAX_ENTRIES the least recently used entries are evicted;
+entries older than LLM_CACHE_TTL_SECONDS are treated as misses and dropped.
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+
+PATH = os.getenv('LLM_CACHE_PATH', "/app/output/verdict_cache.sqlite")
+MAX_ENTRIES = int(os.getenv('LLM_CACHE_MAX_ENTRIES', 5000))
+TTL_SECONDS = float(os.getenv('LLM_CACHE_TTL_SECONDS', 86400))
+
+_TS_RE = re.compile(r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:\.\d+)?(?:Z|[+-]\d{2}:?\d{2})?")
+_WS_RE = re.compile(r"\s+")
+
+
+def normalize(prompt):
+    return _WS_RE.sub(" ", _TS_RE.sub("<TS>", prompt)).strip()
+
+
+def cache_key(model, system, prompt):
+    h = hashlib.sha256()
+    for part in (model or "", system or "", normalize(prompt)):
+        h.update(part.encode())
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class VerdictCache:
+    """Thread-safe; one SQLite connection shared under a lock."""
+
+    def __init__(self, path=PATH, max_entries=MAX_ENTRIES, ttl=TTL_SECONDS):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = self.misses = self.evictions = self.expired = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._db.execute("PRAGMA journal_mode=TRUNCATE")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("""CREATE TABLE IF NOT EXISTS verdicts (
+            key TEXT PRIMARY KEY, verdict TEXT NOT NULL,
+            created REAL NOT NULL, last_used REAL NOT NULL)""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS verdicts_lru ON verdicts(last_used)")
+        self._db.commit()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT verdict, created FROM verdicts WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            if self.ttl and now - row[1] > self.ttl:
+                self._db.execute("DELETE FROM verdicts WHERE key = ?", (key,))
+                self._db.commit()
+                self.expired += 1
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE verdicts SET last_used = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key, verdict):
+        now = time.time()
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO verdicts VALUES (?, ?, ?, ?)", (key, verdict, now, now))
+            (count,) = self._db.execute("SELECT COUNT(*) FROM verdicts").fetchone()
+            if count > self.max_entries:
+                cur = self._db.execute(
+                    "DELETE FROM verdicts WHERE key IN (SELECT key FROM verdicts ORDER BY last_used LIMIT ?)",
+                    (count - self.max_entries,))
+                self.evictions += cur.rowcount
+            self._db.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM verdicts").fetchone()[0]
+
+    def stats_line(self):
+        lookups = self.hits + self.misses
+        rate = f"{100 * self.hits // lookups}%" if lookups else "-"
+        return (f"{self.hits} hits / {self.misses} misses ({rate}), "
+                f"{self.evictions} evicted, {self.expired} expired, {len(self)} entries")
+
+
+def open_cache(path=PATH):
+    """VerdictCache at path, or None (caching off) if it can't be opened."""
+    try:
+        return VerdictCache(path)
+    except sqlite3.Error as e:
+        print(f"[CACHE] Verdict cache disabled, cannot open {path}: {e}")
+        return None
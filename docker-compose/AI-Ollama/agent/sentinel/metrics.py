@@ -0,0 +1,188 @@
+"""
+Stage timers, Ollama timings and a Prometheus /metrics endpoint.
+
+Everything is in-process and lock-protected; an observation is a bisect
+into a fixed bucket list plus three additions, so timing every stage is
+cheap enough to leave on. serve(port) starts a small HTTP server thread
+that renders the registry as Prometheus text exposition on /metrics.
+
+Metrics:
+
+  sentinel_stage_seconds{stage}            histogram  graylog_fetch, ha_states,
+                                                      prompt_build, rules, ollama,
+                                                      audit_write
+  sentinel_audit_seconds{audit}            histogram  one whole zigbee / wifi audit
+  sentinel_ollama_seconds{phase}           histogram  load, prompt_eval (prefill),
+                                                      eval (decode), total — as
+                                                      reported by Ollama
+  sentinel_ollama_tokens_total{phase}      counter    prompt_eval / eval token counts
+  sentinel_ollama_requests_total{outcome}  counter    ok / error
+  sentinel_verdict_source_total{source}    counter    llm / cache / rules
+
+plus whatever collectors are registered with add_collector() (pool, cache
+and rule counters), evaluated at scrape time.
+"""
+
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PORT = int(os.getenv('METRICS_PORT', 9464))
+BIND = os.getenv('METRICS_BIND', '0.0.0.0')
+
+# Seconds: sub-10ms writes up to multi-minute CPU-bound inference
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+_HELP = {
+    "sentinel_stage_seconds": "Time spent per agent stage",
+    "sentinel_audit_seconds": "Wall time of one complete audit",
+    "sentinel_ollama_seconds": "Ollama-reported durations per phase (load, prompt_eval=prefill, eval=decode, total)",
+    "sentinel_ollama_tokens_total": "Tokens processed by Ollama per phase",
+    "sentinel_ollama_requests_total": "Ollama generate requests by outcome",
+    "sentinel_verdict_source_total": "Verdicts by where they came from (llm, cache, rules)",
+}
+
+_lock = threading.Lock()
+_histograms = {}   # (name, labels) -> [bucket_counts, sum, count]
+_counters = {}     # (name, labels) -> value
+_collectors = []
+
+
+def _labels(kw):
+    return tuple(sorted(kw.items()))
+
+
+def observe(name, value, **labels):
+    key = (name, _labels(labels))
+    i = bisect.bisect_left(BUCKETS, value)
+    with _lock:
+        h = _histograms.get(key)
+        if h is None:
+            h = _histograms[key] = [[0] * (len(BUCKETS) + 1), 0.0, 0]
+        h[0][i] += 1
+        h[1] += value
+        h[2] += 1
+
+
+def inc(name, value=1, **labels):
+    key = (name, _labels(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+@contextmanager
+def timer(stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe("sentinel_stage_seconds", time.perf_counter() - start, stage=stage)
+
+
+def timed(stage, fn):
+    """fn wrapped so every call is observed under stage."""
+    def wrapper(*args, **kwargs):
+        with timer(stage):
+            return fn(*args, **kwargs)
+    return wrapper
+
+
+def record_ollama(stats):
+    """Feed the final chunk of an Ollama generate reply (durations in ns)."""
+    if not stats:
+        inc("sentinel_ollama_requests_total", outcome="error")
+        return
+    inc("sentinel_ollama_requests_total", outcome="ok")
+    for phase in ("load", "prompt_eval", "eval", "total"):
+        ns = stats.get(f"{phase}_duration")
+        if ns is not None:
+            observe("sentinel_ollama_seconds", ns / 1e9, phase=phase)
+    for phase in ("prompt_eval", "eval"):
+        n = stats.get(f"{phase}_count")
+        if n is not None:
+            inc("sentinel_ollama_tokens_total", n, phase=phase)
+
+
+def add_collector(fn):
+    """fn() -> [(name, type, help, [(labels_dict, value), ...])], run per scrape."""
+    _collectors.append(fn)
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _fmt_labels(labels, extra=()):
+    items = list(labels) + list(extra)
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape_label(v)}"' for k, v in items) + "}"
+
+
+def render():
+    lines = []
+    with _lock:
+        hists = {k: (list(v[0]), v[1], v[2]) for k, v in _histograms.items()}
+        counters = dict(_counters)
+
+    for name in sorted({n for n, _ in hists}):
+        lines += [f"# HELP {name} {_HELP.get(name, name)}", f"# TYPE {name} histogram"]
+        for (n, labels), (buckets, total, count) in sorted(hists.items()):
+            if n != name:
+                continue
+            cumulative = 0
+            for bound, c in zip(BUCKETS + (float("inf"),), buckets):
+                cumulative += c
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{name}_bucket{_fmt_labels(labels, [('le', le)])} {cumulative}")
+            lines.append(f"{name}_sum{_fmt_labels(labels)} {total}")
+            lines.append(f"{name}_count{_fmt_labels(labels)} {count}")
+
+    for name in sorted({n for n, _ in counters}):
+        lines += [f"# HELP {name} {_HELP.get(name, name)}", f"# TYPE {name} counter"]
+        lines += [f"{name}{_fmt_labels(labels)} {v}" for (n, labels), v in sorted(counters.items()) if n == name]
+
+    for collect in _collectors:
+        try:
+            families = collect()
+        except Exception as e:
+            lines.append(f"# collector error: {e}")
+            continue
+        for name, kind, help_text, samples in families:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            lines += [f"{name}{_fmt_labels(_labels(lbl))} {v}" for lbl, v in samples]
+    return "\n".join(lines) + "\n"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, fmt, *args):
+        pass
+
+
+def serve(port=PORT, bind=BIND):
+    """Start /metrics on a daemon thread; port 0 disables. Returns the server or None."""
+    if not port:
+        return None
+    try:
+        server = ThreadingHTTPServer((bind, port), _Handler)
+    except OSError as e:
+        print(f"[METRICS] Cannot listen on {bind}:{port}: {e}")
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    print(f"[METRICS] Serving /metrics on {bind}:{port}")
+    return server
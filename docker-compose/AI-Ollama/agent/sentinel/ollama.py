@@ -0,0 +1,121 @@
+"""
+Streaming Ollama /api/generate client with early verdict extraction.
+
+With "stream": true Ollama sends one JSON object per line as tokens are
+decoded. The verdict format puts SCORE and STATUS first, so they are
+readable long before SUMMARY is finished: generate() calls
+on_verdict(score, status) the moment the STATUS value is complete and keeps
+reading the rest of the reply.
+
+Decode time is capped with num_predict (OLLAMA_NUM_PREDICT). With
+OLLAMA_FORMAT=json the request carries a JSON schema ({score, status,
+summary}, in that order, status limited to the audit's allowed values), so
+the model can't wander off-format; the reply is converted back to the
+SCORE/STATUS/SUMMARY text the rest of the agent expects.
+"""
+
+import json
+import os
+import re
+
+import requests
+
+from sentinel import verdict
+
+NUM_PREDICT = int(os.getenv('OLLAMA_NUM_PREDICT', 512))
+FORMAT = os.getenv('OLLAMA_FORMAT', 'text').lower()
+STREAM = os.getenv('OLLAMA_STREAM', '1') == '1'
+
+# Complete once a separator follows the value: the newline of the one-field-
+# per-line layout, or the comma of "SCORE: 8, STATUS: X, SUMMARY: ..."
+_TEXT_STATUS = re.compile(r"STATUS[\s*]*:[\s*]*\[?([A-Za-z_]+)(?=[,\]\s*])", re.I)
+_TEXT_SCORE = re.compile(r"SCORE[\s*]*:[\s*]*\[?(\d+)", re.I)
+_SEPARATORS = frozenset(',]*" \t\n')
+_JSON_STATUS = re.compile(r'"status"\s*:\s*"([^"]*)"')
+_JSON_SCORE = re.compile(r'"score"\s*:\s*(\d+)')
+
+
+def schema(statuses):
+    return {
+        "type": "object",
+        "properties": {
+            "score": {"type": "integer", "minimum": 1, "maximum": 10},
+            "status": {"type": "string", "enum": list(statuses)},
+            "summary": {"type": "string"},
+        },
+        "required": ["score", "status", "summary"],
+    }
+
+
+def payload(model, system, prompt, num_ctx, statuses=None, stream=STREAM, fmt=FORMAT, num_predict=NUM_PREDICT):
+    body = {
+        "model": model, "system": system, "prompt": prompt, "stream": stream,
+        "options": {"num_ctx": num_ctx, "num_predict": num_predict},
+    }
+    if fmt == "json" and statuses:
+        body["format"] = schema(statuses)
+    return body
+
+
+def from_json(text):
+    """Structured reply -> SCORE/STATUS/SUMMARY text (text passes through)."""
+    try:
+        obj = json.loads(text)
+    except ValueError:
+        return text
+    if not isinstance(obj, dict):
+        return text
+    return verdict.render(obj.get("score", 0), obj.get("status", verdict.ERROR), obj.get("summary", ""))
+
+
+def _early(text, structured):
+    """(score, status) once the STATUS value is complete in text, else None."""
+    status_re, score_re = (_JSON_STATUS, _JSON_SCORE) if structured else (_TEXT_STATUS, _TEXT_SCORE)
+    m = status_re.search(text)
+    if not m:
+        return None
+    score = score_re.search(text)
+    return (int(score.group(1)) if score else None), m.group(1).upper()
+
+
+def generate(post, url, body, on_verdict=None):
+    """Run one generate request via post(url, json=..., stream=...).
+
+    Returns (reply_text, stats) where stats is Ollama's final chunk minus the
+    text (prompt_eval_count, prompt_eval_duration, eval_count, eval_duration,
+    total_duration, done_reason ...). Failures come back as an ERROR verdict.
+    """
+    structured = "format" in body
+    try:
+        resp = post(url, json=body, stream=body["stream"])
+        with resp:
+            if resp.status_code != 200:
+                return verdict.render(0, verdict.ERROR, f"Ollama HTTP {resp.status_code}: {resp.text[:200]}"), {}
+            if not body["stream"]:
+                data = resp.json()
+                text = data.pop("response", "")
+                return (from_json(text) if structured else text), data
+
+            parts, fired, stats = [], False, {}
+            for line in resp.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if "error" in chunk:
+                    return verdict.render(0, verdict.ERROR, f"Ollama: {chunk['error']}"), {}
+                parts.append(chunk.get("response", ""))
+                if on_verdict and not fired and (_SEPARATORS.intersection(parts[-1]) or chunk.get("done")):
+                    # A reply can end on the status itself: the end counts as a separator
+                    early = _early("".join(parts) + ("\n" if chunk.get("done") else ""), structured)
+                    if early:
+                        fired = True
+                        on_verdict(*early)
+                if chunk.get("done"):
+                    # Not breaking: reading to the end of the chunked body
+                    # lets the connection go back to the pool
+                    chunk.pop("response", None)
+                    stats = chunk
+            text = "".join(parts)
+            return (from_json(text) if structured else text), stats
+    except (requests.RequestException, ValueError) as e:
+        return verdict.render(0, verdict.ERROR, f"Analysis Exception: {e}"), {}
@@ -0,0 +1,161 @@
+"""
+Pooled HTTP sessions, one per backend (Graylog, Home Assistant, Ollama).
+
+A bare requests.get() builds a throwaway Session, so every call pays a new
+TCP connection (and TLS handshake for https backends). A Backend keeps one
+Session with a sized keep-alive pool, bounded retries with exponential
+backoff, and its own (connect, read) timeouts.
+
+Each Backend counts requests, new connections, retries and errors so the
+agent can report how often connections are actually reused. Settings come
+from <PREFIX>_POOL_SIZE, <PREFIX>_RETRIES, <PREFIX>_BACKOFF,
+<PREFIX>_CONNECT_TIMEOUT and <PREFIX>_READ_TIMEOUT, e.g. GRAYLOG_RETRIES=5.
+"""
+
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+_REGISTRY = []
+
+
+class PoolStats:
+    """Thread-safe counters for one backend."""
+
+    FIELDS = ("requests", "connections_opened", "retries", "errors")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = dict.fromkeys(self.FIELDS, 0)
+        self._last = dict(self._counts)
+
+    def count(self, field, n=1):
+        with self._lock:
+            self._counts[field] += n
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._counts)
+
+    def delta(self):
+        """Counts since the previous delta() call."""
+        with self._lock:
+            now = dict(self._counts)
+            diff = {k: now[k] - self._last[k] for k in now}
+            self._last = now
+            return diff
+
+
+class _CountingAdapter(HTTPAdapter):
+    """HTTPAdapter whose connection pools report each new connection."""
+
+    def __init__(self, stats, **kwargs):
+        self._stats = stats
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        stats = self._stats
+
+        class CountingHTTPPool(HTTPConnectionPool):
+            def _new_conn(self):
+                stats.count("connections_opened")
+                return super()._new_conn()
+
+        class CountingHTTPSPool(HTTPSConnectionPool):
+            def _new_conn(self):
+                stats.count("connections_opened")
+                return super()._new_conn()
+
+        self.poolmanager.pool_classes_by_scheme = {"http": CountingHTTPPool, "https": CountingHTTPSPool}
+
+
+def _counting_retry(stats, **kwargs):
+    class CountingRetry(Retry):
+        def increment(self, *args, **kw):
+            stats.count("retries")
+            return super().increment(*args, **kw)
+
+    return CountingRetry(**kwargs)
+
+
+def _env(prefix, name, default, cast=float):
+    return cast(os.getenv(f"{prefix}_{name}", default))
+
+
+class Backend:
+    """A named, pooled, retrying HTTP client for one upstream service.
+
+    idempotent=False (Ollama) retries only failures to connect: a request
+    that reached the server is never re-sent, so a slow inference can't be
+    queued twice on the GPU.
+    """
+
+    def __init__(self, name, prefix, pool_size=4, retries=3, backoff=0.5,
+                 connect_timeout=5, read_timeout=30, idempotent=True, headers=None, auth=None):
+        self.name = name
+        self.stats = PoolStats()
+        self.timeout = (_env(prefix, "CONNECT_TIMEOUT", connect_timeout),
+                        _env(prefix, "READ_TIMEOUT", read_timeout))
+        pool_size = _env(prefix, "POOL_SIZE", pool_size, int)
+        retries = _env(prefix, "RETRIES", retries, int)
+        backoff = _env(prefix, "BACKOFF", backoff)
+
+        if idempotent:
+            retry = _counting_retry(
+                self.stats, total=retries, backoff_factor=backoff,
+                status_forcelist=(429, 502, 503, 504),
+                allowed_methods=frozenset({"GET", "HEAD"}),
+                raise_on_status=False, respect_retry_after_header=True,
+            )
+        else:
+            retry = _counting_retry(self.stats, total=retries, connect=retries, read=0,
+                                    status=0, other=0, backoff_factor=backoff)
+
+        adapter = _CountingAdapter(self.stats, pool_connections=1, pool_maxsize=pool_size,
+                                   pool_block=False, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        if headers:
+            self.session.headers.update(headers)
+        if auth:
+            self.session.auth = auth
+        _REGISTRY.append(self)
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        self.stats.count("requests")
+        try:
+            return self.session.request(method, url, **kwargs)
+        except requests.RequestException:
+            self.stats.count("errors")
+            raise
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+
+def backends():
+    """All Backends created in this process."""
+    return list(_REGISTRY)
+
+
+def stats_line():
+    """One-line reuse summary since the last call, e.g. for a per-cycle print."""
+    parts = []
+    for b in _REGISTRY:
+        d = b.stats.delta()
+        if not d["requests"]:
+            continue
+        reused = max(0, d["requests"] - d["connections_opened"])
+        parts.append(f"{b.name}: {d['requests']} req, {d['connections_opened']} new conn "
+                     f"({100 * reused // d['requests']}% reused), {d['retries']} retries, {d['errors']} errors")
+    return " | ".join(parts)
@@ -0,0 +1,149 @@
+"""
+Rule-based fast path that settles obvious Wi-Fi batches without the LLM.
+
+Rules come from a JSON file (RULES_FILE, default rules.json next to the
+agent):
+
+  {"name": "deauth", "pattern": "(?i:deauthenticat)", "kind": "bad",
+   "rate_per_min": 10, "severity": 8}
+
+The "bad" patterns and the "ok" patterns are compiled into two
+alternations of named groups. Each message is searched for a bad pattern
+first, and only if none matches for an ok one, so an ok token earlier in
+the line can't hide a bad pattern. Patterns can't use named groups or
+global flags — write (?i:...) rather than (?i).
+
+  kind "ok"    routine traffic (DHCP renewals, successful associations)
+  kind "bad"   suspicious traffic; trips when the batch has at least
+               min_count hits and/or at least rate_per_min hits per minute
+               of batch time.
+
+classify() returns one of
+
+  ("bad", verdict)   a bad rule tripped — verdict text without the LLM
+  ("ok", verdict)    every message matched an ok rule (up to
+                     RULES_UNKNOWN_SHARE unmatched) and no bad rule matched
+  ("llm", None)      anything else, including bad hits below their
+                     threshold: the batch goes to Ollama as before
+
+Per-rule hit counters and outcome counters are kept for tuning.
+"""
+
+import json
+import os
+import re
+import threading
+from datetime import datetime
+
+from sentinel import verdict
+
+RULES_FILE = os.getenv('RULES_FILE', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "rules.json"))
+# Share of messages allowed to match no rule in a batch still settled as "ok"
+UNKNOWN_SHARE = float(os.getenv('RULES_UNKNOWN_SHARE', 0))
+
+
+class Rule:
+    __slots__ = ("name", "pattern", "kind", "min_count", "rate_per_min", "severity")
+
+    def __init__(self, name, pattern, kind="ok", min_count=0, rate_per_min=0, severity=8):
+        if kind not in ("ok", "bad"):
+            raise ValueError(f"rule {name}: kind must be 'ok' or 'bad'")
+        if kind == "bad" and not (min_count or rate_per_min):
+            min_count = 1
+        self.name = name
+        self.pattern = pattern
+        self.kind = kind
+        self.min_count = min_count
+        self.rate_per_min = rate_per_min
+        self.severity = severity
+
+    def tripped(self, hits, minutes):
+        if self.kind != "bad" or not hits:
+            return False
+        if self.min_count and hits < self.min_count:
+            return False
+        if self.rate_per_min and hits / minutes < self.rate_per_min:
+            return False
+        return True
+
+
+def _minutes(batch):
+    """Batch time span in minutes, at least 1 so short bursts aren't inflated."""
+    try:
+        first = datetime.fromisoformat(batch[0]['message']['timestamp'].replace("Z", "+00:00"))
+        last = datetime.fromisoformat(batch[-1]['message']['timestamp'].replace("Z", "+00:00"))
+        return max(1.0, (last - first).total_seconds() / 60)
+    except (KeyError, ValueError, AttributeError):
+        return 1.0
+
+
+class RuleEngine:
+    def __init__(self, rules, alert_status, unknown_share=UNKNOWN_SHARE):
+        self.rules = list(rules)
+        self.alert_status = alert_status
+        self.unknown_share = unknown_share
+        self._groups = {f"r{i}": rule for i, rule in enumerate(self.rules)}
+        self._bad_rx = self._compile("bad")
+        self._ok_rx = self._compile("ok")
+        self._lock = threading.Lock()
+        self.hits = {rule.name: 0 for rule in self.rules}
+        self.outcomes = {"ok": 0, "bad": 0, "llm": 0}
+
+    def _compile(self, kind):
+        """One alternation of the rules of this kind, or None if there are none."""
+        parts = [f"(?P<r{i}>{rule.pattern})" for i, rule in enumerate(self.rules) if rule.kind == kind]
+        return re.compile("|".join(parts)) if parts else None
+
+    @classmethod
+    def load(cls, alert_status, path=RULES_FILE):
+        """RuleEngine from a JSON list of rule objects, or None if path is missing."""
+        try:
+            with open(path) as f:
+                specs = json.load(f)
+        except FileNotFoundError:
+            return None
+        rules = [Rule(**spec) for spec in specs]
+        print(f"[RULES] Loaded {len(rules)} rules from {path}")
+        return cls(rules, alert_status)
+
+    def classify(self, batch):
+        counts = dict.fromkeys(self.hits, 0)
+        unmatched = 0
+        searches = [rx.search for rx in (self._bad_rx, self._ok_rx) if rx]
+        for msg in batch:
+            text = msg['message'].get('message') or ""
+            for search in searches:
+                m = search(text)
+                if m is not None:
+                    counts[self._groups[m.lastgroup].name] += 1
+                    break
+            else:
+                unmatched += 1
+
+        minutes = _minutes(batch)
+        tripped = [(rule, counts[rule.name]) for rule in self.rules if rule.tripped(counts[rule.name], minutes)]
+        bad_hits = any(counts[rule.name] for rule in self.rules if rule.kind == "bad")
+        if tripped:
+            outcome = "bad"
+            summary = "; ".join(f"rule '{r.name}' matched {n} messages ({n / minutes:.1f}/min)" for r, n in tripped)
+            result = verdict.render(max(r.severity for r, _ in tripped), self.alert_status,
+                                    f"Rule engine: {summary} in {len(batch)} messages over {minutes:.0f} min.")
+        elif not bad_hits and unmatched <= self.unknown_share * len(batch):
+            outcome = "ok"
+            top = sorted(((n, name) for name, n in counts.items() if n), reverse=True)[:3]
+            result = verdict.render(1, verdict.OK, "Rule engine: routine traffic only ("
+                                    + ", ".join(f"{name} x{n}" for n, name in top) + ").")
+        else:
+            outcome, result = "llm", None
+
+        with self._lock:
+            for name, n in counts.items():
+                self.hits[name] += n
+            self.outcomes[outcome] += 1
+        return outcome, result
+
+    def stats_line(self):
+        with self._lock:
+            out = ", ".join(f"{k}={v}" for k, v in self.outcomes.items())
+            hits = ", ".join(f"{k}={v}" for k, v in sorted(self.hits.items(), key=lambda kv: -kv[1]))
+        return f"batches {out} | hits {hits}"
@@ -0,0 +1,83 @@
+"""
+Adaptive, deadline-based scheduling for the audit loops.
+
+Sleeping a fixed interval after each audit lets the period drift by however
+long the audit took, and keeps querying Graylog at full rate through hours
+of silence. A Schedule ticks on deadlines instead: the next audit starts
+one interval after the previous one *started*. If an audit overruns its
+slot, the next one starts right away. Missed slots are not made up in a burst.
+
+The interval adapts to what the audit reported:
+
+  QUIET   nothing new      interval grows by SCHEDULE_BACKOFF, up to
+                           SCHEDULE_MAX_SECONDS
+  ACTIVE  work was done    back to the audit's base interval
+  ALERT   issue verdict    SCHEDULE_MIN_SECONDS for the next
+                           SCHEDULE_HOT_SECONDS, whatever follows
+
+Each delay is spread by +/- SCHEDULE_JITTER (a fraction), and the first
+audit is offset by a random share of that, so several agent replicas
+don't hit Graylog in lockstep.
+"""
+
+import os
+import random
+import time
+
+QUIET, ACTIVE, ALERT = "quiet", "active", "alert"
+
+MIN_SECONDS = float(os.getenv('SCHEDULE_MIN_SECONDS', 15))
+MAX_SECONDS = float(os.getenv('SCHEDULE_MAX_SECONDS', 600))
+BACKOFF = float(os.getenv('SCHEDULE_BACKOFF', 1.5))
+HOT_SECONDS = float(os.getenv('SCHEDULE_HOT_SECONDS', 900))
+JITTER = float(os.getenv('SCHEDULE_JITTER', 0.1))
+
+
+class Schedule:
+    def __init__(self, base, min_interval=MIN_SECONDS, max_interval=MAX_SECONDS,
+                 backoff=BACKOFF, hot_seconds=HOT_SECONDS, jitter=JITTER,
+                 clock=time.monotonic, sleep=time.sleep):
+        self.base = base
+        self.min_interval = min(min_interval, base)
+        self.max_interval = max(max_interval, base)
+        self.backoff = backoff
+        self.hot_seconds = hot_seconds
+        self.jitter = jitter
+        self.clock = clock
+        self.sleep = sleep
+        self.interval = base
+        self.hot_until = 0.0
+        self.overruns = 0
+        self.deadline = clock() + random.uniform(0, jitter * base)
+
+    def update(self, outcome):
+        """Pick the next interval from an audit outcome (QUIET/ACTIVE/ALERT/None)."""
+        now = self.clock()
+        if outcome == ALERT:
+            self.hot_until = now + self.hot_seconds
+        if now < self.hot_until:
+            self.interval = self.min_interval
+        elif outcome == QUIET:
+            self.interval = min(self.max_interval, max(self.interval, self.base) * self.backoff)
+        else:
+            self.interval = self.base
+        return self.interval
+
+    def advance(self, outcome=None):
+        """Move the deadline one (jittered) interval past the previous one."""
+        interval = self.update(outcome)
+        if self.jitter:
+            interval *= 1 + random.uniform(-self.jitter, self.jitter)
+        self.deadline += interval
+        now = self.clock()
+        if self.deadline < now:
+            # Overran the slot: start now instead of catching up
+            self.overruns += 1
+            self.deadline = now
+        return self.deadline
+
+    def wait(self):
+        """Sleep until the current deadline."""
+        delay = self.deadline - self.clock()
+        if delay > 0:
+            self.sleep(delay)
@@ -0,0 +1,78 @@
+"""
+Graylog streams watched by one Sentinel process.
+
+Without a streams file the agent watches GRAYLOG_STREAM_ID as the "wifi"
+stream, exactly as before. GRAYLOG_STREAMS_FILE (default streams.json next
+to the agent) lists several:
+
+  [{"name": "wifi", "stream_id": "65a1...", "profile": "wifi",
+    "priority": 10, "interval": 60},
+   {"name": "auth", "stream_id": "65b2...", "profile": "security",
+    "priority": 5, "interval": 300}]
+
+Each stream gets its own audit thread and adaptive schedule (interval is
+its base), its own checkpoint, audit log and template state, and the
+prompt profile it names. Inference from every stream goes through the
+shared queue; when streams compete for Ollama, the higher priority runs
+first.
+
+File paths default to <output>/<name>_checkpoint.json, <name>_audit.log and
+log_templates_<name>.json. A stream named like the legacy one keeps the
+legacy files (last_timestamp.txt, wifi_interference.log ...), so moving an
+existing setup into a streams file doesn't reset its checkpoint.
+"""
+
+import json
+import os
+import re
+
+STREAMS_FILE = os.getenv('GRAYLOG_STREAMS_FILE', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "streams.json"))
+
+_NAME = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+class Stream:
+    __slots__ = ("name", "stream_id", "profile", "priority", "interval", "state_file", "log_file", "template_file")
+
+    def __init__(self, name, stream_id, profile="wifi", priority=0, interval=60,
+                 state_file=None, log_file=None, template_file=None):
+        if not _NAME.match(name):
+            raise ValueError(f"stream {name!r}: name may only use letters, digits, '_' and '-'")
+        self.name = name
+        self.stream_id = stream_id
+        self.profile = profile
+        self.priority = priority
+        self.interval = interval
+        self.state_file = state_file
+        self.log_file = log_file
+        self.template_file = template_file
+
+    def __repr__(self):
+        return f"Stream({self.name}, {self.stream_id}, profile={self.profile}, priority={self.priority}, interval={self.interval})"
+
+
+def load(legacy, output_dir, path=STREAMS_FILE):
+    """Streams from path, or [legacy] if the file is missing.
+
+    legacy is the single stream built from the old environment variables;
+    its paths and interval fill in an entry of the same name.
+    """
+    try:
+        with open(path) as f:
+            specs = json.load(f)
+    except FileNotFoundError:
+        return [legacy]
+
+    streams = []
+    for spec in specs:
+        name = spec["name"]
+        same = name == legacy.name
+        spec.setdefault("interval", legacy.interval)
+        spec.setdefault("state_file", legacy.state_file if same else os.path.join(output_dir, f"{name}_checkpoint.json"))
+        spec.setdefault("log_file", legacy.log_file if same else os.path.join(output_dir, f"{name}_audit.log"))
+        spec.setdefault("template_file", legacy.template_file if same else os.path.join(output_dir, f"log_templates_{name}.json"))
+        streams.append(Stream(**spec))
+    if len({s.name for s in streams}) != len(streams):
+        raise ValueError(f"{path}: stream names must be unique")
+    print(f"[STREAMS] Loaded {len(streams)} streams from {path}: " + ", ".join(s.name for s in streams))
+    return streams
@@ -0,0 +1,248 @@
+"""
+Drain-style log template mining, so prompts carry templates instead of raw lines.
+
+Wi-Fi flapping produces thousands of lines that differ only in a MAC, an IP
+or a counter. Each message is masked (IPs, MACs, hex, numbers become <IP>,
+<MAC>, <HEX>, <NUM>), tokenized, and routed down a fixed-depth tree keyed
+by token count and the first few tokens, as in Drain (He et al., ICWS
+2017). Within the leaf it joins the most similar cluster if at least
+LOG_TEMPLATE_SIMILARITY of the tokens match. Positions that differ become <*>.
+
+The prompt then has one line per template:
+
+  [x412 08:01:13 -> 08:05:52] hostapd: <*> STA <MAC> IEEE <NUM>: disassociated  | MAC: aa:bb:cc:00:11:22 x380, ... | *: wlan1: x300, wlan0: x112
+
+Listing the most frequent values per variable keeps the detail that
+matters for flapping (which client, which radio) without repeating lines.
+
+Clusters (template, all-time count, first/last seen) persist across cycles
+in LOG_TEMPLATE_STATE as JSON, so template ids stay stable and old noise is
+recognized immediately after a restart.
+"""
+
+import json
+import os
+import re
+import threading
+from collections import Counter
+
+SIMILARITY = float(os.getenv('LOG_TEMPLATE_SIMILARITY', 0.5))
+DEPTH = int(os.getenv('LOG_TEMPLATE_DEPTH', 4))
+MAX_CHILDREN = int(os.getenv('LOG_TEMPLATE_MAX_CHILDREN', 100))
+MAX_CLUSTERS = int(os.getenv('LOG_TEMPLATE_MAX_CLUSTERS', 2000))
+PROMPT_MAX_LINES = int(os.getenv('LOG_TEMPLATE_PROMPT_LINES', 300))
+# Most frequent values shown per variable kind; kinds with more distinct
+# values than NOISY_DISTINCT and no repeats (counters, uptimes) are omitted
+TOP_VALUES = 3
+NOISY_DISTINCT = 10
+
+WILDCARD = "<*>"
+
+# Appended to the system prompt when the prompt body is a summarize() view
+PROMPT_NOTE = ("Logs are grouped into templates, one per line: [xCOUNT first -> last] template. "
+               "<*>, <MAC>, <IP>, <HEX>, <NUM> mark fields that vary; after '|' come their most "
+               "frequent values with counts.")
+
+# Order matters: MACs and IPs before bare hex/numbers
+_MASKS = [
+    ("MAC", re.compile(r"\b[0-9a-fA-F]{2}(?::[0-9a-fA-F]{2}){5}\b")),
+    ("IP", re.compile(r"\b\d{1,3}(?:\.\d{1,3}){3}(?::\d+)?\b")),
+    ("HEX", re.compile(r"\b0x[0-9a-fA-F]+\b|\b[0-9a-fA-F]{8,}\b")),
+    ("NUM", re.compile(r"(?<![\w.])[-+]?\d+(?:\.\d+)?(?![\w.])")),
+]
+_MASK_RE = re.compile("|".join(f"(?P<{name}>{rx.pattern})" for name, rx in _MASKS))
+
+
+def mask(text):
+    """Return (masked_tokens, [(kind, value), ...]) for one message."""
+    variables = []
+
+    def sub(m):
+        variables.append((m.lastgroup, m.group()))
+        return f"<{m.lastgroup}>"
+
+    return _MASK_RE.sub(sub, text).split(), variables
+
+
+def _has_digit(token):
+    return any(c.isdigit() for c in token)
+
+
+class Cluster:
+    __slots__ = ("id", "tokens", "count", "first", "last")
+
+    def __init__(self, cid, tokens, count=0, first=None, last=None):
+        self.id = cid
+        self.tokens = tokens
+        self.count = count
+        self.first = first
+        self.last = last
+
+    @property
+    def template(self):
+        return " ".join(self.tokens)
+
+    def similarity(self, tokens):
+        same = sum(1 for a, b in zip(self.tokens, tokens) if a == b or a == WILDCARD)
+        return same / len(tokens) if tokens else 1.0
+
+    def merge(self, tokens):
+        self.tokens = [a if a == b else WILDCARD for a, b in zip(self.tokens, tokens)]
+
+    def to_json(self):
+        return {"id": self.id, "template": self.tokens, "count": self.count,
+                "first": self.first, "last": self.last}
+
+
+class TemplateMiner:
+    """Streaming Drain miner. add() is thread-safe; state persists via save()."""
+
+    def __init__(self, state_file=None, similarity=SIMILARITY, depth=DEPTH,
+                 max_children=MAX_CHILDREN, max_clusters=MAX_CLUSTERS):
+        self.state_file = state_file
+        self.similarity = similarity
+        self.depth = max(3, depth)
+        self.max_children = max_children
+        self.max_clusters = max_clusters
+        self._lock = threading.Lock()
+        self._root = {}
+        self._clusters = {}
+        self._next_id = 1
+        if state_file:
+            self.load()
+
+    def __len__(self):
+        return len(self._clusters)
+
+    # --- tree ----------------------------------------------------------
+    def _leaf(self, tokens):
+        node = self._root.setdefault(len(tokens), {})
+        for token in tokens[:self.depth - 2]:
+            key = WILDCARD if _has_digit(token) else token
+            if key not in node:
+                # Bound fan-out: overflow tokens share the wildcard branch
+                key = key if len(node) < self.max_children else WILDCARD
+            node = node.setdefault(key, {})
+        return node.setdefault(None, [])
+
+    def _match(self, tokens):
+        leaf = self._leaf(tokens)
+        best, best_sim = None, -1.0
+        for cluster in leaf:
+            sim = cluster.similarity(tokens)
+            if sim > best_sim:
+                best, best_sim = cluster, sim
+        if best is not None and best_sim >= self.similarity:
+            return best, False
+        cluster = Cluster(self._next_id, list(tokens))
+        self._next_id += 1
+        leaf.append(cluster)
+        self._clusters[cluster.id] = cluster
+        return cluster, True
+
+    def add(self, text, ts=None):
+        """Mine one message; return (cluster, variables).
+
+        variables are the masked values plus ("*", token) for each token
+        that sits at a <*> position of the template.
+        """
+        tokens, variables = mask(text)
+        with self._lock:
+            cluster, new = self._match(tokens)
+            if not new:
+                cluster.merge(tokens)
+                variables += [("*", tok) for tmpl, tok in zip(cluster.tokens, tokens) if tmpl == WILDCARD]
+            cluster.count += 1
+            if ts:
+                cluster.first = cluster.first or ts
+                cluster.last = ts
+            if new and len(self._clusters) > self.max_clusters:
+                self._evict()
+        return cluster, variables
+
+    def _evict(self):
+        """Drop the least recently seen tenth of the clusters."""
+        victims = sorted(self._clusters.values(), key=lambda c: c.last or "")[:max(1, self.max_clusters // 10)]
+        gone = {c.id for c in victims}
+        for cid in gone:
+            del self._clusters[cid]
+        self._rebuild(prune=gone)
+
+    def _rebuild(self, prune=()):
+        self._root = {}
+        for cluster in sorted(self._clusters.values(), key=lambda c: c.id):
+            if cluster.id not in prune:
+                self._leaf(cluster.tokens).append(cluster)
+
+    # --- prompt --------------------------------------------------------
+    def summarize(self, messages, max_lines=PROMPT_MAX_LINES):
+        """Mine (timestamp, text) pairs; return the clustered prompt text."""
+        seen = {}
+        for ts, text in messages:
+            cluster, variables = self.add(text, ts)
+            entry = seen.get(cluster.id)
+            if entry is None:
+                entry = seen[cluster.id] = [cluster, 0, ts, ts, {}]
+            entry[1] += 1
+            entry[3] = ts
+            for kind, value in variables:
+                entry[4].setdefault(kind, Counter())[value] += 1
+
+        entries = sorted(seen.values(), key=lambda e: (e[2] or ""))
+        if len(entries) > max_lines:
+            # Keep the loudest templates, still in first-seen order
+            keep = {id(e) for e in sorted(entries, key=lambda e: -e[1])[:max_lines]}
+            dropped = sum(e[1] for e in entries if id(e) not in keep)
+            entries = [e for e in entries if id(e) in keep]
+        else:
+            dropped = 0
+
+        lines = []
+        for cluster, count, first, last, values in entries:
+            span = first if first == last else f"{first} -> {last}"
+            lines.append(f"[x{count} {span}] {cluster.template}{_render_values(values)}")
+        if dropped:
+            lines.append(f"[+{dropped} more messages in {len(seen) - len(entries)} rarer templates]")
+        return "\n".join(lines)
+
+    # --- persistence ---------------------------------------------------
+    def load(self):
+        try:
+            with open(self.state_file) as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            print(f"[TEMPLATES] Ignoring unreadable {self.state_file}: {e}")
+            return
+        with self._lock:
+            self._clusters = {c["id"]: Cluster(c["id"], c["template"], c["count"], c["first"], c["last"])
+                              for c in state.get("clusters", [])}
+            self._next_id = state.get("next_id", max(self._clusters, default=0) + 1)
+            self._rebuild()
+
+    def save(self):
+        if not self.state_file:
+            return
+        with self._lock:
+            state = {"next_id": self._next_id, "clusters": [c.to_json() for c in self._clusters.values()]}
+        tmp = f"{self.state_file}.tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump(state, f)
+            os.replace(tmp, self.state_file)
+        except OSError as e:
+            print(f"[TEMPLATES] Cannot write {self.state_file}: {e}")
+
+
+def _render_values(values):
+    parts = []
+    for kind, counter in values.items():
+        top = counter.most_common(TOP_VALUES)
+        if len(counter) > NOISY_DISTINCT and top[0][1] == 1:
+            continue
+        text = ", ".join(f"{v} x{n}" for v, n in top)
+        if len(counter) > TOP_VALUES:
+            text += f" (+{len(counter) - TOP_VALUES} more)"
+        parts.append(f"{kind}: {text}")
+    return "  | " + " | ".join(parts) if parts else ""
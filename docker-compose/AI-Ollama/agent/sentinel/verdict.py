@@ -0,0 +1,88 @@
+"""
+Parsing and combining the SCORE / STATUS / SUMMARY verdicts the Sentinel
+asks Ollama for.
+"""
+
+import re
+
+# Fields may sit on their own lines or share one, as the prompts ask
+# ("SCORE: 3, STATUS: OK, SUMMARY: ..."): SCORE and STATUS values end at a
+# comma or newline, SUMMARY runs to the end of the reply.
+_FIELD_RE = re.compile(r"\b(SCORE|STATUS|SUMMARY)[\s*]*:[\s*]*([^,\n]*)", re.I)
+
+OK = "OK"
+ERROR = "ERROR"
+# A window that replied with text but no recognizable status
+UNKNOWN = "UNKNOWN"
+
+
+def parse(text):
+    """Return {"score", "status", "summary"} from a model reply.
+
+    Fields are found anywhere in the reply, one per line or comma-separated
+    on one line. Missing fields come back as None (score, status) or the
+    whole reply (summary). Markdown bold and [brackets] around values are
+    ignored.
+    """
+    score = status = None
+    summary_at = None
+    for m in _FIELD_RE.finditer(text):
+        field, value = m.group(1).upper(), m.group(2).strip().strip("[]*'\" ")
+        if field == "SCORE" and score is None:
+            digits = re.match(r"\d+", value)
+            score = int(digits.group()) if digits else None
+        elif field == "STATUS" and status is None:
+            status = value.split()[0].upper() if value else None
+        elif field == "SUMMARY" and summary_at is None:
+            summary_at = m.start(2)
+    summary = text[summary_at:].strip() if summary_at is not None else text.strip()
+    return {"score": score, "status": status, "summary": summary}
+
+
+def failed(text):
+    """True for replies that must not be cached or trusted as a verdict."""
+    return not text or text == "Inference Failure" or parse(text)["status"] == ERROR
+
+
+def render(score, status, summary):
+    return f"SCORE: {score}\nSTATUS: {status}\nSUMMARY: {summary}"
+
+
+def _window_status(text, parsed, statuses):
+    """Status of one window reply. Only a failed call counts as ERROR; a
+    reply without a STATUS field is searched for one of statuses (the
+    profile's, alert first) and is UNKNOWN if none appears."""
+    if parsed["status"]:
+        return parsed["status"]
+    if not text or not text.strip() or text == "Inference Failure":
+        return ERROR
+    for candidate in statuses or ():
+        if re.search(rf"(?<![A-Za-z_]){re.escape(candidate)}(?![A-Za-z_])", text, re.I):
+            return candidate.upper()
+    return UNKNOWN
+
+
+def reduce(texts, labels=None, statuses=None):
+    """Combine per-window replies into one verdict string.
+
+    Highest score wins; any non-OK status outranks OK, and an alert status
+    outranks ERROR so a failed window can't mask a detected problem. A
+    window with text but no parsable status is never an ERROR (see
+    _window_status); it ranks below ERROR and above OK as UNKNOWN. The
+    summary lists each non-OK window (or the top-scoring one if all are OK).
+    """
+    parsed = [parse(t) for t in texts]
+    labels = labels or [f"window {i + 1}/{len(texts)}" for i in range(len(texts))]
+    found = [_window_status(t, p, statuses) for t, p in zip(texts, parsed)]
+    alerts = [s for s in found if s not in (OK, ERROR, UNKNOWN)]
+    if alerts:
+        status = max(set(alerts), key=alerts.count)
+    else:
+        status = next((s for s in (ERROR, UNKNOWN) if s in found), OK)
+    score = max((p["score"] for p in parsed if p["score"] is not None), default=0)
+
+    notable = [(label, p) for label, p, s in zip(labels, parsed, found) if s != OK]
+    if not notable:
+        notable = [max(zip(labels, parsed), key=lambda lp: lp[1]["score"] or 0)]
+    summary = " ".join(f"[{label}] {p['summary']}" for label, p in notable)
+    return render(score, status, summary)
@@ -0,0 +1,58 @@
+"""
+Shared priority queue in front of Ollama, drained by a fixed worker pool.
+
+All audits (the Zigbee mesh and every Graylog stream) hand their inference
+calls to one InferenceQueue instead of racing for a semaphore. A fixed
+number of worker threads (OLLAMA_NUM_PARALLEL, matching the Ollama
+server) take the highest-priority job first. Jobs of equal priority run
+in submission order, so a large backlog on a low-priority stream only
+gets the GPU when nothing more important is waiting.
+
+submit() returns a concurrent.futures.Future; run() submits and waits.
+"""
+
+import itertools
+import queue
+import threading
+from concurrent.futures import Future
+
+
+class InferenceQueue:
+    def __init__(self, workers, name="inference"):
+        self._q = queue.PriorityQueue()
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self.busy = 0
+        self.done = 0
+        self.workers = [threading.Thread(target=self._work, name=f"{name}-{i}", daemon=True)
+                        for i in range(max(1, workers))]
+        for t in self.workers:
+            t.start()
+
+    def submit(self, priority, fn, *args, **kwargs):
+        """Queue fn(*args, **kwargs); higher priority runs first."""
+        fut = Future()
+        self._q.put((-priority, next(self._seq), fut, fn, args, kwargs))
+        return fut
+
+    def run(self, priority, fn, *args, **kwargs):
+        return self.submit(priority, fn, *args, **kwargs).result()
+
+    def depth(self):
+        return self._q.qsize()
+
+    def _work(self):
+        while True:
+            _, _, fut, fn, args, kwargs = self._q.get()
+            if not fut.set_running_or_notify_cancel():
+                continue
+            with self._lock:
+                self.busy += 1
+            try:
+                fut.set_result(fn(*args, **kwargs))
+            except BaseException as e:
+                fut.set_exception(e)
+            finally:
+                with self._lock:
+                    self.busy -= 1
+                    self.done += 1
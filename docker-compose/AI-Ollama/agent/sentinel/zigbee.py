@@ -0,0 +1,76 @@
+"""
+Zigbee mesh fingerprinting, so unchanged mesh state skips inference.
+
+Each Zigbee entity is reduced to a coarse token before hashing:
+
+  unavailable / unknown      kept as-is (a node dropping off always counts)
+  *linkquality* numeric      the LQI band, value // ZIGBEE_LQI_BAND
+  anything else              the raw state string
+
+Link quality jitters by a few points every poll, so only a move into a
+different band changes the digest. An unchanged digest reuses the last
+verdict until it is ZIGBEE_REANALYZE_SECONDS old (0 = reuse forever).
+"""
+
+import hashlib
+import os
+import threading
+import time
+
+LQI_BAND = int(os.getenv('ZIGBEE_LQI_BAND', 25))
+REANALYZE_SECONDS = int(os.getenv('ZIGBEE_REANALYZE_SECONDS', 3600))
+
+_MISSING = ("unavailable", "unknown")
+
+
+def is_zigbee(entity_id):
+    """The entities the Zigbee audit looks at."""
+    return 'linkquality' in entity_id or 'zigbee' in entity_id.lower()
+
+
+def token(entity_id, state):
+    """Coarse, comparison-friendly form of one entity's state."""
+    if state in _MISSING:
+        return state
+    if 'linkquality' in entity_id:
+        try:
+            return f"lqi{int(float(state)) // LQI_BAND}"
+        except (TypeError, ValueError):
+            pass
+    return str(state)
+
+
+def digest(states):
+    """Fingerprint a list of HA state objects ({'entity_id', 'state', ...})."""
+    h = hashlib.sha256()
+    for entity_id, tok in sorted((s['entity_id'], token(s['entity_id'], s.get('state'))) for s in states):
+        h.update(f"{entity_id}={tok}\n".encode())
+    return h.hexdigest()
+
+
+class MeshDigest:
+    """Remembers the last analyzed digest and the verdict it produced."""
+
+    def __init__(self, max_age=REANALYZE_SECONDS):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._digest = None
+        self._verdict = None
+        self._at = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, states):
+        """Return (digest, verdict); verdict is None when inference is needed."""
+        d = digest(states)
+        with self._lock:
+            fresh = not self.max_age or time.monotonic() - self._at < self.max_age
+            if d == self._digest and fresh:
+                self.hits += 1
+                return d, self._verdict
+            self.misses += 1
+            return d, None
+
+    def remember(self, d, verdict):
+        with self._lock:
+            self._digest, self._verdict, self._at = d, verdict, time.monotonic()
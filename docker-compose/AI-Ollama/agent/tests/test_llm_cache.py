@@ -0,0 +1,74 @@
+"""
+Verdict cache: a miss on an empty cache stores the verdict, and the next
+identical prompt is a hit that never reaches Ollama.
+
+Run from agent/:  python3 -m unittest discover -s tests
+"""
+
+import importlib.util
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+AGENT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, AGENT_DIR)
+os.environ.setdefault('LLM_CACHE', '0')
+os.environ.setdefault('LOG_TEMPLATES', '0')
+
+from sentinel import llm_cache  # noqa: E402
+
+
+def load_agent(filename, name):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(AGENT_DIR, filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class EmptyCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.cache = llm_cache.VerdictCache(os.path.join(self.dir, "verdicts.sqlite"))
+        self.calls = []
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def fake_generate(self, *args, **kwargs):
+        self.calls.append(args)
+        return "SCORE: 2\nSTATUS: OK\nSUMMARY: quiet"
+
+    def test_cache_miss_then_hit(self):
+        key = llm_cache.cache_key("m", "sys", "prompt")
+        self.assertEqual(len(self.cache), 0)
+        self.assertIsNone(self.cache.get(key))
+        self.cache.put(key, "verdict")
+        self.assertEqual(self.cache.get(key), "verdict")
+        self.assertEqual((self.cache.misses, self.cache.hits), (1, 1))
+
+    def test_sentinel_infer_uses_empty_cache(self):
+        agent = load_agent("agent.py", "agent")
+        sentinel = agent.RestoredSentinel.__new__(agent.RestoredSentinel)
+        sentinel.verdicts = self.cache
+        sentinel.ollama_generate = self.fake_generate
+        first = sentinel.infer("sys", "zigbee.node_1: unavailable")
+        second = sentinel.infer("sys", "zigbee.node_1: unavailable")
+        self.assertEqual(first, second)
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual((self.cache.misses, self.cache.hits), (1, 1))
+
+    def test_graylog_all_ask_ollama_uses_empty_cache(self):
+        agent = load_agent("agent-graylog-all.py", "agent_graylog_all")
+        agent.VERDICTS = self.cache
+        agent.generate = self.fake_generate
+        first = agent.ask_ollama("LOG DATA: sshd failed password")
+        second = agent.ask_ollama("LOG DATA: sshd failed password")
+        self.assertEqual(first, second)
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual((self.cache.misses, self.cache.hits), (1, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
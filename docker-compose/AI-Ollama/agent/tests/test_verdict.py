@@ -0,0 +1,87 @@
+"""
+Verdict parsing: the one-line "SCORE: n, STATUS: X, SUMMARY: ..." format the
+prompts ask for parses the same as one field per line, window verdicts
+reduce without turning an unparsed reply into ERROR, and a streamed reply
+fires the early alert as soon as its STATUS value is complete.
+
+Run from agent/:  python3 -m unittest discover -s tests
+"""
+
+import json
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from sentinel import ollama, verdict  # noqa: E402
+
+
+class FakeStream:
+    status_code = 200
+
+    def __init__(self, pieces):
+        self.lines = [json.dumps({"response": p}).encode() for p in pieces]
+        self.lines.append(json.dumps({"response": "", "done": True}).encode())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def iter_lines(self):
+        return iter(self.lines)
+
+
+class ParseTest(unittest.TestCase):
+    def test_one_line_format(self):
+        parsed = verdict.parse("SCORE: 8, STATUS: RF_INTERFERENCE, SUMMARY: deauth storm, ch 36")
+        self.assertEqual(parsed, {"score": 8, "status": "RF_INTERFERENCE", "summary": "deauth storm, ch 36"})
+
+    def test_one_field_per_line(self):
+        parsed = verdict.parse("**SCORE:** [3]\n**STATUS:** [OK]\n**SUMMARY:** quiet\nno drops")
+        self.assertEqual(parsed, {"score": 3, "status": "OK", "summary": "quiet\nno drops"})
+
+
+class ReduceTest(unittest.TestCase):
+    STATUSES = ("RF_INTERFERENCE", "OK")
+
+    def test_mixed_windows_keep_the_alert(self):
+        reduced = verdict.parse(verdict.reduce(
+            ["SCORE: 8, STATUS: RF_INTERFERENCE, SUMMARY: deauth storm", "SCORE: 2\nSTATUS: OK\nSUMMARY: quiet"],
+            statuses=self.STATUSES))
+        self.assertEqual((reduced["score"], reduced["status"]), (8, "RF_INTERFERENCE"))
+
+    def test_window_without_status_field_is_not_an_error(self):
+        texts = ["The logs show RF_INTERFERENCE on channel 36.", "SCORE: 2, STATUS: OK, SUMMARY: quiet"]
+        self.assertEqual(verdict.parse(verdict.reduce(texts, statuses=self.STATUSES))["status"], "RF_INTERFERENCE")
+        texts = ["Nothing unusual stands out.", "SCORE: 2, STATUS: OK, SUMMARY: quiet"]
+        self.assertEqual(verdict.parse(verdict.reduce(texts, statuses=self.STATUSES))["status"], verdict.UNKNOWN)
+
+    def test_failed_window_is_an_error(self):
+        texts = ["Inference Failure", "SCORE: 2, STATUS: OK, SUMMARY: quiet"]
+        self.assertEqual(verdict.parse(verdict.reduce(texts, statuses=self.STATUSES))["status"], verdict.ERROR)
+
+
+class EarlyVerdictTest(unittest.TestCase):
+    def run_stream(self, pieces):
+        fired = []
+        ollama.generate(lambda url, **kw: FakeStream(pieces), "http://ollama", {"stream": True},
+                        on_verdict=lambda score, status: fired.append((score, status)))
+        return fired
+
+    def test_fires_on_comma_before_summary(self):
+        pieces = ["SCORE", ": 8", ", STATUS", ": RF_INTER", "FERENCE", ",", " SUMMARY", ": burst"]
+        self.assertEqual(self.run_stream(pieces), [(8, "RF_INTERFERENCE")])
+
+    def test_partial_status_does_not_fire(self):
+        self.assertIsNone(ollama._early("SCORE: 8, STATUS: RF_INTER", False))
+        self.assertEqual(ollama._early("SCORE: 8, STATUS: RF_INTERFERENCE,", False), (8, "RF_INTERFERENCE"))
+
+    def test_reply_ending_on_status_fires(self):
+        self.assertEqual(self.run_stream(["SCORE: 2, STATUS: OK"]), [(2, "OK")])
+
+
+if __name__ == "__main__":
+    unittest.main()
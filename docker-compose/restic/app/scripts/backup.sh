@@ -48,13 +48,19 @@ MAX_AGE_HOURS="${JOB_MAX_AGE_HOURS:-25}"
 # Per-job JOB_VERBOSITY overrides the RESTIC_VERBOSITY default in .env.
 VERBOSITY="${JOB_VERBOSITY:-${RESTIC_VERBOSITY:-1}}"
 
+# 1 = run restic with --json and stream it through status-api/progress.py,
+# which publishes live progress at /progress/<job> (see README).
+JSON_PROGRESS="${JOB_JSON_PROGRESS:-${RESTIC_JSON_PROGRESS:-0}}"
+
 HOSTNAME="$(hostname -s)"
 LOG_DIR="/app/logs"
 LOG_FILE="$LOG_DIR/backup-${JOB_NAME}-$(date +%F).log"
 STATUS_FILE="$LOG_DIR/status/${JOB_NAME}.json"
+HISTORY_DIR="$LOG_DIR/history"
+PROGRESS_DIR="$LOG_DIR/progress"
 LOCK_FILE="$LOG_DIR/.repo.lock"
 
-mkdir -p "$LOG_DIR/status"
+mkdir -p "$LOG_DIR/status" "$HISTORY_DIR" "$PROGRESS_DIR"
 
 notify() {
   local msg="$1"
@@ -79,6 +85,13 @@ except:
   fi
 }
 
+# Append this run to history/<job>.hist (see status-api/history.py). Best
+# effort: a history problem must never turn a good backup into a failure.
+record_history() {
+  python3 /app/status-api/history.py append "$HISTORY_DIR" "$JOB_NAME" "$@" \
+    || echo "WARNING: could not append to backup history" | tee -a "$LOG_FILE"
+}
+
 write_status() {
   local status="$1"
   local now
@@ -103,6 +116,8 @@ d = {
 }
 print(json.dumps(d, indent=2))
 " > "$STATUS_FILE"
+    record_history --status ok --time "$now" --snapshot "$snapshot" \
+      --files "$files" --added "$added" --duration "$duration"
   else
     local error="$1"
     local last_success
@@ -120,6 +135,7 @@ d = {
 }
 print(json.dumps(d, indent=2))
 " > "$STATUS_FILE"
+    record_history --status fail --time "$now"
   fi
 }
 
@@ -213,8 +229,16 @@ done
 # the result parser reads below. pipefail makes the pipeline fail if restic does.
 # Capture restic's own exit code (PIPESTATUS[0]) — not tee's. `|| true` keeps
 # `set -e` from aborting before we can inspect the code.
-restic --no-lock "--verbose=$VERBOSITY" backup --tag "$JOB_NAME" "${EXCLUDE_ARGS[@]}" "${BACKUP_PATHS[@]}" 2>&1 \
-  | tee -a "$LOG_FILE" || true
+# In JSON mode progress.py sits in the middle: it turns the event stream into
+# progress/<job>.json plus readable log lines, in constant memory.
+if [[ "$JSON_PROGRESS" == "1" ]]; then
+  restic --no-lock --json "--verbose=$VERBOSITY" backup --tag "$JOB_NAME" "${EXCLUDE_ARGS[@]}" "${BACKUP_PATHS[@]}" 2>&1 \
+    | python3 /app/status-api/progress.py follow "$PROGRESS_DIR" "$JOB_NAME" \
+    | tee -a "$LOG_FILE" || true
+else
+  restic --no-lock "--verbose=$VERBOSITY" backup --tag "$JOB_NAME" "${EXCLUDE_ARGS[@]}" "${BACKUP_PATHS[@]}" 2>&1 \
+    | tee -a "$LOG_FILE" || true
+fi
 restic_rc=${PIPESTATUS[0]}
 
 # restic exit codes: 0 = success; 3 = snapshot saved but some source files
@@ -230,10 +254,14 @@ elif [[ "$restic_rc" -ne 0 ]]; then
 fi
 
 #####################################
-# PARSE RESULTS FROM LOG
-# Use Python re — BusyBox grep does not support -P
+# PARSE RESULTS
+# JSON mode: progress.py already holds restic's summary — no log re-read.
+# Text mode: scan the log with Python re (BusyBox grep does not support -P)
 #####################################
-eval "$(python3 -c "
+if [[ "$JSON_PROGRESS" == "1" ]]; then
+  eval "$(python3 /app/status-api/progress.py result "$PROGRESS_DIR" "$JOB_NAME")"
+else
+  eval "$(python3 -c "
 import re, sys
 
 log = open(sys.argv[1]).read()
@@ -248,6 +276,7 @@ print('files='    + (proc.group(1)  if proc  else '0'))
 print('added=\"'  + (added.group(1) if added else 'unknown') + '\"')
 print('duration=' + (dur.group(1)   if dur   else 'unknown'))
 " "$LOG_FILE")"
+fi
 
 #####################################
 # SUCCESS — TRIGGER CLEANUP
@@ -14,18 +14,302 @@ Transitional: if no per-job status files exist yet but the legacy single-job
 /app/logs/status.json does, it is reported as job "_legacy" — this keeps the
 monitor green between deploying the multi-job code and the first new-style
 run. Safe to remove once all hosts have per-job status files.
+
+Parsed status files are cached in-process (see StatusCache): a file is only
+re-read when its (mtime, size, inode) signature changes, and with inotify
+available the directory is not even re-stat'ed until the kernel reports a
+write. Backups rewrite these files once a day; monitors poll every minute.
+
+Responses are serialized once per distinct body and served as immutable
+bytes with an ETag (and a pre-compressed gzip variant), so a poller sending
+If-None-Match gets a bodyless 304 while nothing has changed. /health,
+/metrics and /jobs aren't even rebuilt until the status cache's generation
+changes or the next age-rounding/staleness deadline passes. The server is
+threaded by default: one stalled client no longer blocks every monitor.
+
+/watch streams health transitions as server-sent events (see watch.py).
+
+With STATUS_PEERS set, /health becomes an aggregate of other hosts' status
+APIs (plus this host's own jobs, if it has any) — see federation.py.
 """
 
-import glob
+import gzip
+import hashlib
 import json
+import math
 import os
+import queue
+import re
+import socket
+import threading
+import time
 from datetime import datetime, timezone
-from http.server import BaseHTTPRequestHandler, HTTPServer
+from http.server import BaseHTTPRequestHandler, HTTPServer, ThreadingHTTPServer
+from urllib.parse import parse_qs
 
-STATUS_DIR = "/app/logs/status"
-LEGACY_STATUS_FILE = "/app/logs/status.json"
+import history
+from federation import Federation, merge, parse_peers
+from units import parse_duration, parse_size
+from watch import KEEPALIVE_SECONDS, HealthWatcher, format_event
+
+STATUS_DIR = os.environ.get("STATUS_DIR", "/app/logs/status")
+LEGACY_STATUS_FILE = os.environ.get("LEGACY_STATUS_FILE", "/app/logs/status.json")
+HISTORY_DIR = os.environ.get("HISTORY_DIR", "/app/logs/history")
+HISTORY_MAX_LIMIT = 10000
+PROGRESS_DIR = os.environ.get("PROGRESS_DIR", "/app/logs/progress")
+# Aggregator mode — see federation.py for the format.
+PEERS = os.environ.get("STATUS_PEERS", "")
+# Name of this host's own jobs in the aggregate ("<name>/<job>"); must not
+# collide with a peer name.
+LOCAL_NAME = os.environ.get("STATUS_LOCAL_NAME") or socket.gethostname().split(".")[0]
 PORT = int(os.environ.get("STATUS_PORT", 8484))
 DEFAULT_MAX_AGE_HOURS = 25
+# Same rule backup.sh/entrypoint.sh enforce on JOB_NAME — also keeps
+# /health/<job> from reaching outside STATUS_DIR.
+JOB_NAME_RE = re.compile(r"^[A-Za-z0-9_-]+$")
+
+# STATUS_INOTIFY=0 forces stat-only revalidation (e.g. if the status dir is
+# written from outside this container, where inotify sees nothing).
+USE_INOTIFY = os.environ.get("STATUS_INOTIFY", "1") != "0"
+# Even with inotify, do a full stat pass at least this often — a safety net
+# for missed events (queue overflow, directory recreated under us).
+REVALIDATE_SECONDS = float(os.environ.get("STATUS_REVALIDATE_SECONDS", 60))
+# STATUS_THREADED=0 restores the old single-threaded HTTP/1.0 server.
+THREADED = os.environ.get("STATUS_THREADED", "1") != "0"
+# Drop a client that stalls mid-request instead of holding its thread forever.
+REQUEST_TIMEOUT_SECONDS = float(os.environ.get("STATUS_REQUEST_TIMEOUT_SECONDS", 30))
+# Gzip bodies at least this large for clients that accept it; 0 disables.
+GZIP_MIN_BYTES = int(os.environ.get("STATUS_GZIP_MIN_BYTES", 1024))
+
+# <sys/inotify.h>
+_IN_MODIFY = 0x002
+_IN_ATTRIB = 0x004
+_IN_CLOSE_WRITE = 0x008
+_IN_MOVED_FROM = 0x040
+_IN_MOVED_TO = 0x080
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_IN_DELETE_SELF = 0x400
+_IN_MOVE_SELF = 0x800
+_WATCH_MASK = (_IN_MODIFY | _IN_ATTRIB | _IN_CLOSE_WRITE | _IN_MOVED_FROM
+               | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE | _IN_DELETE_SELF
+               | _IN_MOVE_SELF)
+
+
+def open_inotify(path):
+    """Return a non-blocking inotify fd watching path, or None if unavailable.
+
+    Uses libc through ctypes (stdlib only — the image has no pip). CDLL(None)
+    resolves against the running interpreter, which works on musl (Alpine)
+    where ctypes.util.find_library("c") does not.
+    """
+    try:
+        import ctypes
+        libc = ctypes.CDLL(None, use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            return None
+        if libc.inotify_add_watch(fd, os.fsencode(path), _WATCH_MASK) < 0:
+            os.close(fd)
+            return None
+        return fd
+    except (OSError, AttributeError):
+        return None
+
+
+class StatusCache:
+    """Parsed per-job status files, keyed by path and revalidated by stat.
+
+    jobs() returns {job_name: data_or_error_dict}, same shape as the old
+    glob-and-parse loader. A file is re-parsed only when its signature
+    (st_mtime_ns, st_size, st_ino) changes; backup.sh replaces the file on
+    every run, so any rewrite changes at least one of them. Files that
+    failed to parse are retried on every pass — they are usually caught
+    mid-write.
+
+    Numeric fields for /metrics (bytes, seconds) are derived once per parse
+    by job_numbers() and kept alongside the data — see numbers().
+
+    job(name) is the single-job path behind /health/<job>: a dict lookup
+    that revalidates at most that job's own file, never the whole directory.
+
+    generation increments whenever the visible job map (or the legacy file
+    behind it) changes, so callers can cheaply tell whether anything derived
+    from it is stale — see version().
+    """
+
+    def __init__(self, status_dir, legacy_file, use_inotify=USE_INOTIFY):
+        self.status_dir = status_dir
+        self.legacy_file = legacy_file
+        self.generation = 0
+        self._lock = threading.Lock()
+        self._entries = {}  # path -> (signature, data, numbers)
+        self._jobs = {}
+        self._numbers = {}
+        self._legacy = None  # (signature, data, numbers) for LEGACY_STATUS_FILE
+        self._last_scan = None
+        self._dirty = False  # inotify reported changes not yet folded into _jobs
+        self._inotify_fd = open_inotify(status_dir) if use_inotify else None
+
+    @property
+    def mode(self):
+        return "inotify" if self._inotify_fd is not None else "stat"
+
+    def jobs(self):
+        """Return the current {job_name: data} map (do not mutate it)."""
+        with self._lock:
+            if self._needs_scan():
+                self._scan()
+            return self._jobs
+
+    def job(self, name):
+        """Return one job's data (or parse-error dict), or None if unknown.
+
+        Inotify mode with no pending events costs one non-blocking read; in
+        stat mode, or after a change, only <name>.json is stat'ed/re-parsed.
+        """
+        if not JOB_NAME_RE.match(name):
+            return None
+        if name == "_legacy":
+            # Transitional: only while no per-job file exists (as in /health)
+            return self.legacy() if not self.jobs() else None
+        with self._lock:
+            if self._last_scan is None:
+                self._scan()
+                return self._jobs.get(name)
+            if self._inotify_fd is not None and not self._needs_scan():
+                return self._jobs.get(name)
+            return self._revalidate(os.path.join(self.status_dir, name + ".json"))
+
+    def numbers(self, name):
+        """Return the load-time numeric fields for a job (see job_numbers)."""
+        with self._lock:
+            if name == "_legacy" and self._legacy is not None:
+                return self._legacy[2]
+            return self._numbers.get(name, {})
+
+    def legacy(self):
+        """Return parsed LEGACY_STATUS_FILE data, or None if it is absent."""
+        with self._lock:
+            try:
+                sig = _signature(os.stat(self.legacy_file))
+            except OSError:
+                if self._legacy is not None:
+                    self.generation += 1
+                self._legacy = None
+                return None
+            if self._legacy is None or self._legacy[0] != sig or "_parse_error" in self._legacy[1]:
+                try:
+                    with open(self.legacy_file) as f:
+                        data = json.load(f)
+                except Exception as e:
+                    data = {"_parse_error": f"could not parse legacy status.json: {e}"}
+                if self._legacy is None or self._legacy[1] != data:
+                    self.generation += 1
+                self._legacy = (sig, data, job_numbers(data))
+            return self._legacy[1]
+
+    def version(self):
+        """generation after the revalidation /health does (jobs(), and
+        legacy() while there are none). Equal versions mean equal job data."""
+        if not self.jobs():
+            self.legacy()
+        return self.generation
+
+    def _needs_scan(self):
+        if self._inotify_fd is None or self._last_scan is None or self._dirty:
+            return True
+        if time.monotonic() - self._last_scan >= REVALIDATE_SECONDS:
+            return True
+        # Drain pending events; any event at all means "rescan". We don't
+        # decode them — the stat pass works out what actually changed.
+        while True:
+            try:
+                if not os.read(self._inotify_fd, 65536):
+                    break
+                self._dirty = True
+            except BlockingIOError:
+                break
+            except OSError:
+                # Watch is gone (directory removed?) — degrade to stat mode.
+                os.close(self._inotify_fd)
+                self._inotify_fd = None
+                return True
+        return self._dirty
+
+    def _revalidate(self, path):
+        """Bring one path's entry up to date; return its data or None."""
+        try:
+            sig = _signature(os.stat(path))
+        except OSError:
+            sig = None
+        cached = self._entries.get(path)
+        if sig is None:
+            if cached is not None:
+                del self._entries[path]
+                self._dirty = True  # _jobs still lists it until the next scan
+            return None
+        if cached is not None and cached[0] == sig and "_parse_error" not in cached[1]:
+            return cached[1]
+        data = _parse(path)
+        self._entries[path] = (sig, data, job_numbers(data))
+        if cached is None or cached[1] != data:
+            self._dirty = True
+        return data
+
+    def _scan(self):
+        self._last_scan = time.monotonic()
+        # _revalidate() may have refreshed entries without rebuilding _jobs
+        stale, self._dirty = self._dirty, False
+        seen = {}
+        try:
+            with os.scandir(self.status_dir) as it:
+                for entry in it:
+                    if entry.name.endswith(".json"):
+                        try:
+                            seen[entry.path] = _signature(entry.stat())
+                        except OSError:
+                            pass  # deleted between readdir and stat
+        except OSError:
+            pass  # no status dir yet — same as "no job has run"
+
+        changed = stale or seen.keys() != self._entries.keys()
+        entries = {}
+        for path in sorted(seen):
+            sig = seen[path]
+            cached = self._entries.get(path)
+            if cached is not None and cached[0] == sig and "_parse_error" not in cached[1]:
+                entries[path] = cached
+                continue
+            data = _parse(path)
+            entries[path] = (sig, data, job_numbers(data))
+            if cached is None or cached[1] != data:
+                changed = True
+
+        self._entries = entries
+        if changed:
+            jobs, numbers = {}, {}
+            for path, (_, data, nums) in entries.items():
+                name = os.path.splitext(os.path.basename(path))[0]
+                jobs[name] = data
+                numbers[name] = nums
+            self._jobs, self._numbers = jobs, numbers
+            self.generation += 1
+
+
+def _signature(st):
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def _parse(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except Exception as e:
+        return {"_parse_error": f"could not parse {path}: {e}"}
+
+
+status_cache = StatusCache(STATUS_DIR, LEGACY_STATUS_FILE)
 
 
 def check_job(data):
@@ -61,31 +345,66 @@ def check_job(data):
     return True, detail
 
 
-def load_status_files():
-    """Return {job_name: data_or_error_dict} from per-job status files."""
-    jobs = {}
-    for path in sorted(glob.glob(os.path.join(STATUS_DIR, "*.json"))):
-        name = os.path.splitext(os.path.basename(path))[0]
+def job_numbers(data):
+    """Numeric view of one status file, computed once at load time.
+
+    backup.sh stores restic's human strings ("1.234 GiB", "0:42"); /metrics
+    needs bytes and seconds. Missing/unknown values are simply absent.
+    """
+    if "_parse_error" in data:
+        return {}
+    nums = {}
+    files = data.get("files_processed")
+    if isinstance(files, (int, float)):
+        nums["files_processed"] = files
+    added = parse_size(data.get("data_added"))
+    if added is not None:
+        nums["data_added_bytes"] = added
+    duration = parse_duration(data.get("duration"))
+    if duration is not None:
+        nums["duration_seconds"] = duration
+    last_success = data.get("last_success_time")
+    if last_success:
         try:
-            with open(path) as f:
-                jobs[name] = json.load(f)
-        except Exception as e:
-            jobs[name] = {"_parse_error": f"could not parse {path}: {e}"}
-    return jobs
+            ts = datetime.fromisoformat(last_success).replace(tzinfo=timezone.utc)
+            nums["last_success_timestamp_seconds"] = ts.timestamp()
+        except (TypeError, ValueError):
+            pass
+    return nums
 
 
-def check_health():
-    """Return (http_status_code, response_dict)."""
-    job_data = load_status_files()
+def evaluate_job(data):
+    """check_job() that also maps unreadable status files to unhealthy."""
+    if "_parse_error" in data:
+        return False, {"healthy": False, "reason": data["_parse_error"]}
+    return check_job(data)
+
+
+def load_status_files(cache=None):
+    """Return {job_name: data_or_error_dict} from per-job status files."""
+    return dict((cache or status_cache).jobs())
+
+
+def collect_job_data(cache=None):
+    """Return the {job_name: data} map /health evaluates (incl. _legacy)."""
+    cache = cache or status_cache
+    job_data = load_status_files(cache)
 
     # Transitional fallback for hosts that haven't run a multi-job backup yet
-    if not job_data and os.path.exists(LEGACY_STATUS_FILE):
-        try:
-            with open(LEGACY_STATUS_FILE) as f:
-                job_data["_legacy"] = json.load(f)
-        except Exception as e:
-            job_data["_legacy"] = {"_parse_error": f"could not parse legacy status.json: {e}"}
+    if not job_data:
+        legacy = cache.legacy()
+        if legacy is not None:
+            job_data["_legacy"] = legacy
+    return job_data
+
+
+def check_health(cache=None):
+    """Return (http_status_code, response_dict)."""
+    return evaluate_health(collect_job_data(cache))
 
+
+def evaluate_health(job_data):
+    """check_health() for an already collected {job_name: data} map."""
     if not job_data:
         return 503, {
             "healthy": False,
@@ -96,11 +415,7 @@ def check_health():
     jobs = {}
     all_healthy = True
     for name, data in job_data.items():
-        if "_parse_error" in data:
-            jobs[name] = {"healthy": False, "reason": data["_parse_error"]}
-            all_healthy = False
-            continue
-        healthy, detail = check_job(data)
+        healthy, detail = evaluate_job(data)
         jobs[name] = detail
         all_healthy = all_healthy and healthy
 
@@ -111,19 +426,396 @@ def check_health():
     return (200 if all_healthy else 503), body
 
 
+def health_deadline(job_data, now=None):
+    """Wall-clock time at which evaluate_health(job_data) next changes on
+    its own, with no status file rewritten: the first job whose rounded
+    age_hours ticks over or that crosses its max_age_hours. inf if none.
+    """
+    now = time.time() if now is None else now
+    deadline = math.inf
+    for data in job_data.values():
+        last_success = data.get("last_success_time")
+        if "_parse_error" in data or not last_success:
+            continue
+        try:
+            ts = datetime.fromisoformat(last_success).replace(tzinfo=timezone.utc).timestamp()
+        except (TypeError, ValueError):
+            continue
+        # age_hours is rounded to 0.1h (360s) and so changes at every x.x5h
+        tenths = (now - ts) / 360
+        deadline = min(deadline, ts + (math.floor(tenths - 0.5) + 1.5) * 360)
+        max_age = data.get("max_age_hours", DEFAULT_MAX_AGE_HOURS)
+        if isinstance(max_age, (int, float)):
+            stale_at = ts + max_age * 3600
+            if stale_at >= now:
+                # check_job() goes stale once age > max_age, strictly after stale_at
+                deadline = min(deadline, stale_at + 0.001)
+    return deadline
+
+
+def check_federated(fed, cache=None):
+    """Return (http_status_code, response_dict) merged across fed's peers.
+
+    This host's own jobs are included only if it has any: a dedicated
+    aggregator with no backups of its own must not report itself stale.
+    """
+    results = fed.collect()
+    _, local_body = check_health(cache)
+    local = None
+    if local_body["jobs"]:
+        local = (LOCAL_NAME, local_body)
+    return merge(results, local)
+
+
+def check_one(name, cache=None):
+    """Return (http_status_code, response_dict) for /health/<job>.
+
+    404 for a job with no status file (a typo in a monitor URL should not
+    look like a stale backup). _legacy is served while it backs /health.
+    """
+    data = (cache or status_cache).job(name)
+    if data is None:
+        return 404, {"healthy": False, "reason": f"unknown job: {name}"}
+    healthy, detail = evaluate_job(data)
+    return (200 if healthy else 503), detail
+
+
+def job_history(name, query):
+    """Return (http_status_code, response_dict) for /history/<job>?since=&limit=."""
+    if not JOB_NAME_RE.match(name):
+        return 404, {"reason": f"unknown job: {name}"}
+    params = parse_qs(query)
+    try:
+        since = history.parse_since(params.get("since", [""])[0])
+        limit = int(params.get("limit", ["1000"])[0])
+    except ValueError as e:
+        return 400, {"reason": f"bad query: {e}"}
+    limit = max(0, min(limit, HISTORY_MAX_LIMIT))
+    try:
+        records = history.read_since(history.history_path(HISTORY_DIR, name), since, limit)
+    except FileNotFoundError:
+        return 404, {"reason": f"no history for job: {name}"}
+    except ValueError as e:
+        return 500, {"reason": str(e)}
+    return 200, {"job": name, "since": since, "count": len(records), "records": records}
+
+
+def job_progress(name):
+    """Return (http_status_code, response_dict) for /progress/<job>.
+
+    The file is written by progress.py while a JSON-mode backup runs; it is
+    small and changes every few seconds, so it is read per request.
+    """
+    if not JOB_NAME_RE.match(name):
+        return 404, {"reason": f"unknown job: {name}"}
+    path = os.path.join(PROGRESS_DIR, name + ".json")
+    try:
+        st = os.stat(path)
+        with open(path) as f:
+            body = json.load(f)
+    except FileNotFoundError:
+        return 404, {"reason": f"no progress recorded for job: {name} (JOB_JSON_PROGRESS=1?)"}
+    except (OSError, ValueError) as e:
+        return 500, {"reason": f"could not read {path}: {e}"}
+    body["age_seconds"] = round(time.time() - st.st_mtime, 1)
+    return 200, body
+
+
+def list_jobs(cache=None):
+    """Return the /jobs body: every job the index knows about."""
+    cache = cache or status_cache
+    names = sorted(cache.jobs())
+    if not names and cache.legacy() is not None:
+        names = ["_legacy"]
+    return {"count": len(names), "jobs": names}
+
+
+# (metric name, help, source) — source is a check_job() detail key or a
+# job_numbers() key. Label is backup_job, not job: Prometheus reserves `job`
+# for the scrape target.
+_JOB_METRICS = (
+    ("restic_job_healthy", "1 if the job's last success is within max_age_hours", "healthy"),
+    ("restic_job_age_hours", "Hours since the job's last successful backup", "age_hours"),
+    ("restic_job_max_age_hours", "Staleness threshold for the job, in hours", "max_age_hours"),
+    ("restic_job_last_run_ok", "1 if the job's most recent run succeeded", "last_run_ok"),
+    ("restic_job_last_success_timestamp_seconds", "Unix time of the last successful backup",
+     "last_success_timestamp_seconds"),
+    ("restic_job_files_processed", "Files processed by the last successful backup", "files_processed"),
+    ("restic_job_data_added_bytes", "Bytes added to the repository by the last successful backup",
+     "data_added_bytes"),
+    ("restic_job_duration_seconds", "Duration of the last successful backup", "duration_seconds"),
+)
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render_metrics(cache=None, fed=None):
+    """Return /metrics as Prometheus text exposition, built from check_health().
+
+    With fed (aggregator mode) each peer's reachability and fan-out latency
+    are exported too; they are kept out of /health so its ETag stays stable.
+    """
+    cache = cache or status_cache
+    code, body = check_health(cache)
+    samples = {name: [] for name, _, _ in _JOB_METRICS}
+    for job, detail in body["jobs"].items():
+        values = dict(cache.numbers(job))
+        values["healthy"] = 1 if detail.get("healthy") else 0
+        if "age_hours" in detail:
+            values["age_hours"] = detail["age_hours"]
+        if "_parse_error" not in detail and "status" in detail:
+            values["last_run_ok"] = 1 if detail["status"] == "ok" else 0
+        max_age = detail.get("max_age_hours", DEFAULT_MAX_AGE_HOURS)
+        if isinstance(max_age, (int, float)):
+            values["max_age_hours"] = max_age
+        labels = f'backup_job="{_label(job)}"'
+        for name, _, source in _JOB_METRICS:
+            if source in values:
+                samples[name].append(f"{name}{{{labels}}} {values[source]}")
+
+    lines = [
+        "# HELP restic_healthy 1 if every job is healthy (same as /health returning 200)",
+        "# TYPE restic_healthy gauge",
+        f"restic_healthy {1 if code == 200 else 0}",
+        "# HELP restic_jobs Number of jobs with a status file",
+        "# TYPE restic_jobs gauge",
+        f"restic_jobs {len(body['jobs'])}",
+    ]
+    for name, help_text, _ in _JOB_METRICS:
+        if samples[name]:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.extend(samples[name])
+    if fed is not None:
+        results = fed.collect()
+        lines += ["# HELP restic_peer_up 1 if the peer's /health answered in the last fan-out",
+                  "# TYPE restic_peer_up gauge"]
+        lines += [f'restic_peer_up{{peer="{_label(peer)}"}} {0 if code is None else 1}'
+                  for peer, (code, _, _) in results.items()]
+        lines += ["# HELP restic_peer_latency_seconds Time the peer took to answer /health in the last fan-out",
+                  "# TYPE restic_peer_latency_seconds gauge"]
+        lines += [f'restic_peer_latency_seconds{{peer="{_label(peer)}"}} {round(latency, 4)}'
+                  for peer, (_, _, latency) in results.items()]
+    return "\n".join(lines) + "\n"
+
+
+class Rendered:
+    """One response serialized to bytes, with its ETag and gzip variant.
+
+    body is a dict (sent as JSON) or a str (sent as Prometheus text).
+    """
+
+    __slots__ = ("code", "body", "content_type", "payload", "etag", "gzipped")
+
+    def __init__(self, code, body):
+        self.code = code
+        self.body = body
+        if isinstance(body, str):
+            self.content_type = "text/plain; version=0.0.4; charset=utf-8"
+            self.payload = body.encode()
+        else:
+            self.content_type = "application/json"
+            self.payload = json.dumps(body, indent=2).encode()
+        self.etag = '"%s"' % hashlib.sha1(self.payload).hexdigest()[:20]
+        self.gzipped = None
+        if GZIP_MIN_BYTES and len(self.payload) >= GZIP_MIN_BYTES:
+            # mtime=0 keeps the compressed bytes (and so the ETag) stable
+            self.gzipped = gzip.compress(self.payload, mtime=0)
+
+
+class RenderCache:
+    """Keeps the last Rendered per key; re-serializes only when the body changes.
+
+    get() compares a freshly built body with the cached one, so json.dumps,
+    hashing and gzip run once per distinct body rather than once per request.
+    current() also skips building the body: while the caller's version
+    stamp is unchanged and its deadline hasn't passed, the cached Rendered
+    is returned as is.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rendered = {}
+        self._stamps = {}  # key -> (stamp, valid_until)
+
+    def current(self, key, stamp, build):
+        """Rendered for key, calling build() -> (code, body, valid_until)
+        only if stamp differs from the last build's or time.time() has
+        reached that build's valid_until."""
+        with self._lock:
+            rendered = self._rendered.get(key)
+            if rendered is not None and self._stamps.get(key, (None, 0))[0] == stamp \
+                    and time.time() < self._stamps[key][1]:
+                return rendered
+        code, body, valid_until = build()
+        rendered = self.get(key, code, body)
+        with self._lock:
+            self._stamps[key] = (stamp, valid_until)
+        return rendered
+
+    def get(self, key, code, body):
+        with self._lock:
+            current = self._rendered.get(key)
+            if current is not None and current.code == code and current.body == body:
+                return current
+        rendered = Rendered(code, body)
+        with self._lock:
+            self._rendered[key] = rendered
+        return rendered
+
+
+render_cache = RenderCache()
+federation = Federation(parse_peers(PEERS)) if PEERS.strip() else None
+if federation and any(peer.name == LOCAL_NAME for peer in federation.peers):
+    raise ValueError(f"STATUS_PEERS: peer name {LOCAL_NAME!r} is also this host's name; "
+                     "rename the peer or set STATUS_LOCAL_NAME")
+watcher = HealthWatcher(collect_job_data, evaluate_job, DEFAULT_MAX_AGE_HOURS)
+
+
+def _valid_until():
+    """How long a /health or /metrics body built now stays correct: until
+    the local health deadline, and in aggregator mode at most one peer
+    cache period (the fan-out is refreshed behind it)."""
+    deadline = health_deadline(collect_job_data())
+    if federation:
+        deadline = min(deadline, time.time() + federation.cache_seconds)
+    return deadline
+
+
+def build_health():
+    """(code, body, valid_until) for /health — see RenderCache.current()."""
+    valid_until = _valid_until()
+    code, body = check_federated(federation) if federation else check_health()
+    return code, body, valid_until
+
+
+def build_metrics():
+    """(200, text, valid_until) for /metrics — see RenderCache.current()."""
+    valid_until = _valid_until()
+    return 200, render_metrics(fed=federation), valid_until
+
+
+def _etag_matches(header, etag):
+    """True if an If-None-Match header value matches etag (weak comparison)."""
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def _accepts_gzip(header):
+    for coding in header.split(","):
+        name, _, params = coding.strip().partition(";")
+        if name.strip().lower() in ("gzip", "*"):
+            q = params.strip().replace(" ", "")
+            return q not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+
 class Handler(BaseHTTPRequestHandler):
+    timeout = REQUEST_TIMEOUT_SECONDS
+    # Headers and body go out in separate writes; with Nagle on, a keep-alive
+    # client's delayed ACK stalls every response by ~40ms (bench/loadtest.py).
+    disable_nagle_algorithm = True
+
     def do_GET(self):
-        if self.path not in ("/", "/health"):
-            self.send_response(404)
-            self.end_headers()
-            return
+        path, _, query = self.path.partition("?")
+        if path in ("/", "/health"):
+            self.send_rendered(render_cache.current("health", status_cache.version(), build_health))
+        elif path.startswith("/health/"):
+            name = path[len("/health/"):]
+            code, body = check_one(name)
+            if code == 404:
+                self.send_rendered(Rendered(code, body))
+            else:
+                self.send_rendered(render_cache.get("health/" + name, code, body))
+        elif path.startswith("/history/"):
+            code, body = job_history(path[len("/history/"):], query)
+            self.send_rendered(Rendered(code, body))
+        elif path.startswith("/progress/"):
+            code, body = job_progress(path[len("/progress/"):])
+            self.send_rendered(Rendered(code, body))
+        elif path == "/watch":
+            self.serve_watch()
+        elif path == "/jobs":
+            self.send_rendered(render_cache.current("jobs", status_cache.version(),
+                                                    lambda: (200, list_jobs(), math.inf)))
+        elif path == "/metrics":
+            # Always 200: the scrape succeeded even if a backup is stale —
+            # restic_healthy / restic_job_healthy carry the verdict.
+            self.send_rendered(render_cache.current("metrics", status_cache.version(), build_metrics))
+        else:
+            self.send_empty(404)
 
-        code, body = check_health()
-        payload = json.dumps(body, indent=2).encode()
+    def serve_watch(self):
+        """Stream health transitions as server-sent events until the client leaves."""
+        if not THREADED:
+            self.send_rendered(Rendered(503, {"reason": "/watch needs the threaded server (STATUS_THREADED=1)"}))
+            return
+        q, (seq, snapshot) = watcher.subscribe()
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.close_connection = True
+            self.wfile.write(b"retry: 5000\n\n" + format_event(snapshot, seq))
+            while True:
+                try:
+                    item = q.get(timeout=KEEPALIVE_SECONDS)
+                except queue.Empty:
+                    # Comment line: keeps proxies (Traefik) from idling us out
+                    self.wfile.write(b": keepalive\n\n")
+                    continue
+                if item is None:
+                    break
+                self.wfile.write(format_event(item[1], item[0]))
+        except OSError:
+            pass  # client went away
+        finally:
+            watcher.unsubscribe(q)
 
+    def send_empty(self, code):
         self.send_response(code)
-        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def send_rendered(self, rendered):
+        """Send a Rendered response, honouring If-None-Match and Accept-Encoding."""
+        payload = rendered.payload
+        etag = rendered.etag
+        encoding = None
+        if rendered.gzipped is not None and _accepts_gzip(self.headers.get("Accept-Encoding", "")):
+            payload = rendered.gzipped
+            etag = etag[:-1] + '-gzip"'
+            encoding = "gzip"
+
+        # Conditional GET only short-circuits a 200: a monitor must always
+        # see the 503 itself, never a 304 standing in for it.
+        if rendered.code == 200 and _etag_matches(self.headers.get("If-None-Match", ""), etag):
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Vary", "Accept-Encoding")
+            self.end_headers()
+            return
+
+        self.send_response(rendered.code)
+        self.send_header("Content-Type", rendered.content_type)
         self.send_header("Content-Length", str(len(payload)))
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Vary", "Accept-Encoding")
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
         self.end_headers()
         self.wfile.write(payload)
 
@@ -132,7 +824,25 @@ class Handler(BaseHTTPRequestHandler):
         pass
 
 
+def make_server(port=PORT, threaded=THREADED):
+    if threaded:
+        # Every response carries Content-Length, so keep-alive is safe — and
+        # with a thread per connection a persistent poller can't block others.
+        Handler.protocol_version = "HTTP/1.1"
+        server = ThreadingHTTPServer(("0.0.0.0", port), Handler)
+        server.daemon_threads = True
+        return server
+    return HTTPServer(("0.0.0.0", port), Handler)
+
+
 if __name__ == "__main__":
-    server = HTTPServer(("0.0.0.0", PORT), Handler)
-    print(f"[status-api] Listening on :{PORT}", flush=True)
+    server = make_server()
+    print(
+        f"[status-api] Listening on :{PORT} "
+        f"({'threaded' if THREADED else 'single-threaded'}, status cache: {status_cache.mode})",
+        flush=True,
+    )
+    if federation:
+        print(f"[status-api] Aggregating {len(federation.peers)} peers: "
+              + ", ".join(p.name for p in federation.peers), flush=True)
     server.serve_forever()
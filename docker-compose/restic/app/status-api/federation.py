@@ -0,0 +1,189 @@
+"""
+Aggregator mode: merge the /health of many restic hosts into one jobs map.
+
+Enabled by STATUS_PEERS — whitespace/newline separated entries, each
+
+    url                 e.g. http://192.168.5.20:8484
+    name|url            e.g. tars|https://restic-tars.home.elikesbikes.com
+    name|url|timeout    per-peer timeout in seconds (default STATUS_PEER_TIMEOUT_SECONDS)
+
+(same `|` layout as NFS_MOUNTS). The url may be the API root or its /health.
+Peer names must be unique; an unnamed peer is named after its host, so two
+peers on one host need explicit names.
+
+Peers are queried concurrently, each over a small pool of keep-alive
+connections and bounded by its own timeout, so a fan-out costs as long as
+the slowest peer allowed to answer — not the sum. Results are cached for
+STATUS_PEER_CACHE_SECONDS and concurrent requests share one in-flight
+fan-out. A peer that can't be reached shows up as an unhealthy
+"<peer>/_peer" job instead of failing the whole response.
+
+Per-peer latency is kept out of the merged body, which would otherwise
+change (and lose its ETag) on every fan-out; app.py exports it on /metrics.
+"""
+
+import http.client
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+DEFAULT_TIMEOUT_SECONDS = float(os.environ.get("STATUS_PEER_TIMEOUT_SECONDS", 5))
+CACHE_SECONDS = float(os.environ.get("STATUS_PEER_CACHE_SECONDS", 10))
+# Idle keep-alive connections kept per peer; more are opened under load.
+POOL_SIZE = int(os.environ.get("STATUS_PEER_POOL_SIZE", 2))
+
+
+class Peer:
+    """One peer status API, with its own pool of keep-alive connections."""
+
+    def __init__(self, name, url, timeout=DEFAULT_TIMEOUT_SECONDS, pool_size=POOL_SIZE):
+        parts = urlsplit(url if "://" in url else f"http://{url}")
+        self.name = name or parts.hostname
+        self.scheme = parts.scheme
+        self.netloc = parts.netloc
+        path = parts.path.rstrip("/")
+        self.path = path if path.endswith("/health") else f"{path}/health"
+        self.timeout = timeout
+        self.connections_opened = 0
+        self._idle = queue.LifoQueue(maxsize=pool_size)
+
+    def _connect(self):
+        cls = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+        self.connections_opened += 1
+        return cls(self.netloc, timeout=self.timeout)
+
+    def fetch(self):
+        """GET the peer's /health; return (status_code, body_dict)."""
+        try:
+            conn, reused = self._idle.get_nowait(), True
+        except queue.Empty:
+            conn, reused = self._connect(), False
+        try:
+            try:
+                conn.request("GET", self.path, headers={"Accept": "application/json"})
+                resp = conn.getresponse()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # The peer closed an idle keep-alive connection — retry once fresh
+                if not reused:
+                    raise
+                conn.close()
+                conn = self._connect()
+                conn.request("GET", self.path, headers={"Accept": "application/json"})
+                resp = conn.getresponse()
+            payload = resp.read()
+        except Exception:
+            conn.close()
+            raise
+
+        if resp.will_close:
+            conn.close()
+        else:
+            try:
+                self._idle.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+        return resp.status, json.loads(payload)
+
+
+def parse_peers(spec, default_timeout=DEFAULT_TIMEOUT_SECONDS):
+    """Parse STATUS_PEERS into a list of Peer."""
+    peers = []
+    for entry in spec.split():
+        fields = entry.split("|")
+        if len(fields) == 1:
+            name, url, timeout = "", fields[0], default_timeout
+        elif len(fields) == 2:
+            name, url, timeout = fields[0], fields[1], default_timeout
+        else:
+            name, url, timeout = fields[0], fields[1], float(fields[2])
+        peer = Peer(name, url, timeout)
+        if any(p.name == peer.name for p in peers):
+            raise ValueError(f"STATUS_PEERS: duplicate peer name {peer.name!r} ({entry}); "
+                             "name peers on the same host explicitly (name|url)")
+        peers.append(peer)
+    return peers
+
+
+class Federation:
+    """Concurrent, cached fan-out of /health across peers."""
+
+    def __init__(self, peers, cache_seconds=CACHE_SECONDS):
+        self.peers = peers
+        self.cache_seconds = cache_seconds
+        self._pool = ThreadPoolExecutor(max_workers=max(1, len(peers)), thread_name_prefix="peer")
+        self._lock = threading.Lock()  # one fan-out at a time; others wait for its result
+        self._cached = None
+        self._cached_at = 0.0
+
+    def collect(self):
+        """Return {peer_name: (status_code | None, body_or_error, latency_seconds)}."""
+        with self._lock:
+            if self._cached is not None and time.monotonic() - self._cached_at < self.cache_seconds:
+                return self._cached
+            results = self._fan_out()
+            self._cached, self._cached_at = results, time.monotonic()
+            return results
+
+    def _fan_out(self):
+        start = time.monotonic()
+        futures = {peer.name: (peer, self._pool.submit(self._timed_fetch, peer)) for peer in self.peers}
+        results = {}
+        for name, (peer, future) in futures.items():
+            # The socket timeout bounds each fetch already; this only guards
+            # against a peer that trickles bytes slower than the timeout.
+            remaining = peer.timeout - (time.monotonic() - start)
+            try:
+                results[name] = future.result(timeout=max(0.0, remaining) + 0.5)
+            except Exception as e:
+                results[name] = (None, f"{type(e).__name__}: {e}", time.monotonic() - start)
+        return results
+
+    @staticmethod
+    def _timed_fetch(peer):
+        start = time.monotonic()
+        try:
+            code, body = peer.fetch()
+            return code, body, time.monotonic() - start
+        except Exception as e:
+            return None, f"{type(e).__name__}: {e}", time.monotonic() - start
+
+
+def merge(results, local=None):
+    """Build the aggregate /health (code, body) from Federation.collect().
+
+    local is an optional (host_name, check_health() body) for this host's
+    own jobs. Jobs are keyed "<host>/<job>".
+    """
+    jobs = {}
+    peers = {}
+    sources = list(results.items())
+    if local is not None:
+        host, body = local
+        sources.append((host, (200 if body.get("healthy") else 503, body, 0.0)))
+
+    for host, (code, body, _) in sources:
+        peers[host] = {}
+        if code is None or not isinstance(body, dict):
+            peers[host].update(healthy=False, reason=f"peer unreachable: {body}")
+            jobs[f"{host}/_peer"] = {"healthy": False, "reason": f"peer unreachable: {body}"}
+            continue
+        peers[host]["healthy"] = bool(body.get("healthy"))
+        peer_jobs = body.get("jobs") or {}
+        if not peer_jobs:
+            reason = body.get("reason") or f"peer returned HTTP {code} with no jobs"
+            peers[host]["reason"] = reason
+            jobs[f"{host}/_peer"] = {"healthy": False, "reason": reason}
+            continue
+        for job, detail in peer_jobs.items():
+            jobs[f"{host}/{job}"] = dict(detail, host=host)
+
+    all_healthy = bool(jobs) and all(j.get("healthy") for j in jobs.values())
+    body = {"healthy": all_healthy, "jobs": jobs, "peers": peers}
+    if not all_healthy:
+        unhealthy = sorted(n for n, j in jobs.items() if not j.get("healthy"))
+        body["reason"] = "unhealthy jobs: " + ", ".join(unhealthy) if unhealthy else "no peers configured"
+    return (200 if all_healthy else 503), body
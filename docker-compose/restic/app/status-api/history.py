@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Append-only per-job backup history (fixed-width binary records).
+
+status/<job>.json only holds the latest run; every run is also appended to
+history/<job>.hist so duration and data-added trends survive. Layout:
+
+  8-byte magic b"RHIST\\x00\\x01\\x00", then 40-byte little-endian records:
+    int64  time            unix seconds (UTC) of the run
+    uint64 files           files processed       (UNKNOWN_U64 if not reported)
+    uint64 bytes_added     bytes added to repo   (UNKNOWN_U64 if not reported)
+    uint32 duration        seconds               (UNKNOWN_U32 if not reported)
+    uint8  ok              1 = success, 0 = failure
+    3 pad bytes
+    8s     snapshot id     short id, NUL-padded
+
+Records are appended in time order, so reads binary-search on the time
+field (O(log n) preads) and then read the matching range in one go. The
+file is bounded: once it grows past HISTORY_MAX_RECORDS (+10% slack, so
+compaction is rare) or holds records older than HISTORY_MAX_AGE_DAYS, it is
+rewritten to the newest records via temp file + rename.
+
+Also a CLI, called by backup.sh after each run:
+
+  history.py append <history_dir> <job> --status ok|fail [--files N]
+             [--added "1.234 GiB"] [--duration 0:42] [--snapshot ID] [--time ISO]
+  history.py show <history_dir> <job> [--since ISO]
+"""
+
+import argparse
+import fcntl
+import json
+import os
+import struct
+import sys
+import time
+from datetime import datetime, timezone
+
+from units import parse_duration, parse_size
+
+MAGIC = b"RHIST\x00\x01\x00"
+RECORD = struct.Struct("<qQQIB3x8s")
+UNKNOWN_U64 = 2 ** 64 - 1
+UNKNOWN_U32 = 2 ** 32 - 1
+
+MAX_RECORDS = int(os.environ.get("HISTORY_MAX_RECORDS", 5000))
+MAX_AGE_DAYS = float(os.environ.get("HISTORY_MAX_AGE_DAYS", 0))  # 0 = no age bound
+
+
+def history_path(history_dir, job):
+    return os.path.join(history_dir, f"{job}.hist")
+
+
+def pack(ts, ok, files=None, bytes_added=None, duration=None, snapshot=""):
+    return RECORD.pack(
+        int(ts),
+        UNKNOWN_U64 if files is None else int(files),
+        UNKNOWN_U64 if bytes_added is None else int(bytes_added),
+        UNKNOWN_U32 if duration is None else int(duration),
+        1 if ok else 0,
+        (snapshot or "").encode("ascii", "replace")[:8],
+    )
+
+
+def unpack(raw):
+    ts, files, added, duration, ok, snapshot = RECORD.unpack(raw)
+    return {
+        "time": datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S"),
+        "timestamp": ts,
+        "status": "ok" if ok else "fail",
+        "files_processed": None if files == UNKNOWN_U64 else files,
+        "data_added_bytes": None if added == UNKNOWN_U64 else added,
+        "duration_seconds": None if duration == UNKNOWN_U32 else duration,
+        "snapshot_id": snapshot.rstrip(b"\x00").decode("ascii", "replace") or None,
+    }
+
+
+def _count(size):
+    return max(0, (size - len(MAGIC)) // RECORD.size)
+
+
+def _ts_at(f, index):
+    return struct.unpack_from("<q", os.pread(f.fileno(), 8, len(MAGIC) + index * RECORD.size))[0]
+
+
+def _lower_bound(f, count, since):
+    """Index of the first record with time >= since."""
+    lo, hi = 0, count
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if _ts_at(f, mid) < since:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+def append(path, record, max_records=MAX_RECORDS, max_age_days=MAX_AGE_DAYS):
+    """Append one packed record, compacting the file if it is over its bounds."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    while True:
+        f = open(path, "a+b")
+        fcntl.flock(f, fcntl.LOCK_EX)
+        # A concurrent compaction may have replaced the file while we waited
+        try:
+            if os.stat(path).st_ino == os.fstat(f.fileno()).st_ino:
+                break
+        except FileNotFoundError:
+            pass
+        f.close()
+
+    with f:
+        size = os.fstat(f.fileno()).st_size
+        if size < len(MAGIC):
+            f.truncate(0)
+            f.write(MAGIC)
+            size = len(MAGIC)
+        elif (size - len(MAGIC)) % RECORD.size:
+            # Torn write from a crash — drop the partial record so appends stay aligned
+            size = len(MAGIC) + _count(size) * RECORD.size
+            f.truncate(size)
+        f.write(record)
+        f.flush()
+
+        count = _count(size) + 1
+        start = 0
+        if max_records and count > max_records + max_records // 10:
+            start = count - max_records
+        if max_age_days:
+            start = max(start, _lower_bound(f, count, time.time() - max_age_days * 86400))
+        if start:
+            _compact(path, f, start, count)
+
+
+def _compact(path, f, start, count):
+    """Rewrite path keeping records [start, count). Caller holds the flock."""
+    keep = os.pread(f.fileno(), (count - start) * RECORD.size, len(MAGIC) + start * RECORD.size)
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as out:
+        out.write(MAGIC + keep)
+        out.flush()
+        os.fsync(out.fileno())
+    os.replace(tmp, path)
+
+
+def read_since(path, since=0, limit=1000):
+    """Return up to limit records with time >= since (unix seconds), oldest first.
+
+    Raises FileNotFoundError if the job has no history.
+    """
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path}: not a history file")
+        count = _count(os.fstat(f.fileno()).st_size)
+        first = _lower_bound(f, count, since)
+        n = min(limit, count - first)
+        raw = os.pread(f.fileno(), n * RECORD.size, len(MAGIC) + first * RECORD.size)
+    return [unpack(raw[i:i + RECORD.size]) for i in range(0, len(raw) - RECORD.size + 1, RECORD.size)]
+
+
+def parse_since(value):
+    """?since= accepts unix seconds or an ISO-8601 time (UTC if naive)."""
+    if not value:
+        return 0
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    ts = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.timestamp()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Per-job restic backup history")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p_append = sub.add_parser("append", help="record one run")
+    p_append.add_argument("history_dir")
+    p_append.add_argument("job")
+    p_append.add_argument("--status", choices=("ok", "fail"), required=True)
+    p_append.add_argument("--files")
+    p_append.add_argument("--added")
+    p_append.add_argument("--duration")
+    p_append.add_argument("--snapshot", default="")
+    p_append.add_argument("--time", help="ISO time of the run, UTC (default: now)")
+
+    p_show = sub.add_parser("show", help="print records as JSON lines")
+    p_show.add_argument("history_dir")
+    p_show.add_argument("job")
+    p_show.add_argument("--since", default="")
+    p_show.add_argument("--limit", type=int, default=1000)
+
+    args = parser.parse_args(argv)
+    path = history_path(args.history_dir, args.job)
+
+    if args.cmd == "append":
+        ts = parse_since(args.time) if args.time else time.time()
+        files = int(args.files) if args.files and args.files.isdigit() else None
+        snapshot = "" if args.snapshot == "unknown" else args.snapshot
+        append(path, pack(ts, args.status == "ok", files, parse_size(args.added),
+                          parse_duration(args.duration), snapshot))
+        return 0
+
+    try:
+        records = read_since(path, parse_since(args.since), args.limit)
+    except FileNotFoundError:
+        print(f"no history for job {args.job!r} in {args.history_dir}", file=sys.stderr)
+        return 1
+    for rec in records:
+        print(json.dumps(rec))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
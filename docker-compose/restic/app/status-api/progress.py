@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Streaming parser for `restic backup --json` — live progress for /progress/<job>.
+
+backup.sh (with JOB_JSON_PROGRESS=1) pipes restic's JSON event stream
+through `progress.py follow`, which:
+
+  - keeps only the latest "status" event, so memory stays constant however
+    many files the backup walks
+  - rewrites progress/<job>.json (temp file + rename) at most every
+    PROGRESS_WRITE_SECONDS with bytes/files done, throughput and ETA
+  - echoes a readable line to stdout for the job log: periodic progress,
+    errors, and on completion the same summary lines restic prints in text
+    mode ("processed N files, X in M:SS", "Added to the repository: …",
+    "snapshot … saved")
+  - records the summary in the progress file, so `progress.py result`
+    can hand backup.sh its snapshot/files/added/duration without re-reading
+    the log
+
+Lines that aren't JSON (plain restic warnings on stderr) pass through as is.
+
+Usage:
+  restic --json backup ... 2>&1 | progress.py follow <progress_dir> <job>
+  progress.py result <progress_dir> <job>     # shell assignments for eval
+"""
+
+import json
+import os
+import shlex
+import sys
+import time
+from datetime import datetime, timezone
+
+from units import format_duration, format_size
+
+WRITE_SECONDS = float(os.environ.get("PROGRESS_WRITE_SECONDS", 2))
+ECHO_SECONDS = float(os.environ.get("PROGRESS_ECHO_SECONDS", 30))
+# Weight of the newest sample in the throughput moving average.
+RATE_SMOOTHING = 0.3
+
+
+def progress_path(progress_dir, job):
+    return os.path.join(progress_dir, f"{job}.json")
+
+
+def _now_iso():
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
+
+
+def write_atomic(path, data):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+
+
+class ProgressTracker:
+    """Folds restic JSON events into one small, constantly-updated state dict."""
+
+    def __init__(self, job, path, clock=time.monotonic):
+        self.path = path
+        self.clock = clock
+        self.state = {
+            "job": job,
+            "state": "running",
+            "started_at": _now_iso(),
+            "updated_at": _now_iso(),
+            "percent_done": 0.0,
+            "files_done": 0,
+            "total_files": None,
+            "bytes_done": 0,
+            "total_bytes": None,
+            "errors": 0,
+            "throughput_bytes_per_second": None,
+            "eta_seconds": None,
+        }
+        self._last_write = None
+        self._last_echo = clock()
+        self._last_sample = None  # (seconds_elapsed, bytes_done)
+        self._rate = None
+
+    def handle(self, line):
+        """Process one line of restic output; return text to echo, or None."""
+        try:
+            event = json.loads(line)
+        except ValueError:
+            return line.rstrip("\n") or None
+        if not isinstance(event, dict):
+            return None
+        kind = event.get("message_type")
+        if kind == "status":
+            return self._on_status(event)
+        if kind == "summary":
+            return self._on_summary(event)
+        if kind == "error":
+            self.state["errors"] += 1
+            err = event.get("error") or {}
+            msg = err.get("message", err) if isinstance(err, dict) else err
+            return f"error: {event.get('item', '')}: {msg}"
+        if kind == "verbose_status":
+            return f"{event.get('action', '')} {event.get('item', '')}".strip()
+        return None
+
+    def _on_status(self, ev):
+        s = self.state
+        elapsed = ev.get("seconds_elapsed") or 0
+        bytes_done = ev.get("bytes_done") or 0
+        s.update(
+            percent_done=round(100.0 * (ev.get("percent_done") or 0), 2),
+            files_done=ev.get("files_done") or 0,
+            total_files=ev.get("total_files"),
+            bytes_done=bytes_done,
+            total_bytes=ev.get("total_bytes"),
+            seconds_elapsed=elapsed,
+            updated_at=_now_iso(),
+        )
+
+        # Smoothed recent rate, not a lifetime average: restic often crawls
+        # unchanged files fast and then slows on new data (or vice versa).
+        if self._last_sample is not None and elapsed > self._last_sample[0]:
+            sample = (bytes_done - self._last_sample[1]) / (elapsed - self._last_sample[0])
+            self._rate = sample if self._rate is None else (
+                RATE_SMOOTHING * sample + (1 - RATE_SMOOTHING) * self._rate)
+        elif self._rate is None and elapsed:
+            self._rate = bytes_done / elapsed
+        self._last_sample = (elapsed, bytes_done)
+        if self._rate is not None:
+            s["throughput_bytes_per_second"] = round(self._rate)
+
+        remaining = ev.get("seconds_remaining")
+        if remaining is None and self._rate and s["total_bytes"]:
+            remaining = max(0, s["total_bytes"] - bytes_done) / self._rate
+        s["eta_seconds"] = None if remaining is None else round(remaining)
+
+        self._maybe_write()
+        if self.clock() - self._last_echo >= ECHO_SECONDS:
+            self._last_echo = self.clock()
+            total = format_size(s["total_bytes"]) if s["total_bytes"] else "?"
+            eta = format_duration(s["eta_seconds"]) if s["eta_seconds"] is not None else "?"
+            return (f"[{format_duration(elapsed)}] {s['percent_done']:.2f}%  "
+                    f"{s['files_done']} files {format_size(bytes_done)} / {total}, ETA {eta}")
+        return None
+
+    def _on_summary(self, ev):
+        files = ev.get("total_files_processed", 0)
+        processed = ev.get("total_bytes_processed", 0)
+        added = ev.get("data_added", 0)
+        duration = ev.get("total_duration", 0)
+        snapshot = (ev.get("snapshot_id") or "")[:8]
+        self.state.update(
+            state="done",
+            updated_at=_now_iso(),
+            percent_done=100.0,
+            files_done=files,
+            bytes_done=processed,
+            eta_seconds=0,
+            summary={
+                "snapshot_id": snapshot or "unknown",
+                "files_processed": files,
+                "data_added": format_size(added),
+                "duration": format_duration(duration),
+                "files_new": ev.get("files_new"),
+                "files_changed": ev.get("files_changed"),
+                "files_unmodified": ev.get("files_unmodified"),
+            },
+        )
+        self.flush()
+        lines = [
+            f"Files: {ev.get('files_new', 0)} new, {ev.get('files_changed', 0)} changed, "
+            f"{ev.get('files_unmodified', 0)} unmodified",
+            f"Added to the repository: {format_size(added)}",
+            f"processed {files} files, {format_size(processed)} in {format_duration(duration)}",
+        ]
+        if snapshot:
+            lines.append(f"snapshot {snapshot} saved")
+        return "\n".join(lines)
+
+    def finish(self):
+        """Called at end of stream: anything but a summary means restic failed."""
+        if self.state["state"] == "running":
+            self.state.update(state="failed", updated_at=_now_iso())
+        self.flush()
+
+    def _maybe_write(self):
+        if self._last_write is None or self.clock() - self._last_write >= WRITE_SECONDS:
+            self.flush()
+
+    def flush(self):
+        self._last_write = self.clock()
+        try:
+            write_atomic(self.path, self.state)
+        except OSError as e:
+            print(f"WARNING: could not write {self.path}: {e}", file=sys.stderr)
+
+
+def follow(progress_dir, job, stream=sys.stdin, out=sys.stdout):
+    os.makedirs(progress_dir, exist_ok=True)
+    tracker = ProgressTracker(job, progress_path(progress_dir, job))
+    tracker.flush()
+    for line in stream:
+        text = tracker.handle(line)
+        if text:
+            print(text, file=out, flush=True)
+    tracker.finish()
+
+
+def result(progress_dir, job):
+    """Print snapshot=/files=/added=/duration= for backup.sh to eval."""
+    summary = {}
+    try:
+        with open(progress_path(progress_dir, job)) as f:
+            summary = json.load(f).get("summary") or {}
+    except (OSError, ValueError):
+        pass
+    print("snapshot=" + shlex.quote(str(summary.get("snapshot_id", "unknown"))))
+    print("files=" + shlex.quote(str(summary.get("files_processed", 0))))
+    print("added=" + shlex.quote(str(summary.get("data_added", "unknown"))))
+    print("duration=" + shlex.quote(str(summary.get("duration", "unknown"))))
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 3 or argv[0] not in ("follow", "result"):
+        print(__doc__.strip().split("Usage:")[1], file=sys.stderr)
+        return 2
+    cmd, progress_dir, job = argv
+    if cmd == "follow":
+        follow(progress_dir, job)
+    else:
+        result(progress_dir, job)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+"""
+Conversions between restic's human-readable output and plain numbers.
+
+backup.sh records what restic printed ("1.234 GiB", "0:42"); anything that
+graphs or compares those values needs bytes and seconds. Parsers return None
+for values restic didn't report ("unknown") rather than guessing 0.
+"""
+
+import re
+
+# restic prints binary units (formatBytes); decimal ones are accepted too in
+# case a status file was written by hand or by another tool.
+_SIZE_UNITS = {
+    "B": 1,
+    "KIB": 1024, "MIB": 1024 ** 2, "GIB": 1024 ** 3, "TIB": 1024 ** 4, "PIB": 1024 ** 5,
+    "KB": 1000, "MB": 1000 ** 2, "GB": 1000 ** 3, "TB": 1000 ** 4, "PB": 1000 ** 5,
+}
+_SIZE_RE = re.compile(r"^\s*([0-9]+(?:\.[0-9]+)?)\s*([A-Za-z]+)?\s*$")
+
+
+def parse_size(text):
+    """'1.234 GiB' -> 1325038453 (bytes), or None if unparseable."""
+    if isinstance(text, (int, float)):
+        return int(text)
+    if not isinstance(text, str):
+        return None
+    m = _SIZE_RE.match(text)
+    if not m:
+        return None
+    factor = _SIZE_UNITS.get((m.group(2) or "B").upper())
+    if factor is None:
+        return None
+    return int(float(m.group(1)) * factor)
+
+
+def parse_duration(text):
+    """restic's '0:42' (m:ss) or '1:02:03' (h:mm:ss) -> seconds, or None."""
+    if isinstance(text, (int, float)):
+        return int(text)
+    if not isinstance(text, str):
+        return None
+    parts = text.strip().split(":")
+    if not 2 <= len(parts) <= 3 or not all(p.isdigit() for p in parts):
+        return None
+    seconds = 0
+    for p in parts:
+        seconds = seconds * 60 + int(p)
+    return seconds
+
+
+def format_size(num_bytes):
+    """Bytes -> restic-style '1.234 GiB' (inverse of parse_size)."""
+    value = float(num_bytes)
+    for name in ("B", "KiB", "MiB", "GiB", "TiB"):
+        if value < 1024:
+            return f"{int(value)} B" if name == "B" else f"{value:.3f} {name}"
+        value /= 1024
+    return f"{value:.3f} PiB"
+
+
+def format_duration(seconds):
+    """Seconds -> restic-style '0:42' / '1:02:03' (inverse of parse_duration)."""
+    hours, rest = divmod(int(seconds), 3600)
+    minutes, secs = divmod(rest, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{secs:02d}"
+    return f"{minutes}:{secs:02d}"
@@ -0,0 +1,170 @@
+"""
+Health transition feed behind /watch (server-sent events).
+
+One background thread owns all the work, however many clients subscribe:
+
+  - every STATUS_WATCH_POLL_SECONDS it asks the StatusCache for the job map
+    (one inotify read in the common case — the cache decides whether the
+    directory needs a rescan) and re-evaluates only jobs whose parsed data
+    object changed, i.e. a new status file
+  - jobs that are healthy now will go stale at a known instant
+    (last_success_time + max_age_hours); those instants sit in a min-heap,
+    and the thread wakes exactly when the earliest one passes
+
+An event is pushed to subscribers only when a job's healthy flag flips, or
+a job appears or disappears — not on every age tick.
+"""
+
+import heapq
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+
+POLL_SECONDS = float(os.environ.get("STATUS_WATCH_POLL_SECONDS", 2))
+KEEPALIVE_SECONDS = float(os.environ.get("STATUS_WATCH_KEEPALIVE_SECONDS", 15))
+# A client that falls this many events behind is dropped rather than
+# letting its queue grow without bound.
+QUEUE_SIZE = 1000
+
+
+def _stale_at(data, default_max_age):
+    """Unix time at which a currently-healthy job turns stale, or None."""
+    try:
+        ts = datetime.fromisoformat(data["last_success_time"]).replace(tzinfo=timezone.utc)
+        max_age = float(data.get("max_age_hours", default_max_age))
+    except (KeyError, TypeError, ValueError):
+        return None
+    return ts.timestamp() + max_age * 3600
+
+
+def format_event(event, seq):
+    return f"id: {seq}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n".encode()
+
+
+class HealthWatcher:
+    """Tracks per-job health and fans transitions out to SSE subscribers.
+
+    load() returns {job: data} (the same map check_health() evaluates) and
+    evaluate(data) returns (healthy, detail).
+    """
+
+    def __init__(self, load, evaluate, default_max_age, poll_seconds=POLL_SECONDS):
+        self._load = load
+        self._evaluate = evaluate
+        self._default_max_age = default_max_age
+        self._poll_seconds = poll_seconds
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._data = {}      # job -> data object last evaluated
+        self._health = {}    # job -> (healthy, reason)
+        self._deadlines = {}  # job -> stale_at currently scheduled
+        self._heap = []      # (stale_at, job); entries not in _deadlines are dead
+        self._seq = 0
+        self._thread = None
+
+    def subscribe(self):
+        """Return (queue, snapshot_event). Starts the watcher on first use."""
+        q = queue.Queue(maxsize=QUEUE_SIZE)
+        with self._lock:
+            if self._thread is None:
+                self._refresh(emit=False)
+                self._thread = threading.Thread(target=self._run, name="health-watch", daemon=True)
+                self._thread.start()
+            self._subscribers.add(q)
+            snapshot = {
+                "type": "snapshot",
+                "time": _now_iso(),
+                "jobs": {job: {"healthy": h, "reason": r} for job, (h, r) in self._health.items()},
+            }
+            return q, (self._seq, snapshot)
+
+    def unsubscribe(self, q):
+        with self._lock:
+            self._subscribers.discard(q)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                delay = self._poll_seconds
+                if self._heap:
+                    delay = min(delay, max(0.0, self._heap[0][0] - time.time()))
+            time.sleep(delay)
+            with self._lock:
+                self._refresh(emit=True)
+
+    def _refresh(self, emit):
+        """Re-evaluate changed and newly-expired jobs. Caller holds _lock."""
+        job_data = self._load()
+        dirty = set()
+        for job, data in job_data.items():
+            if self._data.get(job) is not data:
+                dirty.add(job)
+        removed = set(self._data) - set(job_data)
+
+        now = time.time()
+        while self._heap and self._heap[0][0] <= now:
+            stale_at, job = heapq.heappop(self._heap)
+            if self._deadlines.get(job) == stale_at:
+                del self._deadlines[job]
+                dirty.add(job)
+
+        for job in removed:
+            del self._data[job]
+            self._deadlines.pop(job, None)
+            previous = self._health.pop(job)
+            if emit:
+                self._publish({"type": "removed", "job": job, "previous": previous[0], "time": _now_iso()})
+
+        for job in dirty & set(job_data):
+            data = job_data[job]
+            self._data[job] = data
+            healthy, detail = self._evaluate(data)
+            reason = detail.get("reason")
+            previous = self._health.get(job)
+            self._health[job] = (healthy, reason)
+
+            self._deadlines.pop(job, None)
+            if healthy:
+                stale_at = _stale_at(data, self._default_max_age)
+                if stale_at is not None:
+                    # +1s so check_job's strict `age > max_age` has flipped by then
+                    stale_at += 1
+                    self._deadlines[job] = stale_at
+                    heapq.heappush(self._heap, (stale_at, job))
+
+            if emit and (previous is None or previous[0] != healthy):
+                self._publish({
+                    "type": "health",
+                    "job": job,
+                    "healthy": healthy,
+                    "previous": None if previous is None else previous[0],
+                    "reason": reason,
+                    "time": _now_iso(),
+                })
+
+        # Dead heap entries pile up as jobs are rewritten; rebuild occasionally
+        if len(self._heap) > 2 * len(self._deadlines) + 64:
+            self._heap = [(t, j) for j, t in self._deadlines.items()]
+            heapq.heapify(self._heap)
+
+    def _publish(self, event):
+        self._seq += 1
+        payload = (self._seq, event)
+        for q in list(self._subscribers):
+            try:
+                q.put_nowait(payload)
+            except queue.Full:
+                # Too slow: drop it, and make room for the hang-up sentinel
+                self._subscribers.discard(q)
+                try:
+                    q.get_nowait()
+                    q.put_nowait(None)
+                except (queue.Empty, queue.Full):
+                    pass
+
+
+def _now_iso():
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Stand-in check: aggregator fan-out is concurrent, bounded and keep-alive.
+
+Starts N local stand-in status APIs (default 30) that answer /health after
+a random delay, plus one that hangs past its timeout, then drives
+federation.Federation against them and checks that:
+
+  1. total latency tracks the slowest answering peer, not the sum of delays
+  2. the hung peer costs its own timeout and is reported as "<peer>/_peer"
+  3. a second fan-out reuses the pooled connections (no new connects)
+
+Exits non-zero if any check fails.
+
+Usage:
+  python3 bench/federation.py
+  python3 bench/federation.py -p 50 --max-delay 0.8
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app", "status-api"))
+from federation import Federation, Peer, merge  # noqa: E402
+
+
+def start_standin(name, delay):
+    """A fake peer status API; returns (server, connection_counter)."""
+    accepted = [0]
+
+    class StandIn(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def setup(self):
+            accepted[0] += 1
+            super().setup()
+
+        def do_GET(self):
+            time.sleep(delay)
+            payload = json.dumps({
+                "healthy": True,
+                "jobs": {"docker-volumes": {"status": "ok", "healthy": True, "hostname": name}},
+            }).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, fmt, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, accepted
+
+
+def check(label, ok, detail):
+    print(f"  [{'PASS' if ok else 'FAIL'}] {label}: {detail}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-p", "--peers", type=int, default=30, help="stand-in peers (default 30)")
+    parser.add_argument("--max-delay", type=float, default=0.5, help="max per-peer delay, seconds")
+    parser.add_argument("--timeout", type=float, default=1.0, help="per-peer timeout, seconds")
+    args = parser.parse_args()
+
+    random.seed(1)
+    delays = [random.uniform(0.05, args.max_delay) for _ in range(args.peers)]
+    peers, counters = [], []
+    for i, delay in enumerate(delays):
+        server, accepted = start_standin(f"host{i}", delay)
+        peers.append(Peer(f"host{i}", f"http://127.0.0.1:{server.server_port}", timeout=args.timeout + args.max_delay))
+        counters.append(accepted)
+    hung, _ = start_standin("hung", args.timeout * 5)
+    peers.append(Peer("hung", f"http://127.0.0.1:{hung.server_port}", timeout=args.timeout))
+
+    fed = Federation(peers, cache_seconds=0)
+    print(f"Fan-out across {args.peers} stand-in peers (+1 hung), delays up to {args.max_delay}s")
+
+    start = time.monotonic()
+    code, body = merge(fed.collect())
+    elapsed = time.monotonic() - start
+    slowest, total = max(delays), sum(delays)
+    bound = max(slowest, args.timeout) + 0.5
+
+    ok = True
+    ok &= check("bounded by slowest peer", elapsed <= bound,
+                f"{elapsed:.2f}s (slowest {slowest:.2f}s, timeout {args.timeout}s, serial sum {total:.2f}s)")
+    ok &= check("hung peer isolated", "hung/_peer" in body["jobs"] and code == 503,
+                body["jobs"].get("hung/_peer", {}).get("reason", "not reported"))
+    answered = sum(1 for j in body["jobs"] if j.endswith("/docker-volumes"))
+    ok &= check("all live peers merged", answered == args.peers, f"{answered}/{args.peers} host/job entries")
+
+    opened = sum(p.connections_opened for p in peers[:-1])
+    accepted = sum(c[0] for c in counters)
+    start = time.monotonic()
+    fed.collect()
+    elapsed2 = time.monotonic() - start
+    reopened = sum(p.connections_opened for p in peers[:-1]) - opened
+    ok &= check("keep-alive reuse", reopened == 0 and sum(c[0] for c in counters) == accepted,
+                f"second fan-out opened {reopened} new connections ({elapsed2:.2f}s)")
+
+    print("OK" if ok else "FAILED")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Generate a synthetic status directory for benchmarking the status API.
+
+Writes <out>/status/<job>.json for N jobs in the shape backup.sh produces,
+mixed with the cases the API has to cope with:
+
+  healthy     fresh "ok" run                              (the rest)
+  stale       last success older than max_age_hours       (--stale)
+  failed      "fail" run that keeps an older last success  (--failed)
+  never       "fail" run with no success ever recorded     (--never)
+  malformed   truncated / non-JSON file                    (--malformed)
+
+plus an optional legacy <out>/status.json (--legacy), which /health only
+reads while no per-job file exists (use -j 0 --legacy for that case).
+
+Usage:
+  python3 bench/gen_status.py /tmp/restic-bench -j 1000
+  python3 bench/gen_status.py /tmp/legacy-only -j 0 --legacy
+"""
+
+import argparse
+import json
+import os
+import random
+from datetime import datetime, timedelta, timezone
+
+
+def _ts(dt):
+    return dt.strftime("%Y-%m-%dT%H:%M:%S")
+
+
+def status_doc(job, kind, now, rng):
+    """Return the status dict (or a raw string for malformed) for one job."""
+    if kind == "malformed":
+        return '{"status": "ok", "job": "' + job + '", "last_succ'
+    recent = now - timedelta(minutes=rng.randint(1, 600))
+    old = now - timedelta(hours=rng.randint(30, 400))
+    if kind in ("failed", "never"):
+        return {
+            "status": "fail",
+            "job": job,
+            "last_success_time": _ts(recent) if kind == "failed" else None,
+            "error": "Restic backup command failed (exit 1)",
+            "hostname": "bench",
+            "max_age_hours": 25,
+            "updated_at": _ts(now),
+        }
+    return {
+        "status": "ok",
+        "job": job,
+        "last_success_time": _ts(old if kind == "stale" else recent),
+        "snapshot_id": f"{rng.getrandbits(32):08x}",
+        "files_processed": rng.randint(10, 500000),
+        "data_added": f"{rng.uniform(0, 900):.3f} {rng.choice(['KiB', 'MiB', 'GiB'])}",
+        "duration": f"{rng.randint(0, 59)}:{rng.randint(0, 59):02d}",
+        "hostname": "bench",
+        "max_age_hours": rng.choice([25, 25, 25, 170]),
+        "updated_at": _ts(now),
+    }
+
+
+def generate(out_dir, jobs, stale=0.05, failed=0.02, never=0.01, malformed=0.01, legacy=False, seed=1):
+    """Populate out_dir; return (status_dir, legacy_file, {kind: count})."""
+    rng = random.Random(seed)
+    status_dir = os.path.join(out_dir, "status")
+    legacy_file = os.path.join(out_dir, "status.json")
+    os.makedirs(status_dir, exist_ok=True)
+    now = datetime.now(timezone.utc)
+    counts = {}
+    for i in range(jobs):
+        roll = rng.random()
+        kind = "healthy"
+        for name, share in (("malformed", malformed), ("never", never), ("failed", failed), ("stale", stale)):
+            if roll < share:
+                kind = name
+                break
+            roll -= share
+        counts[kind] = counts.get(kind, 0) + 1
+        job = f"job-{i:05d}"
+        doc = status_doc(job, kind, now, rng)
+        with open(os.path.join(status_dir, f"{job}.json"), "w") as f:
+            f.write(doc if isinstance(doc, str) else json.dumps(doc, indent=2))
+    if legacy:
+        with open(legacy_file, "w") as f:
+            json.dump(status_doc("docker-volumes", "healthy", now, rng), f, indent=2)
+        counts["legacy"] = 1
+    return status_dir, legacy_file, counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("out_dir")
+    parser.add_argument("-j", "--jobs", type=int, default=100)
+    parser.add_argument("--stale", type=float, default=0.05)
+    parser.add_argument("--failed", type=float, default=0.02)
+    parser.add_argument("--never", type=float, default=0.01)
+    parser.add_argument("--malformed", type=float, default=0.01)
+    parser.add_argument("--legacy", action="store_true")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    status_dir, _, counts = generate(args.out_dir, args.jobs, args.stale, args.failed,
+                                     args.never, args.malformed, args.legacy, args.seed)
+    print(f"{status_dir}: " + ", ".join(f"{k}={v}" for k, v in sorted(counts.items())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Load test for the restic status API across job counts and endpoints.
+
+For each job count it generates a synthetic status directory (see
+gen_status.py — includes stale, failed, malformed and legacy cases), starts
+app/status-api/app.py against it as a subprocess, and drives it with
+concurrent keep-alive clients. Reported per endpoint:
+
+  p50 / p99    request latency as seen by the client, ms
+  req/s        completed requests per second
+  rw/req       read/write calls per request in the server process
+               (syscr + syscw from /proc/<pid>/io — Linux only). Only
+               read- and write-family calls are counted; stat, openat,
+               getdents and the like are not.
+  sys/req      with --strace: every syscall per request in the server
+               process, from strace -f -c -p <pid> attached for the run.
+               Catches regressions in the stat/open/readdir-heavy status
+               path that rw/req can't see. Needs strace and permission to
+               ptrace the server (root, or kernel.yama.ptrace_scope=0);
+               ptrace slows every syscall, so latency and req/s from a
+               --strace run aren't comparable with a normal one.
+  cpu/req      server CPU time per request, µs (/proc/<pid>/stat)
+
+Usage:
+  python3 bench/loadtest.py                                  # 10 100 1000 10000 jobs
+  python3 bench/loadtest.py -j 500 -c 16 -d 10 -e /health -e /metrics
+  python3 bench/loadtest.py --json > before.json             # for regression diffs
+  STATUS_INOTIFY=0 python3 bench/loadtest.py -j 1000         # stat-only mode
+  python3 bench/loadtest.py -j 1000 --strace                 # full syscalls per request
+"""
+
+import argparse
+import http.client
+import json
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from gen_status import generate
+
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app", "status-api", "app.py")
+DEFAULT_ENDPOINTS = ("/health", "/health/job-00001", "/metrics", "/jobs")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def proc_counters(pid):
+    """(read/write calls, cpu_seconds) for pid, or (None, None) off Linux."""
+    try:
+        with open(f"/proc/{pid}/io") as f:
+            io = dict(line.split(":") for line in f.read().splitlines())
+        rw_calls = int(io["syscr"]) + int(io["syscw"])
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        cpu = (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+        return rw_calls, cpu
+    except (OSError, KeyError, ValueError):
+        return None, None
+
+
+def strace_attach(pid, out_path):
+    """Start strace -f -c on pid, writing its summary to out_path; return
+    the strace process once it has attached."""
+    tracer = subprocess.Popen(["strace", "-f", "-c", "-o", out_path, "-p", str(pid)],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    first = tracer.stderr.readline()
+    if "attached" not in first:
+        tracer.kill()
+        tracer.wait()
+        raise RuntimeError(f"strace could not attach to {pid}: {first.strip() or 'no output'}")
+    # One "attached" line per thread; keep draining so strace never blocks on stderr
+    threading.Thread(target=tracer.stderr.read, daemon=True).start()
+    return tracer
+
+
+def strace_total(tracer, out_path):
+    """Detach tracer and return the total syscall count from its summary."""
+    tracer.send_signal(signal.SIGINT)
+    tracer.wait(timeout=30)
+    with open(out_path) as f:
+        lines = f.read().splitlines()
+    # Columns are right-aligned under the header, and the total line's
+    # usecs/call field is blank on older strace: cut at the "calls" column
+    header = next(line for line in lines if line.lstrip().startswith("% time"))
+    end = header.index("calls") + len("calls")
+    total = next(line for line in lines if line.split()[-1:] == ["total"])
+    return int(total[:end].split()[-1])
+
+
+def start_server(status_dir, legacy_file, port):
+    env = dict(os.environ, STATUS_DIR=status_dir, LEGACY_STATUS_FILE=legacy_file,
+               STATUS_PORT=str(port), HISTORY_DIR=os.path.join(status_dir, "..", "history"))
+    proc = subprocess.Popen([sys.executable, APP], env=env, stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return proc
+        except OSError:
+            time.sleep(0.05)
+    proc.kill()
+    raise RuntimeError("status API did not start")
+
+
+def client(port, path, stop_at, latencies, errors):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    while time.monotonic() < stop_at:
+        start = time.perf_counter()
+        try:
+            conn.request("GET", path)
+            resp = conn.getresponse()
+            resp.read()
+            if resp.will_close:
+                conn.close()
+        except (OSError, http.client.HTTPException):
+            errors.append(1)
+            conn.close()
+            continue
+        latencies.append(time.perf_counter() - start)
+    conn.close()
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return float("nan")
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))]
+
+
+def run_endpoint(proc, port, path, clients, duration, strace_out=None):
+    # Warm-up request so the first parse isn't charged to the steady state
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    conn.request("GET", path)
+    conn.getresponse().read()
+    conn.close()
+
+    tracer = strace_attach(proc.pid, strace_out) if strace_out else None
+    rw0, cpu0 = proc_counters(proc.pid)
+    latencies, errors = [], []
+    stop_at = time.monotonic() + duration
+    threads = [threading.Thread(target=client, args=(port, path, stop_at, latencies, errors))
+               for _ in range(clients)]
+    start = time.monotonic()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.monotonic() - start
+    rw1, cpu1 = proc_counters(proc.pid)
+    syscalls = strace_total(tracer, strace_out) if tracer else None
+
+    n = len(latencies)
+    latencies.sort()
+    return {
+        "endpoint": path,
+        "requests": n,
+        "errors": len(errors),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "rps": round(n / elapsed, 1),
+        "rw_calls_per_req": round((rw1 - rw0) / n, 2) if n and rw0 is not None else None,
+        "syscalls_per_req": round(syscalls / n, 2) if n and syscalls is not None else None,
+        "cpu_us_per_req": round((cpu1 - cpu0) / n * 1e6, 1) if n and cpu0 is not None else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-j", "--jobs", type=int, action="append",
+                        help="job count (repeatable; default 10 100 1000 10000)")
+    parser.add_argument("-e", "--endpoint", action="append",
+                        help="endpoint to drive (repeatable; default " + " ".join(DEFAULT_ENDPOINTS) + ")")
+    parser.add_argument("-c", "--clients", type=int, default=8, help="concurrent clients (default 8)")
+    parser.add_argument("-d", "--duration", type=float, default=5, help="seconds per endpoint (default 5)")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    parser.add_argument("--strace", action="store_true",
+                        help="also count every server syscall with strace -f -c (adds sys/req)")
+    args = parser.parse_args()
+    if args.strace and not shutil.which("strace"):
+        parser.error("--strace needs strace on PATH")
+
+    results = []
+    for jobs in args.jobs or [10, 100, 1000, 10000]:
+        with tempfile.TemporaryDirectory() as tmp:
+            status_dir, legacy_file, counts = generate(tmp, jobs, legacy=True)
+            port = free_port()
+            proc = start_server(status_dir, legacy_file, port)
+            try:
+                if not args.json:
+                    print(f"\n{jobs} jobs ({', '.join(f'{k}={v}' for k, v in sorted(counts.items()))}), "
+                          f"{args.clients} clients x {args.duration}s")
+                    print(f"  {'endpoint':<20} {'p50 ms':>9} {'p99 ms':>9} {'req/s':>9} "
+                          f"{'rw/req':>8}{' sys/req' if args.strace else ''} {'cpu/req':>9} {'errors':>6}")
+                for path in args.endpoint or DEFAULT_ENDPOINTS:
+                    strace_out = os.path.join(tmp, "strace.txt") if args.strace else None
+                    r = run_endpoint(proc, port, path, args.clients, args.duration, strace_out)
+                    r["jobs"] = jobs
+                    results.append(r)
+                    if not args.json:
+                        sys_cell = f" {r['syscalls_per_req'] if r['syscalls_per_req'] is not None else '-':>7}" \
+                            if args.strace else ""
+                        print(f"  {path:<20} {r['p50_ms']:>9} {r['p99_ms']:>9} {r['rps']:>9} "
+                              f"{r['rw_calls_per_req'] if r['rw_calls_per_req'] is not None else '-':>8}{sys_cell} "
+                              f"{r['cpu_us_per_req'] if r['cpu_us_per_req'] is not None else '-':>9} "
+                              f"{r['errors']:>6}")
+            finally:
+                proc.terminate()
+                proc.wait()
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-request cost of check_health() with and without the status cache.
+
+Generates a synthetic status directory (default 500 jobs) in a temp dir and
+times check_health() three ways:
+
+  uncached  the pre-cache loader: glob + open + json.load every file per request
+  stat      StatusCache with stat-only revalidation (scandir + one stat per file)
+  inotify   StatusCache with inotify (one non-blocking read per request)
+
+Usage:
+  python3 bench/status_cache.py              # 500 jobs, 2000 requests each
+  python3 bench/status_cache.py -j 2000 -n 500
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import tempfile
+import time
+
+from gen_status import generate
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app", "status-api"))
+import app  # noqa: E402
+
+
+class UncachedLoader:
+    """Stand-in for the pre-cache load_status_files(): full re-read per call."""
+
+    def __init__(self, status_dir, legacy_file):
+        self.status_dir = status_dir
+        self.legacy_file = legacy_file
+
+    def jobs(self):
+        jobs = {}
+        for path in sorted(glob.glob(os.path.join(self.status_dir, "*.json"))):
+            name = os.path.splitext(os.path.basename(path))[0]
+            try:
+                with open(path) as f:
+                    jobs[name] = json.load(f)
+            except Exception as e:
+                jobs[name] = {"_parse_error": f"could not parse {path}: {e}"}
+        return jobs
+
+    def legacy(self):
+        return None
+
+
+def bench(label, cache, requests):
+    app.check_health(cache)  # warm: first call parses everything
+    start = time.perf_counter()
+    for _ in range(requests):
+        app.check_health(cache)
+    per_req = (time.perf_counter() - start) / requests
+    print(f"  {label:<9} {per_req * 1e6:10.1f} us/request  ({1 / per_req:8.0f} req/s)")
+    return per_req
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-j", "--jobs", type=int, default=500, help="synthetic job files (default 500)")
+    parser.add_argument("-n", "--requests", type=int, default=2000, help="requests per mode (default 2000)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        status_dir, legacy_file, _ = generate(tmp, args.jobs, stale=0, failed=0, never=0, malformed=0)
+
+        print(f"check_health() with {args.jobs} job files, {args.requests} requests per mode")
+        base = bench("uncached", UncachedLoader(status_dir, legacy_file), args.requests)
+        stat = bench("stat", app.StatusCache(status_dir, legacy_file, use_inotify=False), args.requests)
+        inotify_cache = app.StatusCache(status_dir, legacy_file, use_inotify=True)
+        if inotify_cache.mode == "inotify":
+            inot = bench("inotify", inotify_cache, args.requests)
+            print(f"  speedup vs uncached: stat {base / stat:.1f}x, inotify {base / inot:.1f}x")
+        else:
+            print("  inotify   unavailable on this platform — skipped")
+            print(f"  speedup vs uncached: stat {base / stat:.1f}x")
+
+
+if __name__ == "__main__":
+    main()